@@ -0,0 +1,63 @@
+"""
+바코드 생성/문자열 정제 마이크로 벤치마크: 행 단위 apply vs 벡터화 Series 연산
+
+사용법:
+    python benchmarks/bench_barcode.py --rows 10000 100000 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flowork.utils import (
+    generate_barcode, generate_barcode_series,
+    clean_string_upper, clean_string_upper_series
+)
+
+SIZES = np.array(['85', '90', '95', '100', '105', 'FREE', 'S', 'M', 'L', 'XL', '2XL', '230', '240'])
+COLORS = np.array(['BLK', 'NVY', 'WHT', 'GRY', 'RED', 'Blue'])
+
+def make_frame(rows, seed=0):
+    # 실제 재고 시트처럼 품번 하나에 컬러x사이즈 약 24행이 딸린 분포
+    rng = np.random.default_rng(seed)
+    styles = max(rows // 24, 1)
+    return pd.DataFrame({
+        'product_number': [f"DM-{n:07d}" for n in rng.integers(0, styles, rows)],
+        'color': COLORS[rng.integers(0, len(COLORS), rows)].astype(object),
+        'size': SIZES[rng.integers(0, len(SIZES), rows)].astype(object),
+    })
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    cases = [
+        ('barcode', None),
+        ('barcode+format', {'BARCODE_FORMAT': '{pn_final}{color}{size_final}'}),
+    ]
+
+    print(f"{'rows':>9} {'case':<16} {'apply':>9} {'vector':>9} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_frame(rows)
+
+        for label, settings in cases:
+            t_apply = timed(lambda: df.apply(lambda row: generate_barcode(row.to_dict(), settings), axis=1))
+            t_vec = timed(lambda: generate_barcode_series(df, settings))
+            print(f"{rows:>9} {label:<16} {t_apply:>8.3f}s {t_vec:>8.3f}s {t_apply / t_vec:>7.1f}x")
+
+        t_apply = timed(lambda: [df[c].apply(clean_string_upper) for c in df.columns])
+        t_vec = timed(lambda: [clean_string_upper_series(df[c]) for c in df.columns])
+        print(f"{rows:>9} {'clean x3':<16} {t_apply:>8.3f}s {t_vec:>8.3f}s {t_apply / t_vec:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
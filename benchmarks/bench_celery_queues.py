@@ -0,0 +1,97 @@
+"""
+Celery 큐 분리 벤치마크: 이미지 배치가 실행 중일 때 작은 재고 업로드의 대기+처리 시간 (메모리 브로커)
+
+- shared: 모든 작업이 하나의 큐/워커 (concurrency 4, Celery 기본 선반입 4)
+- routed: flowork.celery_queues.queue_settings 설정 (images / inventory 큐별 워커, 선반입 1)
+작업 본문은 sleep으로 대신하며(이미지 작업은 실제로 별도 프로세스에서 CPU를 사용), 메모리 브로커는 우선순위를 지원하지 않아 큐 분리 효과만 측정합니다.
+
+사용법:
+    python benchmarks/bench_celery_queues.py --images 8 --image-seconds 3 --uploads 6
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import statistics
+from contextlib import ExitStack
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flowork.celery_queues import queue_settings
+
+IMAGE_TASK = 'flowork.celery_tasks.task_process_images'
+UPLOAD_TASK = 'flowork.celery_tasks.task_upsert_inventory'
+
+finished = {}
+finished_lock = threading.Lock()
+
+def make_app(settings):
+    # 워커마다 앱을 따로 만들어도 메모리 브로커 상태는 프로세스 안에서 공유됨
+    app = Celery('bench', broker='memory://localhost/', set_as_current=False)
+    app.conf.update({'task_default_queue': 'default', 'worker_hijack_root_logger': False, **settings})
+    # 메모리 브로커 기본 폴링 간격(1초)이 지연 시간에 섞이지 않도록 짧게
+    app.conf.broker_transport_options = {**settings.get('broker_transport_options', {}), 'polling_interval': 0.02}
+
+    @app.task(name=IMAGE_TASK)
+    def image_task(seconds):
+        time.sleep(seconds)
+
+    @app.task(name=UPLOAD_TASK, bind=True)
+    def upload_task(self, seconds):
+        time.sleep(seconds)
+        with finished_lock:
+            finished[self.request.id] = time.perf_counter()
+
+    return app
+
+def run(name, workers, args):
+    finished.clear()
+    with ExitStack() as stack:
+        apps = []
+        for settings, queues, concurrency in workers:
+            app = make_app(settings)
+            stack.enter_context(start_worker(app, pool='threads', concurrency=concurrency, queues=queues,
+                                             perform_ping_check=False, loglevel='WARNING',
+                                             hostname=f"{queues[0]}@bench"))
+            apps.append(app)
+        client = apps[0]
+
+        for _ in range(args.images):
+            client.send_task(IMAGE_TASK, args=[args.image_seconds])
+        time.sleep(0.2)
+
+        sent = {}
+        for _ in range(args.uploads):
+            result = client.send_task(UPLOAD_TASK, args=[args.upload_seconds])
+            sent[result.id] = time.perf_counter()
+            time.sleep(args.interval)
+
+        deadline = time.perf_counter() + args.images * args.image_seconds + 30
+        while len(finished) < len(sent) and time.perf_counter() < deadline:
+            time.sleep(0.05)
+
+        latencies = [finished[tid] - t for tid, t in sent.items() if tid in finished]
+        print(f"{name:<8} uploads={len(latencies)}/{len(sent)} "
+              f"median={statistics.median(latencies):.2f}s max={max(latencies):.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--images', type=int, default=8)
+    parser.add_argument('--image-seconds', type=float, default=3.0)
+    parser.add_argument('--uploads', type=int, default=6)
+    parser.add_argument('--upload-seconds', type=float, default=0.1)
+    parser.add_argument('--interval', type=float, default=0.3)
+    args = parser.parse_args()
+
+    # 기존 구성: 단일 큐, concurrency 4, 기본 선반입
+    run('shared', [({'worker_prefetch_multiplier': 4}, ['default'], 4)], args)
+
+    # 큐 분리: 이미지 워커 2개 + 재고 워커 3개 (docker-compose 구성과 동일)
+    routed = queue_settings({})
+    run('routed', [(routed, ['images'], 2), (routed, ['inventory'], 3)], args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+InventoryService.apply_import_job 벤치마크 (Celery import_excel_task가 실행하는 경로):
+묶음별 COPY 스테이징 적재 vs 같은 작업을 ORM 묶음 삽입으로 처리한 경우
+
+사용법 (PostgreSQL DATABASE_URL 필요):
+    python benchmarks/bench_full_import.py --rows 500000 --chunk-size 20000
+
+임시 브랜드와 임시 작업 디렉터리를 만들어 측정 후 삭제하므로 기존 데이터에는 영향을 주지 않습니다.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from flowork import create_app
+from flowork.extensions import db
+from flowork.models import Brand
+from flowork.services.inventory_service import InventoryService
+from flowork.services.inventory_jobs import InventoryJob, iter_chunks, IMPORT_CHUNK_SIZE
+
+SIZES = ['85', '90', '95', '100', '105', '110']
+COLORS = ['BLK', 'NVY', 'WHT', 'GRY']
+
+def make_catalogue(rows, prefix):
+    records = []
+    per_product = len(SIZES) * len(COLORS)
+    for i in range(rows):
+        p_idx, v_idx = divmod(i, per_product)
+        color = COLORS[v_idx // len(SIZES)]
+        size = SIZES[v_idx % len(SIZES)]
+        pn = f"{prefix}{p_idx:07d}"
+        records.append({
+            'product_number': pn,
+            'product_name': f"벤치마크 상품 {p_idx}",
+            'product_number_cleaned': pn,
+            'product_name_choseong': 'ㅂㅊㅁㅋㅅㅍ',
+            'release_year': 2025,
+            'item_category': '자켓',
+            'is_favorite': 0,
+            'barcode': f"{pn}{color}{size.zfill(3)}",
+            'barcode_cleaned': f"{pn}{color}{size.zfill(3)}",
+            'color': color,
+            'size': size,
+            'original_price': 99000,
+            'sale_price': 89000,
+            'hq_stock': 10,
+        })
+    return records
+
+def run(label, records, brand_id, job_dir, chunk_size):
+    # 이전 실행의 데이터 삭제 비용과 중간 파일 저장(파싱 단계)은 측정에서 제외
+    InventoryService._delete_brand_catalogue(brand_id)
+    db.session.commit()
+    job = InventoryJob(label, job_dir)
+    job.write_chunks(iter_chunks(records, size=chunk_size))
+
+    started = time.perf_counter()
+    ok, message = InventoryService.apply_import_job(job, brand_id)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<6} {elapsed:8.2f}s  {len(records) / elapsed:10.0f} rows/s  ({message})")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    app = create_app(Config)
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("COPY 경로는 PostgreSQL에서만 측정할 수 있습니다.")
+            return
+
+        db.create_all()
+        brand = Brand(brand_name=f"BENCH_{int(time.time())}")
+        db.session.add(brand)
+        db.session.commit()
+        brand_id = brand.id
+        job_dir = tempfile.mkdtemp(prefix='bench_import_')
+
+        try:
+            records = make_catalogue(args.rows, prefix=f"B{brand_id}X")
+            print(f"synthetic catalogue: {len(records)} rows")
+
+            # 비교용: 같은 작업을 SQLite 경로의 ORM 묶음 삽입으로 처리
+            with mock.patch.object(InventoryService, '_apply_import_chunk_copy',
+                                   staticmethod(InventoryService._apply_import_chunk_orm)):
+                orm = run('orm', records, brand_id, job_dir, args.chunk_size)
+            copy = run('copy', records, brand_id, job_dir, args.chunk_size)
+            print(f"speedup: {orm / copy:.1f}x")
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            InventoryService._delete_brand_catalogue(brand_id)
+            db.session.query(Brand).filter_by(id=brand_id).delete()
+            db.session.commit()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+배경 제거 처리량 벤치마크: 이미지별 rembg.remove vs U2Net ONNX 배치 추론 (images/sec)
+
+사용법:
+    python benchmarks/bench_rembg_batch.py --model /app/models/u2net.onnx --images 24 --batch-sizes 1 4 8 --threads 2
+    python benchmarks/bench_rembg_batch.py --model /app/models/u2net.onnx --dir /tmp/temp_images/STYLE/BLK
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flowork.services.rembg_batch import BatchBackgroundRemover
+
+def make_images(count, seed=0):
+    # 흰 배경 위 상품 실루엣 형태의 합성 이미지 (실제 DF 이미지와 비슷한 1000~1500px)
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        w, h = int(rng.integers(1000, 1500)), int(rng.integers(1000, 1500))
+        img = Image.new('RGB', (w, h), (245, 245, 245))
+        draw = ImageDraw.Draw(img)
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        draw.ellipse([w * 0.2, h * 0.1, w * 0.8, h * 0.9], fill=color)
+        images.append(img)
+    return images
+
+def load_images(directory, max_size=1500):
+    images = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.jpg')) + glob.glob(os.path.join(directory, '*.png'))):
+        img = Image.open(path).convert('RGB')
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        images.append(img)
+    return images
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='/app/models/u2net.onnx')
+    parser.add_argument('--images', type=int, default=24)
+    parser.add_argument('--dir', default=None)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--threads', type=int, default=0, help='intra-op 스레드 수 (0: onnxruntime 기본값)')
+    args = parser.parse_args()
+
+    images = load_images(args.dir) if args.dir else make_images(args.images)
+    if not images:
+        print("이미지가 없습니다.")
+        return
+
+    # 현재 경로: rembg 세션 1개로 이미지마다 remove() 호출
+    os.environ.setdefault('U2NET_HOME', os.path.dirname(os.path.abspath(args.model)))
+    from rembg import remove, new_session
+    session = new_session('u2net')
+    remove(images[0], session=session)  # 예열
+    started = time.perf_counter()
+    for img in images:
+        remove(img, session=session)
+    baseline = len(images) / (time.perf_counter() - started)
+
+    print(f"images={len(images)} threads={args.threads or 'default'}")
+    print(f"{'path':<22} {'images/sec':>10} {'speedup':>8}")
+    print(f"{'rembg.remove':<22} {baseline:>10.2f} {1.0:>7.2f}x")
+
+    for batch_size in args.batch_sizes:
+        remover = BatchBackgroundRemover(args.model, batch_size=batch_size, intra_op_threads=args.threads)
+        remover.remove(images[:batch_size])  # 예열
+        started = time.perf_counter()
+        remover.remove(images)
+        rate = len(images) / (time.perf_counter() - started)
+        label = f"batch={remover.batch_size}"
+        print(f"{label:<22} {rate:>10.2f} {rate / baseline:>7.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+브랜드 판매 분석 벤치마크: 월별 컬럼 저장소(NumPy 메모리 맵)에서 group-by 보고서 응답 시간 (DB 사용 안 함)
+
+사용법:
+    python benchmarks/bench_sales_analytics.py --months 24 --lines-per-month 250000 --stores 120 --styles 5000
+
+임시 디렉터리에 합성 판매 데이터를 저장한 뒤 기간별로 각 보고서를 측정하고 삭제합니다.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from datetime import date, timedelta
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flowork.services.sales_analytics import SalesAnalytics, month_range, months_between
+
+CATEGORIES = ['자켓', '팬츠', '티셔츠', '셔츠', '니트', '베스트', '다운', '모자', '가방', '신발', '양말', None]
+
+def make_month(rng, key, lines, stores, styles):
+    start, end = month_range(key)
+    days = (end - start).days
+    product_id = rng.zipf(1.3, lines) % styles + 1  # 인기 품번에 판매가 몰리는 분포
+    quantity = rng.integers(1, 3, lines)
+    price = (product_id % 7 + 3) * 10000
+    discount = np.where(rng.random(lines) < 0.2, 5000, 0)
+    return {
+        'sale_date': np.datetime64(start, 'D') + rng.integers(0, days, lines),
+        'store_id': rng.integers(1, stores + 1, lines),
+        'product_id': product_id,
+        'variant_id': product_id * 10 + rng.integers(0, 6, lines),
+        'quantity': quantity,
+        'amount': (price - discount) * quantity,
+        'discount': discount * quantity,
+        'is_online': rng.random(lines) < 0.15,
+    }
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--lines-per-month', type=int, default=250000)
+    parser.add_argument('--stores', type=int, default=120)
+    parser.add_argument('--styles', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base_dir = tempfile.mkdtemp(prefix='sales_analytics_')
+    try:
+        analytics = SalesAnalytics(1, base_dir)
+        end = date.today()
+        start = (end.replace(day=1) - timedelta(days=31 * (args.months - 1))).replace(day=1)
+        keys = months_between(start, end)
+
+        started = time.perf_counter()
+        for key in keys:
+            analytics.write_month(key, make_month(rng, key, args.lines_per_month, args.stores, args.styles))
+        variant_ids = np.arange(10, (args.styles + 1) * 10)
+        stock = {
+            'store_id': np.repeat(np.arange(1, args.stores + 1), 200),
+            'variant_id': rng.choice(variant_ids, args.stores * 200),
+        }
+        stock['product_id'] = stock['variant_id'] // 10
+        stock['quantity'] = rng.integers(0, 10, len(stock['variant_id']))
+        products = [(p, f"ST{p:05d}", f"상품 {p}", CATEGORIES[p % len(CATEGORIES)]) for p in range(1, args.styles + 1)]
+        stores = [(s, f"매장 {s}") for s in range(1, args.stores + 1)]
+        analytics.write_snapshot(stock, products, stores)
+        print(f"wrote {len(keys)} months x {args.lines_per_month} lines in {time.perf_counter() - started:.1f}s")
+
+        reports = [
+            ('store_category_week', lambda s, e: analytics.store_category_week(s, e)),
+            ('top_styles(20)', lambda s, e: analytics.top_styles(s, e, n=20)),
+            ('sell_through', lambda s, e: analytics.sell_through(s, e)),
+        ]
+        print(f"{'range':<8} {'lines':>10} " + ' '.join(f"{name:>20}" for name, _ in reports))
+        for label, days in [('month', 30), ('quarter', 91), ('year', 365), ('all', (end - start).days)]:
+            period_start = end - timedelta(days=days)
+            lines = len(analytics.lines(period_start, end)['quantity'])
+            cells = []
+            for _, report in reports:
+                elapsed, _ = timed(lambda: report(period_start, end), args.repeat)
+                cells.append(f"{elapsed * 1000:>18.1f}ms")
+            print(f"{label:<8} {lines:>10} " + ' '.join(cells))
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
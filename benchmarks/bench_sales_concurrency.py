@@ -0,0 +1,123 @@
+"""
+동시 판매 등록 벤치마크: 한 매장에 여러 POS가 동시에 SalesService.create_sale을 호출할 때의 처리량/지연 시간
+
+사용법 (PostgreSQL DATABASE_URL 필요):
+    python benchmarks/bench_sales_concurrency.py --workers 8 --sales 50 --items 5
+
+임시 브랜드/매장을 만들어 측정 후 삭제하며, 발급된 영수증 번호가 1..N으로 중복/누락 없이 이어지는지 확인합니다.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from flowork import create_app
+from flowork.extensions import db
+from flowork.models import (
+    Brand, Store, User, Product, Variant, StoreStock, StockHistory, Sale, SaleItem, SaleDailyCounter
+)
+from flowork.constants import PaymentMethod
+from flowork.services.sales_service import SalesService
+
+def setup_store(variants):
+    brand = Brand(brand_name=f"BENCH_{int(time.time())}")
+    db.session.add(brand)
+    db.session.flush()
+    store = Store(store_name="BENCH_STORE", brand_id=brand.id)
+    db.session.add(store)
+    db.session.flush()
+    user = User(username=f"bench_{brand.id}", password_hash="x", brand_id=brand.id, store_id=store.id)
+    product = Product(product_number=f"B{brand.id}P", product_name="벤치마크 상품", brand_id=brand.id)
+    db.session.add_all([user, product])
+    db.session.flush()
+
+    variant_ids = []
+    for i in range(variants):
+        v = Variant(product_id=product.id, barcode=f"B{brand.id}V{i:05d}", color='BLK', size=str(i),
+                    original_price=10000, sale_price=9000)
+        db.session.add(v)
+        db.session.flush()
+        db.session.add(StoreStock(store_id=store.id, variant_id=v.id, quantity=1000))
+        variant_ids.append(v.id)
+    db.session.commit()
+    return brand.id, store.id, user.id, product.id, variant_ids
+
+def teardown(brand_id, store_id, user_id, product_id):
+    sale_ids = [s for (s,) in db.session.query(Sale.id).filter_by(store_id=store_id)]
+    if sale_ids:
+        db.session.query(SaleItem).filter(SaleItem.sale_id.in_(sale_ids)).delete(synchronize_session=False)
+    db.session.query(Sale).filter_by(store_id=store_id).delete(synchronize_session=False)
+    db.session.query(SaleDailyCounter).filter_by(store_id=store_id).delete(synchronize_session=False)
+    db.session.query(StockHistory).filter_by(store_id=store_id).delete(synchronize_session=False)
+    db.session.query(StoreStock).filter_by(store_id=store_id).delete(synchronize_session=False)
+    db.session.query(Variant).filter_by(product_id=product_id).delete(synchronize_session=False)
+    db.session.query(Product).filter_by(id=product_id).delete(synchronize_session=False)
+    db.session.query(User).filter_by(id=user_id).delete(synchronize_session=False)
+    db.session.query(Store).filter_by(id=store_id).delete(synchronize_session=False)
+    db.session.query(Brand).filter_by(id=brand_id).delete(synchronize_session=False)
+    db.session.commit()
+
+def pos(job):
+    seed, store_id, user_id, variant_ids, sales, items_per_sale = job
+    rng = random.Random(seed)
+    app = create_app(Config)
+    ok, failed = [], []
+    with app.app_context():
+        first = time.time()
+        for _ in range(sales):
+            items = [{'variant_id': v, 'quantity': 1} for v in rng.sample(variant_ids, items_per_sale)]
+            started = time.perf_counter()
+            result = SalesService.create_sale(store_id, user_id, date.today().isoformat(), items, PaymentMethod.CARD, False)
+            (ok if result['status'] == 'success' else failed).append(time.perf_counter() - started)
+        last = time.time()
+    return ok, failed, first, last
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=8, help='동시 POS 수 (프로세스)')
+    parser.add_argument('--sales', type=int, default=50, help='POS당 판매 건수')
+    parser.add_argument('--items', type=int, default=5, help='판매당 품목 수')
+    parser.add_argument('--variants', type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app(Config)
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("행 잠금 경합은 PostgreSQL에서만 측정할 수 있습니다.")
+            return
+        db.create_all()
+        brand_id, store_id, user_id, product_id, variant_ids = setup_store(args.variants)
+
+    # POS마다 별도 프로세스 (gunicorn 워커처럼 GIL을 공유하지 않음)
+    jobs = [(i, store_id, user_id, variant_ids, args.sales, args.items) for i in range(args.workers)]
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(pos, jobs))
+        # 프로세스 시작/앱 생성 시간은 빼고 첫 판매 시작 ~ 마지막 판매 종료 구간으로 처리량 계산
+        wall = max(r[3] for r in results) - min(r[2] for r in results)
+        latencies = sorted(t for r in results for t in r[0])
+        errors = [t for r in results for t in r[1]]
+
+        with app.app_context():
+            numbers = sorted(n for (n,) in db.session.query(Sale.daily_number).filter_by(store_id=store_id))
+        contiguous = numbers == list(range(1, len(numbers) + 1))
+
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        print(f"workers={args.workers} items/sale={args.items} sales={len(latencies)} errors={len(errors)}")
+        print(f"throughput {len(latencies) / wall:8.1f} sales/s")
+        print(f"latency    p50 {statistics.median(latencies) * 1000:6.1f}ms  p95 {p95 * 1000:6.1f}ms")
+        print(f"receipt numbers contiguous: {contiguous}")
+    finally:
+        with app.app_context():
+            teardown(brand_id, store_id, user_id, product_id)
+
+if __name__ == '__main__':
+    main()
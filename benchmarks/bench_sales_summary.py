@@ -0,0 +1,123 @@
+"""
+판매 통계 조회 벤치마크: 기간 통계를 sales/sale_items에서 직접 집계 vs 일자별 집계 테이블(daily_sales_summary) 합계
+
+사용법:
+    python benchmarks/bench_sales_summary.py --days 730 --sales-per-day 150 --items 3 --repeat 5
+
+임시 브랜드/매장에 판매 데이터를 만들어 측정 후 삭제합니다.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert, select
+from config import Config
+from flowork import create_app
+from flowork.extensions import db
+from flowork.models import Brand, Store, Product, Variant, Sale, SaleItem, DailySalesSummary
+from flowork.services.sales_service import SalesService, SUMMARY_FIELDS
+
+def seed(store_id, variant_id, days, sales_per_day, items_per_sale):
+    rng = random.Random(0)
+    start = date.today() - timedelta(days=days)
+    for d in range(days):
+        sale_date = start + timedelta(days=d)
+        sales, lines = [], []
+        for n in range(sales_per_day):
+            items = []
+            for _ in range(items_per_sale):
+                price, discount, qty = rng.choice([19000, 29000, 49000]), rng.choice([0, 0, 1000]), rng.randint(1, 2)
+                items.append({
+                    'variant_id': variant_id, 'product_name': 'BENCH', 'unit_price': price,
+                    'discount_amount': discount, 'discounted_price': price - discount,
+                    'quantity': qty, 'subtotal': (price - discount) * qty
+                })
+            sales.append({
+                'store_id': store_id, 'sale_date': sale_date, 'daily_number': n + 1,
+                'status': 'refunded' if rng.random() < 0.03 else 'valid',
+                'is_online': rng.random() < 0.2, 'total_amount': sum(i['subtotal'] for i in items),
+                'payment_method': 'card'
+            })
+            lines.append(items)
+        sale_ids = db.session.execute(insert(Sale).returning(Sale.id, sort_by_parameter_order=True), sales).scalars().all()
+        for sale_id, items in zip(sale_ids, lines):
+            for item in items:
+                item['sale_id'] = sale_id
+        db.session.execute(insert(SaleItem), [item for items in lines for item in items])
+        db.session.commit()
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--sales-per-day', type=int, default=150)
+    parser.add_argument('--items', type=int, default=3, help='판매당 품목 수')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        brand = Brand(brand_name=f"BENCH_{int(time.time())}")
+        db.session.add(brand)
+        db.session.flush()
+        store = Store(store_name="BENCH_STORE", brand_id=brand.id)
+        product = Product(product_number=f"B{brand.id}P", product_name="벤치마크 상품", brand_id=brand.id)
+        db.session.add_all([store, product])
+        db.session.flush()
+        variant = Variant(product_id=product.id, barcode=f"B{brand.id}V", color='BLK', size='F', sale_price=19000)
+        db.session.add(variant)
+        db.session.commit()
+        store_id, brand_id, product_id, variant_id = store.id, brand.id, product.id, variant.id
+
+        try:
+            started = time.perf_counter()
+            seed(store_id, variant_id, args.days, args.sales_per_day, args.items)
+            print(f"seeded {args.days * args.sales_per_day} sales in {time.perf_counter() - started:.1f}s")
+            rows = SalesService.rebuild_daily_summary(store_id=store_id)
+            print(f"summary rows {rows}")
+
+            end = date.today()
+            print(f"{'range':<8} {'live ms':>9} {'rollup ms':>10} {'speedup':>8}")
+            for label, days in [('month', 30), ('quarter', 91), ('year', 365), ('all', args.days + 1)]:
+                start = end - timedelta(days=days)
+                live_filters = (Sale.store_id == store_id, Sale.sale_date >= start, Sale.sale_date <= end)
+
+                def live():
+                    rows = db.session.execute(SalesService._summary_select(*live_filters)).all()
+                    return [sum(r[i + 2] for r in rows) for i in range(len(SUMMARY_FIELDS))]
+
+                def rollup():
+                    summary = SalesService.get_period_summary(store_id, start, end)
+                    return [summary[f] for f in SUMMARY_FIELDS]
+
+                live_time, live_result = timed(live, args.repeat)
+                rollup_time, rollup_result = timed(rollup, args.repeat)
+                assert live_result == rollup_result, (live_result, rollup_result)
+                print(f"{label:<8} {live_time * 1000:>9.1f} {rollup_time * 1000:>10.2f} {live_time / rollup_time:>7.0f}x")
+        finally:
+            sale_ids = select(Sale.id).where(Sale.store_id == store_id)
+            db.session.query(SaleItem).filter(SaleItem.sale_id.in_(sale_ids)).delete(synchronize_session=False)
+            db.session.query(Sale).filter_by(store_id=store_id).delete(synchronize_session=False)
+            db.session.query(DailySalesSummary).filter_by(store_id=store_id).delete(synchronize_session=False)
+            db.session.query(Variant).filter_by(id=variant_id).delete(synchronize_session=False)
+            db.session.query(Product).filter_by(id=product_id).delete(synchronize_session=False)
+            db.session.query(Store).filter_by(id=store_id).delete(synchronize_session=False)
+            db.session.query(Brand).filter_by(id=brand_id).delete(synchronize_session=False)
+            db.session.commit()
+
+if __name__ == '__main__':
+    main()
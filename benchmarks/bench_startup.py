@@ -0,0 +1,63 @@
+"""
+웹 앱 / Celery 워커 시작 비용 측정: 새 인터프리터에서 앱 생성까지 걸린 시간과 로드된 무거운 모듈
+
+사용법:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 3 --prewarm   # 이미지 워커 프로세스 예열(ONNX 세션 로드) 시간 포함
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY_MODULES = ['rembg', 'onnxruntime', 'pymatting', 'numba', 'PIL.Image', 'numpy', 'pandas', 'aiohttp']
+
+# 각 시나리오는 새 프로세스에서 실행 (모듈 캐시 없이 콜드 스타트 측정)
+SCENARIOS = {
+    'web': "from config import Config\nfrom flowork import create_app\napp = create_app(Config)\n",
+    'worker': "import flowork.celery_worker\n",
+}
+
+PREWARM = (
+    "from flowork.celery_worker import app\n"
+    "from flowork.services.image_process import warm_up_image_workers\n"
+    "with app.app_context():\n"
+    "    warm_up_image_workers()\n"
+)
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'modules': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def run_once(body):
+    code = PROBE.format(body=body, heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--prewarm', action='store_true')
+    args = parser.parse_args()
+
+    scenarios = dict(SCENARIOS)
+    if args.prewarm:
+        scenarios['worker+prewarm'] = PREWARM
+
+    print(f"{'scenario':<16} {'median(s)':>10} {'min(s)':>8}  heavy modules loaded")
+    for name, body in scenarios.items():
+        results = [run_once(body) for _ in range(args.runs)]
+        times = [r['seconds'] for r in results]
+        print(f"{name:<16} {statistics.median(times):>10.3f} {min(times):>8.3f}  {', '.join(results[-1]['modules']) or '-'}")
+
+if __name__ == '__main__':
+    main()
@@ -44,6 +44,33 @@ class Config:
     # [신규] Celery 워커 메모리 누수 방지 설정
     # 워커 프로세스가 50개의 작업을 처리하면 자동으로 재시작되어 메모리를 초기화합니다.
     CELERY_WORKER_MAX_TASKS_PER_CHILD = 50
+    # 작업 종류별 큐 (워커는 -Q로 받을 큐를 지정해 큐별로 동시 실행 수를 나눔)
+    # 이미지 처리 전용 큐를 받는 워커 프로세스는 시작 시 배경 제거 모델을 미리 로드
+    CELERY_DEFAULT_QUEUE = 'default'
+    CELERY_INVENTORY_QUEUE = 'inventory'
+    CELERY_IMAGE_QUEUE = 'images'
+    # 긴 작업을 프로세스당 1개만 미리 가져오도록 (짧은 작업이 긴 작업 뒤에 예약되어 기다리지 않게)
+    CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+    # 재고 업로드/DB 가져오기 작업의 최대 실행 시간(초). Redis 브로커의 visibility_timeout은 이보다 길게 설정되어
+    # 처리 중인 acks_late 작업이 다른 워커로 다시 전달되지 않음
+    CELERY_INVENTORY_TIME_LIMIT = int(os.getenv('CELERY_INVENTORY_TIME_LIMIT', 4 * 3600))
+
+    # 이미지 처리 CPU 단계(배경 제거/합성) 프로세스 풀 크기 (워커 프로세스당)
+    IMAGE_PROCESS_WORKERS = int(os.getenv('IMAGE_PROCESS_WORKERS', 3))
+    # 이미지 다운로드 호스트당 최대 동시 연결 수 (워커 프로세스의 공유 HTTP 세션 기준)
+    IMAGE_DOWNLOAD_PER_HOST = int(os.getenv('IMAGE_DOWNLOAD_PER_HOST', 8))
+    # 배경 제거 결과 디스크 캐시 (기본: UPLOAD_FOLDER/nobg_cache, 빈 값이면 사용 안 함) 및 최대 용량
+    NOBG_CACHE_DIR = os.getenv('NOBG_CACHE_DIR')
+    NOBG_CACHE_MAX_BYTES = int(os.getenv('NOBG_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+    # 배경 제거 배치 추론 (U2Net ONNX). 모델 파일이 없으면 이미지별 rembg 처리로 대체
+    REMBG_MODEL_PATH = os.getenv('REMBG_MODEL_PATH', '/app/models/u2net.onnx')
+    REMBG_BATCH_SIZE = int(os.getenv('REMBG_BATCH_SIZE', 4))
+    REMBG_INTRA_OP_THREADS = int(os.getenv('REMBG_INTRA_OP_THREADS', 2))
+
+    # 브랜드 판매 분석용 컬럼 저장소 (기본: UPLOAD_FOLDER/sales_analytics, 웹/워커가 함께 보는 경로여야 함)
+    # 매일 이 시각(로컬 시간)에 지난 달/이번 달 판매를 다시 추출 (celery beat)
+    SALES_ANALYTICS_DIR = os.getenv('SALES_ANALYTICS_DIR')
+    SALES_ANALYTICS_REFRESH_HOUR = int(os.getenv('SALES_ANALYTICS_REFRESH_HOUR', 4))
 
     # Caching 설정 (Redis)
     CACHE_TYPE = 'RedisCache'
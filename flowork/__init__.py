@@ -4,8 +4,9 @@ from logging.handlers import RotatingFileHandler
 from flask import Flask
 from flask_wtf.csrf import CSRFProtect
 from .extensions import db, login_manager, celery, migrate, cache
+from .celery_queues import queue_settings
 from .models import User
-from .commands import init_db_command, update_db_command
+from .commands import init_db_command, update_db_command, create_search_index_command, rebuild_sales_summary_command, extract_sales_analytics_command
 
 csrf = CSRFProtect()
 
@@ -41,7 +42,9 @@ def create_app(config_class):
         task_serializer='json',
         result_serializer='json',
         timezone=os.environ.get('TZ', 'Asia/Seoul'),
-        worker_max_tasks_per_child=app.config.get('CELERY_WORKER_MAX_TASKS_PER_CHILD', 50)
+        worker_max_tasks_per_child=app.config.get('CELERY_WORKER_MAX_TASKS_PER_CHILD', 50),
+        # 작업 종류별 전용 큐 (images/inventory/default)와 우선순위, 선반입 설정
+        **queue_settings(app.config)
     )
 
     class ContextTask(celery.Task):
@@ -53,6 +56,9 @@ def create_app(config_class):
 
     app.cli.add_command(init_db_command)
     app.cli.add_command(update_db_command)
+    app.cli.add_command(create_search_index_command)
+    app.cli.add_command(rebuild_sales_summary_command)
+    app.cli.add_command(extract_sales_analytics_command)
 
     from .blueprints.ui import ui_bp
     from .blueprints.api import api_bp
@@ -6,6 +6,7 @@ from flask_login import login_required, current_user, logout_user
 from sqlalchemy import func, exc
 
 from flowork.models import db, Brand, Store, Setting, User, Staff, Announcement, Sale, StockHistory
+from flowork.services.brand_settings import BrandSettings
 from . import api_bp
 from .utils import admin_required
 
@@ -40,6 +41,7 @@ def update_brand_name():
         brand_name_setting.value = brand_name
         
         db.session.commit()
+        BrandSettings.invalidate(current_brand_id)
         
         return jsonify({
             'status': 'success', 
@@ -128,6 +130,7 @@ def load_settings_from_file():
             db.session.add(new_setting)
                 
         db.session.commit()
+        BrandSettings.invalidate(brand.id)
         return jsonify({'status': 'success', 'message': f"'{filename}' 파일에서 {updated_count}개의 설정을 로드하여 적용했습니다."})
         
     except json.JSONDecodeError:
@@ -171,6 +174,7 @@ def update_setting():
             db.session.add(new_setting)
         
         db.session.commit()
+        BrandSettings.invalidate(current_user.brand_id)
         return jsonify({'status': 'success', 'message': '설정이 저장되었습니다.'})
 
     except Exception as e:
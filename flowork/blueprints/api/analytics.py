@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+from flask import request, jsonify
+from flask_login import login_required, current_user
+
+from flowork.constants import TaskPriority
+from flowork.celery_tasks import task_refresh_sales_analytics
+from flowork.services.sales_analytics import SalesAnalytics
+from . import api_bp
+
+# 기간 미지정 시 기본 조회 기간 (종료일 포함 4주)
+DEFAULT_PERIOD_DAYS = 28
+
+@api_bp.route('/api/analytics/sales', methods=['GET'])
+@login_required
+def brand_sales_analytics():
+    """
+    브랜드 전체 매장 판매 분석 (본사 계정 전용, 야간 추출된 컬럼 저장소 기준)
+    report: store_category_week (매장 x 카테고리 x 주) / top_styles (상위 품번) / sell_through (품번별 판매율)
+    """
+    if current_user.store_id:
+        return jsonify({'status': 'error', 'message': '본사 계정만 사용할 수 있습니다.'}), 403
+
+    report = request.args.get('report', 'top_styles')
+    try:
+        end_str = request.args.get('end_date')
+        start_str = request.args.get('start_date')
+        end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else date.today()
+        start_date = datetime.strptime(start_str, '%Y-%m-%d').date() if start_str else end_date - timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+        n = request.args.get('n', 20, type=int)
+        by = request.args.get('by', 'amount')
+
+        analytics = SalesAnalytics.for_brand(current_user.current_brand_id)
+        rows = analytics.report(report, start_date, end_date, n=n, by=by)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+    return jsonify({
+        'status': 'success',
+        'report': report,
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'extracted_at': analytics.extracted_at,
+        'rows': rows
+    })
+
+@api_bp.route('/api/analytics/sales/refresh', methods=['POST'])
+@login_required
+def refresh_brand_sales_analytics():
+    """지난 달/이번 달 판매 분석 데이터를 즉시 다시 추출 (본사 대량 작업 우선순위로 실행)"""
+    if current_user.store_id:
+        return jsonify({'status': 'error', 'message': '본사 계정만 사용할 수 있습니다.'}), 403
+
+    task = task_refresh_sales_analytics.apply_async(args=[current_user.current_brand_id], priority=TaskPriority.HQ_BULK)
+    return jsonify({'status': 'success', 'task_id': task.id, 'message': '판매 분석 데이터 갱신을 시작했습니다.'})
@@ -5,11 +5,15 @@ import traceback
 import io
 from flask import request, jsonify, send_file, flash, redirect, url_for, abort
 from flask_login import login_required, current_user
-from sqlalchemy import or_
+from sqlalchemy import or_, exc
 from sqlalchemy.orm import selectinload
 
-from flowork.models import db, Product, Variant, StoreStock, Setting
+from flowork.models import db, Product, Variant, StoreStock, Setting, Store, StockHistory
+from flowork.constants import StockChangeType, TaskPriority
 from flowork.utils import clean_string_upper, generate_barcode, get_sort_key
+from flowork.services.brand_settings import BrandSettings
+from flowork.services.product_search import ProductSearch
+from flowork.services.product_service import ProductService
 
 from flowork.services.excel import (
     export_db_to_excel,
@@ -88,14 +92,17 @@ def inventory_upsert():
     
     form_data = request.form.to_dict()
 
+    # 매장 업로드는 본사 대량 작업보다 먼저 처리 (같은 inventory 큐 안의 우선순위)
+    priority = TaskPriority.STORE_UPLOAD if upload_mode == 'store' else TaskPriority.HQ_BULK
+
     if upload_mode == 'db' and request.form.get('is_full_import') == 'true':
-        task = task_import_db.delay(
+        task = task_import_db.apply_async(args=[
             temp_filename,
             form_data,
             current_brand_id
-        )
+        ], priority=priority)
     else:
-        task = task_upsert_inventory.delay(
+        task = task_upsert_inventory.apply_async(args=[
             temp_filename, 
             form_data, 
             upload_mode, 
@@ -103,7 +110,7 @@ def inventory_upsert():
             target_store_id,
             excluded_indices,
             True
-        )
+        ], priority=priority)
     
     return jsonify({'status': 'success', 'task_id': task.id, 'message': '업로드 작업을 시작했습니다.'})
 
@@ -140,7 +147,7 @@ def update_store_stock_excel():
     excluded_indices = [int(x) for x in excluded_str.split(',')] if excluded_str else []
     form_data = request.form.to_dict()
     
-    task = task_upsert_inventory.delay(
+    task = task_upsert_inventory.apply_async(args=[
         temp_filename, 
         form_data, 
         'store', 
@@ -148,7 +155,7 @@ def update_store_stock_excel():
         target_store_id,
         excluded_indices,
         True
-    )
+    ], priority=TaskPriority.STORE_UPLOAD)
 
     return jsonify({'status': 'success', 'task_id': task.id, 'message': '업데이트 작업을 시작했습니다.'})
 
@@ -198,6 +205,35 @@ def export_stock_check():
         download_name=download_name
     )
 
+@api_bp.route('/api/stock_overview', methods=['GET'])
+@login_required
+def api_stock_overview():
+    """통합 재고 현황의 화면 표시 구간(행/열 범위)만 열 단위 JSON으로 반환합니다."""
+    if not current_user.is_admin or current_user.store_id:
+        abort(403, description="통합 재고 현황은 본사 관리자만 조회할 수 있습니다.")
+
+    args = request.args
+    try:
+        low_stock = args.get('low_stock', '')
+        window_args = {
+            'row_offset': args.get('row_offset', 0, type=int),
+            'row_limit': args.get('row_limit', 100, type=int),
+            'col_offset': args.get('col_offset', 0, type=int),
+            'col_limit': args.get('col_limit', 30, type=int),
+            'category': args.get('category') or None,
+            'year': int(args['year']) if args.get('year') else None,
+            'low_stock': int(low_stock) if low_stock != '' else None,
+        }
+    except ValueError:
+        return jsonify({'status': 'error', 'message': '잘못된 조회 조건입니다.'}), 400
+
+    try:
+        matrix = ProductService.get_stock_overview_matrix(current_user.current_brand_id)
+        return jsonify({'status': 'success', **matrix.window(**window_args)})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'status': 'error', 'message': f'서버 오류: {e}'}), 500
+
 @api_bp.route('/api/live_search', methods=['POST'])
 @login_required
 def live_search():
@@ -230,14 +266,8 @@ def live_search():
 
     if is_searching:
         if query_param:
-            search_term_cleaned = clean_string_upper(query_param)
-            search_like = '%' + search_term_cleaned + '%'
             base_query = base_query.filter(
-                or_(
-                    Product.product_number_cleaned.like(search_like),
-                    Product.product_name_cleaned.like(search_like),
-                    Product.product_name_choseong.like(search_like)
-                )
+                ProductSearch.criterion(current_user.current_brand_id, query_param)
             )
 
         if category_param and category_param != '전체':
@@ -556,6 +586,15 @@ def update_stock():
             db.session.flush()
         
         new_stock = max(0, stock.quantity + change)
+        if new_stock != stock.quantity:
+            db.session.add(StockHistory(
+                store_id=target_store_id,
+                variant_id=variant.id,
+                user_id=current_user.id,
+                change_type=StockChangeType.MANUAL_UPDATE,
+                quantity_change=new_stock - stock.quantity,
+                current_quantity=new_stock
+            ))
         stock.quantity = new_stock
         db.session.commit()
         
@@ -657,8 +696,7 @@ def api_update_product_details():
         return jsonify({'status': 'error', 'message': '상품 ID 누락'}), 400
 
     try:
-        settings_query = Setting.query.filter_by(brand_id=current_user.current_brand_id).all()
-        brand_settings = {s.key: s.value for s in settings_query}
+        brand_settings = BrandSettings.get(current_user.current_brand_id)
 
         product = Product.query.filter_by(
             id=product_id,
@@ -750,6 +788,7 @@ def api_update_product_details():
         
         db.session.flush()
         db.session.commit()
+        ProductSearch.invalidate(current_user.current_brand_id)
         return jsonify({'status': 'success', 'message': '상품 정보가 업데이트되었습니다.'})
 
     except ValueError as ve:
@@ -805,8 +844,7 @@ def api_find_product_details():
         return jsonify({'status': 'error', 'message': '품번 없음.'}), 400
     
     try:
-        settings_query = Setting.query.filter_by(brand_id=current_user.current_brand_id).all()
-        brand_settings = {s.key: s.value for s in settings_query}
+        brand_settings = BrandSettings.get(current_user.current_brand_id)
 
         search_term_cleaned = clean_string_upper(pn_query)
         search_like = f"%{search_term_cleaned}%"
@@ -863,17 +901,10 @@ def api_order_product_search():
     if not query:
         return jsonify({'status': 'error', 'message': '검색어 없음.'}), 400
     
-    search_term_cleaned = clean_string_upper(query)
-    search_like = f"%{search_term_cleaned}%"
-    
     products = Product.query.filter(
         Product.brand_id == current_user.current_brand_id,
-        or_(
-            Product.product_number_cleaned.like(search_like),
-            Product.product_name_cleaned.like(search_like),
-            Product.product_name_choseong.like(search_like)
-        )
-    ).order_by(Product.product_name).limit(20).all()
+        ProductSearch.criterion(current_user.current_brand_id, query)
+    ).order_by(*ProductSearch.rank(query), Product.product_name).limit(20).all()
 
     if products:
         results = [{
@@ -11,6 +11,7 @@ from flask_login import login_required, current_user
 from sqlalchemy import text, func, or_, case
 from flowork.models import db, Product, Variant, Setting
 from flowork.extensions import cache
+from flowork.services.brand_settings import BrandSettings
 from . import api_bp
 from flowork.celery_tasks import task_process_images
 
@@ -171,6 +172,7 @@ def save_options_logic(user_id, brand_id, options):
         setting = Setting(brand_id=brand_id, key=key, value=value_str)
         db.session.add(setting)
     db.session.commit()
+    BrandSettings.invalidate(brand_id)
 
 @api_bp.route('/api/product/options', methods=['GET'])
 @login_required
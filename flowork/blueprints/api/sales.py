@@ -4,13 +4,15 @@ import traceback
 from datetime import datetime
 from flask import request, jsonify, send_file
 from flask_login import login_required, current_user
-from sqlalchemy import func, or_
+from sqlalchemy import func, or_, literal
 from sqlalchemy.orm import selectinload
 import openpyxl
 
 from flowork.models import db, Sale, SaleItem, Setting, StoreStock, Variant, Product, Store, StockHistory
 from flowork.utils import clean_string_upper, get_sort_key
 from flowork.services.sales_service import SalesService
+from flowork.services.brand_settings import BrandSettings
+from flowork.services.product_search import ProductSearch
 from . import api_bp
 
 @api_bp.route('/api/sales/settings', methods=['GET', 'POST'])
@@ -32,6 +34,7 @@ def sales_settings():
             setting = Setting(brand_id=current_user.current_brand_id, key=SETTING_KEY, value=value_str)
             db.session.add(setting)
         db.session.commit()
+        BrandSettings.invalidate(current_user.current_brand_id)
         return jsonify({'status': 'success', 'message': '판매 설정이 저장되었습니다.'})
         
     else:
@@ -77,11 +80,7 @@ def search_sales_products():
     if not query:
         return jsonify({'status': 'success', 'results': []})
 
-    q_clean = clean_string_upper(query)
-    search_filter = or_(
-        Product.product_number_cleaned.contains(q_clean),
-        Product.product_name_cleaned.contains(q_clean)
-    )
+    search_fields = ('number', 'name')
 
     if mode == 'detail_stock':
         product = Product.query.filter(
@@ -91,8 +90,7 @@ def search_sales_products():
         
         if not product: return jsonify({'status': 'error', 'variants': []})
         
-        settings_query = Setting.query.filter_by(brand_id=current_user.current_brand_id).all()
-        brand_settings = {s.key: s.value for s in settings_query}
+        brand_settings = BrandSettings.get(current_user.current_brand_id)
         
         variants = db.session.query(Variant).filter_by(product_id=product.id).all()
         variants.sort(key=lambda v: get_sort_key(v, brand_settings))
@@ -117,55 +115,66 @@ def search_sales_products():
 
     products = Product.query.filter(
         Product.brand_id == current_user.current_brand_id,
-        search_filter
-    ).limit(50).all()
+        ProductSearch.criterion(current_user.current_brand_id, query, search_fields)
+    ).order_by(*ProductSearch.rank(query, search_fields), Product.id).limit(50).all()
     
+    product_ids = [p.id for p in products]
+    rows_by_product = {}
+
+    if product_ids:
+        # 옵션별 집계값(매장 재고 또는 기간 내 판매 수량)을 variant_id 단위로 계산하는 서브쿼리
+        stat = None
+        if mode == 'sales':
+            stat = db.session.query(
+                StoreStock.variant_id.label('variant_id'),
+                StoreStock.quantity.label('qty')
+            ).filter(StoreStock.store_id == current_user.store_id).subquery()
+        elif mode == 'refund':
+            start_dt = data.get('start_date')
+            end_dt = data.get('end_date')
+            if start_dt and end_dt:
+                stat = db.session.query(
+                    SaleItem.variant_id.label('variant_id'),
+                    func.sum(SaleItem.quantity).label('qty')
+                ).join(Sale).filter(
+                    Sale.store_id == current_user.store_id,
+                    Sale.sale_date >= start_dt,
+                    Sale.sale_date <= end_dt,
+                    Sale.status == 'valid'
+                ).group_by(SaleItem.variant_id).subquery()
+
+        # 상품 x 컬러 단위 그룹: 첫 옵션(min id)의 가격과 합계 수량을 한 번에 조회
+        grouped = db.session.query(
+            Variant.product_id.label('product_id'),
+            Variant.color.label('color'),
+            func.min(Variant.id).label('first_id'),
+            (func.coalesce(func.sum(stat.c.qty), 0) if stat is not None else literal(0)).label('stat_qty')
+        ).filter(Variant.product_id.in_(product_ids))
+        if stat is not None:
+            grouped = grouped.outerjoin(stat, stat.c.variant_id == Variant.id)
+        grouped = grouped.group_by(Variant.product_id, Variant.color).subquery()
+
+        color_rows = db.session.query(
+            grouped.c.product_id, grouped.c.color, grouped.c.stat_qty,
+            Variant.original_price, Variant.sale_price
+        ).join(Variant, Variant.id == grouped.c.first_id).order_by(grouped.c.product_id, grouped.c.first_id).all()
+
+        for row in color_rows:
+            rows_by_product.setdefault(row.product_id, []).append(row)
+
     results = []
     for p in products:
-        base_info = {
-            'product_id': p.id,
-            'product_number': p.product_number,
-            'product_name': p.product_name,
-            'year': p.release_year,
-        }
-        
-        variants_all = Variant.query.filter_by(product_id=p.id).all()
-        color_map = {}
-        for v in variants_all:
-            if v.color not in color_map:
-                color_map[v.color] = {'ids': [], 'org': v.original_price, 'sale': v.sale_price}
-            color_map[v.color]['ids'].append(v.id)
-        
-        for color, v_data in color_map.items():
-            row = base_info.copy()
-            row['color'] = color
-            row['original_price'] = v_data['org']
-            row['sale_price'] = v_data['sale']
-            
-            stat_qty = 0
-            
-            if mode == 'sales':
-                stocks = db.session.query(func.sum(StoreStock.quantity)).filter(
-                    StoreStock.store_id == current_user.store_id,
-                    StoreStock.variant_id.in_(v_data['ids'])
-                ).scalar()
-                stat_qty = stocks if stocks else 0
-                
-            elif mode == 'refund':
-                start_dt = data.get('start_date')
-                end_dt = data.get('end_date')
-                if start_dt and end_dt:
-                    sold = db.session.query(func.sum(SaleItem.quantity)).join(Sale).filter(
-                        Sale.store_id == current_user.store_id,
-                        Sale.sale_date >= start_dt,
-                        Sale.sale_date <= end_dt,
-                        Sale.status == 'valid',
-                        SaleItem.variant_id.in_(v_data['ids'])
-                    ).scalar()
-                    stat_qty = sold if sold else 0
-            
-            row['stat_qty'] = stat_qty
-            results.append(row)
+        for row in rows_by_product.get(p.id, []):
+            results.append({
+                'product_id': p.id,
+                'product_number': p.product_number,
+                'product_name': p.product_name,
+                'year': p.release_year,
+                'color': row.color,
+                'original_price': row.original_price,
+                'sale_price': row.sale_price,
+                'stat_qty': int(row.stat_qty or 0)
+            })
             
     return jsonify({'status': 'success', 'results': results})
 
@@ -303,49 +312,79 @@ def search_sales_history():
 def export_daily_sales():
     if not current_user.store_id: return jsonify({'status': 'error'}), 403
     
+    # date(하루) 또는 start_date ~ end_date(기간)
     date_str = request.args.get('date')
-    if not date_str: return "날짜가 필요합니다.", 400
+    start_str = request.args.get('start_date') or date_str
+    end_str = request.args.get('end_date') or date_str
+    if not start_str or not end_str: return "날짜가 필요합니다.", 400
     
     try:
-        target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        sales = Sale.query.filter_by(store_id=current_user.store_id, sale_date=target_date).order_by(Sale.daily_number).all()
+        start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
+        is_period = start_date < end_date
+        
+        # 판매와 품목을 한 번의 조인 쿼리로 조회 (판매별 품목 조회 N+1 제거)
+        rows = db.session.query(Sale, SaleItem).join(SaleItem, SaleItem.sale_id == Sale.id).filter(
+            Sale.store_id == current_user.store_id,
+            Sale.sale_date >= start_date,
+            Sale.sale_date <= end_date
+        ).order_by(Sale.sale_date, Sale.daily_number, SaleItem.id).all()
         
         wb = openpyxl.Workbook()
         ws = wb.active
-        ws.title = f"{date_str} 판매내역"
+        ws.title = f"{start_str}~{end_str} 판매내역" if is_period else f"{start_str} 판매내역"
         
         headers = ["판매일자", "영수번호", "품번", "품명", "컬러", "사이즈", "최초가", "판매가", "수량", "할인액", "할인적용가", "합계", "구분", "상태"]
         ws.append(headers)
         
         total_daily_amount = 0
         
-        for sale in sales:
+        for sale, item in rows:
             status_str = "정상" if sale.status == 'valid' else "환불"
             type_str = "온라인" if sale.is_online else "오프라인"
             
-            for item in sale.items:
-                row = [
-                    sale.sale_date.strftime('%Y-%m-%d'),
-                    sale.receipt_number,
-                    item.product_number,
-                    item.product_name,
-                    item.color,
-                    item.size,
-                    item.original_price,
-                    item.unit_price,
-                    item.quantity,
-                    item.discount_amount,
-                    item.discounted_price,
-                    item.subtotal,
-                    type_str,
-                    status_str
-                ]
-                ws.append(row)
-                if sale.status == 'valid':
-                    total_daily_amount += item.subtotal
+            row = [
+                sale.sale_date.strftime('%Y-%m-%d'),
+                sale.receipt_number,
+                item.product_number,
+                item.product_name,
+                item.color,
+                item.size,
+                item.original_price,
+                item.unit_price,
+                item.quantity,
+                item.discount_amount,
+                item.discounted_price,
+                item.subtotal,
+                type_str,
+                status_str
+            ]
+            ws.append(row)
+            if sale.status == 'valid':
+                total_daily_amount += item.subtotal
         
         ws.append([])
-        ws.append(["", "", "", "", "", "", "", "", "", "", "일일 총 매출:", total_daily_amount])
+        ws.append(["", "", "", "", "", "", "", "", "", "", "기간 총 매출:" if is_period else "일일 총 매출:", total_daily_amount])
+        
+        # 기간 다운로드는 일자별 집계 테이블로 일별 합계 시트 추가 (집계가 없거나 일부만 있으면 직접 집계)
+        if is_period:
+            sale_total = len({sale.id for sale, _ in rows})
+            ws_daily = wb.create_sheet("일별 합계")
+            ws_daily.append(["판매일자", "판매건수", "판매금액", "할인액", "환불건수", "환불금액",
+                             "온라인 건수", "온라인 금액", "오프라인 건수", "오프라인 금액"])
+            for summary in SalesService.get_daily_summaries(current_user.store_id, start_date, end_date, sale_total):
+                ws_daily.append([
+                    summary.sale_date.strftime('%Y-%m-%d'),
+                    summary.sale_count,
+                    summary.total_amount,
+                    summary.discount_amount,
+                    summary.refund_count,
+                    summary.refund_amount,
+                    summary.online_count,
+                    summary.online_amount,
+                    summary.offline_count,
+                    summary.offline_amount
+                ])
         
         output = io.BytesIO()
         wb.save(output)
@@ -355,7 +394,7 @@ def export_daily_sales():
             output,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
             as_attachment=True,
-            download_name=f"Daily_Sales_{date_str}.xlsx"
+            download_name=f"Daily_Sales_{start_str}_{end_str}.xlsx" if is_period else f"Daily_Sales_{start_str}.xlsx"
         )
         
     except Exception as e:
@@ -430,8 +469,7 @@ def get_product_variants_for_sale():
     if not product_id: return jsonify({'status': 'error', 'message': 'ID 없음'}), 400
         
     try:
-        settings_query = Setting.query.filter_by(brand_id=current_user.current_brand_id).all()
-        brand_settings = {s.key: s.value for s in settings_query}
+        brand_settings = BrandSettings.get(current_user.current_brand_id)
 
         variants = db.session.query(Variant).filter_by(product_id=product_id).all()
         variants.sort(key=lambda v: get_sort_key(v, brand_settings))
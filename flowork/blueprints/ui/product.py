@@ -8,6 +8,7 @@ from flowork.models import db, Product, Variant, Store
 from flowork.utils import clean_string_upper
 from flowork.services.db import get_filter_options_from_db
 from flowork.services.product_service import ProductService
+from flowork.services.product_search import ProductSearch
 from . import ui_bp
 
 @ui_bp.route('/product/<int:product_id>')
@@ -48,11 +49,16 @@ def stock_overview():
     
     try:
         # 서비스 호출로 로직 위임
-        data = ProductService.get_stock_overview_matrix(current_user.current_brand_id)
+        # 수량 데이터는 화면이 /api/stock_overview 로 보이는 구간만 요청
+        matrix = ProductService.get_stock_overview_matrix(current_user.current_brand_id)
+        categories, years = matrix.filter_options()
 
         context = {
             'active_page': 'stock_overview',
-            **data # all_stores, all_variants, stock_matrix 포함
+            'categories': categories,
+            'years': years,
+            'total_variants': matrix.shape[0],
+            'total_stores': matrix.shape[1]
         }
         return render_template('stock_overview.html', **context)
 
@@ -95,9 +101,9 @@ def list_page():
         variant_filters = []
         
         if search_params['product_name']:
-            query = query.filter(Product.product_name_cleaned.like(f"%{clean_string_upper(search_params['product_name'])}%"))
+            query = query.filter(ProductSearch.criterion(current_brand_id, search_params['product_name'], ('name',)))
         if search_params['product_number']:
-            query = query.filter(Product.product_number_cleaned.like(f"%{clean_string_upper(search_params['product_number'])}%"))
+            query = query.filter(ProductSearch.criterion(current_brand_id, search_params['product_number'], ('number',)))
         if search_params['item_category']:
             query = query.filter(Product.item_category == search_params['item_category'])
         if search_params['release_year']:
@@ -1,9 +1,9 @@
 from flask import render_template, request, abort
 from flask_login import login_required, current_user
-from sqlalchemy import func
 from datetime import date, datetime
 
-from flowork.models import db, Sale, SaleItem
+from flowork.models import Sale
+from flowork.services.sales_service import SalesService
 from . import ui_bp
 
 @ui_bp.route('/sales')
@@ -39,35 +39,14 @@ def sales_record():
     # 3. 리스트 조회 (최신순 페이징)
     pagination = query.order_by(Sale.created_at.desc()).paginate(page=page, per_page=20, error_out=False)
     
-    # 4. 통계 집계 (유효한 매출 기준: status='valid')
-    # (환불된 건은 매출 통계에서 제외)
-    
-    # 4-1. 총 판매 금액 & 건수
-    stats_query = db.session.query(
-        func.sum(Sale.total_amount),
-        func.count(Sale.id)
-    ).filter(
-        Sale.store_id == current_user.store_id,
-        Sale.sale_date >= start_date,
-        Sale.sale_date <= end_date,
-        Sale.status == 'valid'
-    )
-    total_amount, total_count = stats_query.first()
-    
-    # 4-2. 총 할인 금액 (SaleItem join 필요, 수량 고려)
-    total_discount = db.session.query(
-        func.sum(SaleItem.discount_amount * SaleItem.quantity)
-    ).join(Sale).filter(
-        Sale.store_id == current_user.store_id,
-        Sale.sale_date >= start_date,
-        Sale.sale_date <= end_date,
-        Sale.status == 'valid'
-    ).scalar()
-    
+    # 4. 통계 집계 (유효한 매출 기준: status='valid', 환불된 건은 제외)
+    # 하루 조회는 판매 데이터를 직접 집계하고, 그보다 긴 기간은 일자별 집계 테이블을 사용
+    # (집계 건수가 페이징 전체 건수와 다르면 집계가 없거나 일부만 있는 기간이므로 직접 집계)
+    summary = SalesService.get_period_summary(current_user.store_id, start_date, end_date, sale_total=pagination.total)
     total_summary = {
-        'total_amount': int(total_amount or 0),
-        'total_discount': int(total_discount or 0),
-        'total_count': int(total_count or 0)
+        'total_amount': summary['total_amount'],
+        'total_discount': summary['discount_amount'],
+        'total_count': summary['sale_count']
     }
     
     return render_template(
@@ -0,0 +1,45 @@
+from kombu import Queue
+from celery.schedules import crontab
+from flowork.constants import TaskPriority
+
+def queue_settings(config):
+    """
+    작업 종류별 큐/라우팅/선반입 설정.
+    - images: 분 단위 CPU 작업 (이미지 처리) / inventory: DB 작업 (재고 업로드, DB 가져오기) / default: 나머지
+    - 긴 작업이 한 프로세스에 여러 개 예약되어 짧은 작업을 막지 않도록 선반입은 프로세스당 1개
+    - 같은 큐 안에서는 매장 업로드가 본사 대량 업로드보다 먼저 처리되도록 우선순위 사용 (Redis 브로커)
+    - 재고 작업(acks_late)은 실행 시간 제한을 두고, Redis visibility_timeout을 그보다 길게 설정해 실행 중 재전달 방지
+    - 주기 작업(celery beat): 영업시간 외에 브랜드 판매 분석 데이터 추출
+    """
+    default_queue = config.get('CELERY_DEFAULT_QUEUE', 'default')
+    inventory_queue = config.get('CELERY_INVENTORY_QUEUE', 'inventory')
+    image_queue = config.get('CELERY_IMAGE_QUEUE', 'images')
+    inventory_time_limit = config.get('CELERY_INVENTORY_TIME_LIMIT', 4 * 3600)
+
+    return {
+        'task_queues': (Queue(default_queue), Queue(inventory_queue), Queue(image_queue)),
+        'task_default_queue': default_queue,
+        'task_routes': {
+            'flowork.celery_tasks.task_process_images': {'queue': image_queue},
+            'flowork.celery_tasks.task_upsert_inventory': {'queue': inventory_queue},
+            'flowork.celery_tasks.task_import_db': {'queue': inventory_queue},
+        },
+        'task_annotations': {
+            'flowork.celery_tasks.task_upsert_inventory': {'time_limit': inventory_time_limit},
+            'flowork.celery_tasks.task_import_db': {'time_limit': inventory_time_limit},
+        },
+        'task_default_priority': TaskPriority.DEFAULT,
+        'worker_prefetch_multiplier': config.get('CELERY_WORKER_PREFETCH_MULTIPLIER', 1),
+        'broker_transport_options': {
+            'queue_order_strategy': 'priority',
+            'priority_steps': TaskPriority.STEPS,
+            'visibility_timeout': inventory_time_limit + 3600,
+        },
+        'beat_schedule': {
+            'refresh-sales-analytics': {
+                'task': 'flowork.celery_tasks.task_refresh_sales_analytics',
+                'schedule': crontab(hour=config.get('SALES_ANALYTICS_REFRESH_HOUR', 4), minute=0),
+                'options': {'queue': default_queue, 'priority': TaskPriority.HQ_BULK},
+            },
+        },
+    }
@@ -2,25 +2,32 @@ import traceback
 import os
 import gc
 from flask import current_app
-from flowork.extensions import celery
-from flowork.services.excel import parse_stock_excel, verify_stock_excel
+from celery.exceptions import Ignore
+from sqlalchemy.exc import OperationalError, InterfaceError
+from flowork.extensions import celery, db
+from flowork.models import Brand
+from flowork.services.excel import parse_stock_excel, verify_stock_excel, open_stock_excel_stream
 from flowork.services.inventory_service import InventoryService
-from flowork.services.image_process import process_style_code_group
+from flowork.services.inventory_jobs import InventoryJob, iter_chunks
+from flowork.services.sales_analytics import SalesAnalytics
 
 @celery.task(bind=True)
 def task_process_images(self, brand_id, style_codes, options):
     total = len(style_codes)
-    success_count = 0
-    results = []
 
     try:
-        for i, code in enumerate(style_codes):
-            self.update_state(state='PROGRESS', meta={'current': i, 'total': total, 'percent': int((i / total) * 100)})
-            
-            success, msg = process_style_code_group(brand_id, code, options=options)
-            results.append({'code': code, 'success': success, 'message': msg})
-            if success:
-                success_count += 1
+        # 이미지 처리 모듈(PIL/aiohttp/numpy)은 이미지 작업을 받는 워커에서만 로드 (웹/재고 워커 시작 비용 절감)
+        from flowork.services.image_process import process_style_codes
+
+        self.update_state(state='PROGRESS', meta={'current': 0, 'total': total, 'percent': 0})
+
+        # 품번 단위 파이프라인: 다운로드/CPU 단계가 품번 간에 겹쳐 진행되며, 품번이 끝날 때마다 진행률 보고
+        def progress_callback(current, total):
+            self.update_state(state='PROGRESS', meta={'current': current, 'total': total, 'percent': int((current / total) * 100)})
+
+        outcomes = process_style_codes(brand_id, style_codes, options=options, progress_callback=progress_callback)
+        results = [{'code': code, 'success': success, 'message': msg} for code, success, msg in outcomes]
+        success_count = sum(1 for r in results if r['success'])
         
         return {
             'status': 'completed',
@@ -41,57 +48,96 @@ def task_process_images(self, brand_id, style_codes, options):
         # [신규] 이미지 처리 후 메모리 강제 회수 (누수 방지)
         gc.collect()
 
-@celery.task(bind=True)
+def _inventory_job(task):
+    # 재시도/재전달되어도 작업 ID가 같으므로 같은 중간 파일과 체크포인트를 사용
+    job = InventoryJob(task.request.id, os.path.join(current_app.config['UPLOAD_FOLDER'], 'inventory_jobs'))
+    # 같은 작업이 다른 워커에서 처리 중이면 (브로커 재전달) 이 사본은 결과를 남기지 않고 종료
+    if not job.acquire_lock():
+        print(f"Inventory job {task.request.id} is already running, ignoring duplicate delivery")
+        raise Ignore()
+    return job
+
+def _cleanup_inventory_job(job, file_path):
+    job.remove()
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+# 워커 재시작/DB 연결 끊김 등 다시 실행하면 이어서 처리할 수 있는 오류
+RETRYABLE_ERRORS = (OperationalError, InterfaceError)
+
+# acks_late + reject_on_worker_lost: 처리 중 워커가 종료되면 메시지가 다시 전달되어 체크포인트부터 재개
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=3, default_retry_delay=30)
 def task_upsert_inventory(self, file_path, form_data, upload_mode, brand_id, target_store_id, excluded_indices, allow_create):
+    job = _inventory_job(self)
     try:
-        # 1. 엑셀 파싱 (Pure Logic)
-        records, error_msg = parse_stock_excel(
-            file_path, form_data, upload_mode, brand_id, excluded_indices
-        )
-        
-        if error_msg or not records:
-            return {'status': 'error', 'message': error_msg or "데이터 파싱 실패"}
+        # 1. 파싱 단계: 엑셀을 스트리밍으로 정제해 묶음별 중간 파일로 저장 (이미 저장된 작업이면 건너뜀)
+        if not job.parsed:
+            batches, total_rows, error_msg = open_stock_excel_stream(
+                file_path, form_data, upload_mode, brand_id, excluded_indices
+            )
 
-        # 2. DB 업데이트 (Service Logic)
+            if error_msg:
+                _cleanup_inventory_job(job, file_path)
+                return {'status': 'error', 'message': error_msg}
+
+            # 묶음 안의 중복 바코드는 스트림에서, 묶음 사이의 중복은 여기서 마지막 행 기준으로 제거
+            job.write_chunks(batches, dedupe_key='barcode_cleaned')
+            os.remove(file_path)
+
+        # 2. 반영 단계: 묶음마다 커밋 + 체크포인트 (재시도 시 마지막으로 커밋된 묶음 다음부터)
         def progress_callback(current, total):
             self.update_state(state='PROGRESS', meta={'current': current, 'total': total, 'percent': int((current / total) * 100) if total > 0 else 0})
 
-        cnt_update, cnt_var, message = InventoryService.process_stock_data(
-            records, upload_mode, brand_id, target_store_id, allow_create, progress_callback
+        cnt_update, cnt_var, message = InventoryService.apply_stock_job(
+            job, upload_mode, brand_id, target_store_id, allow_create, progress_callback
         )
-        
+        _cleanup_inventory_job(job, file_path)
+
         return {
             'status': 'completed',
             'result': {'message': message}
         }
+    except RETRYABLE_ERRORS as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        _cleanup_inventory_job(job, file_path)
+        return {'status': 'error', 'message': str(e)}
     except Exception as e:
         traceback.print_exc()
+        _cleanup_inventory_job(job, file_path)
         return {'status': 'error', 'message': str(e)}
     finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        job.release_lock()
         # [신규] 대용량 엑셀 처리 후에도 메모리 정리
         gc.collect()
 
-@celery.task(bind=True)
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=3, default_retry_delay=30)
 def task_import_db(self, file_path, form_data, brand_id):
+    job = _inventory_job(self)
     try:
-        # 1. 엑셀 파싱
-        records, error_msg = parse_stock_excel(
-            file_path, form_data, 'db', brand_id, None
-        )
-        
-        if error_msg or not records:
-            return {'status': 'error', 'message': error_msg or "데이터 파싱 실패"}
+        # 1. 엑셀 파싱 후 묶음별 중간 파일로 저장 (이미 저장된 작업이면 건너뜀)
+        if not job.parsed:
+            records, error_msg = parse_stock_excel(
+                file_path, form_data, 'db', brand_id, None
+            )
+
+            if error_msg or not records:
+                _cleanup_inventory_job(job, file_path)
+                return {'status': 'error', 'message': error_msg or "데이터 파싱 실패"}
 
-        # 2. DB 전체 초기화 및 삽입
+            job.write_chunks(iter_chunks(records))
+            del records
+            os.remove(file_path)
+
+        # 2. 브랜드 카탈로그 초기화 후 묶음 단위 삽입 (재시도 시 초기화는 건너뛰고 이어서 삽입)
         def progress_callback(current, total):
             self.update_state(state='PROGRESS', meta={'current': current, 'total': total, 'percent': int((current / total) * 100) if total > 0 else 0})
 
-        success, message = InventoryService.full_import_db(
-            records, brand_id, progress_callback
+        success, message = InventoryService.apply_import_job(
+            job, brand_id, progress_callback
         )
-        
+        _cleanup_inventory_job(job, file_path)
+
         if success:
             return {
                 'status': 'completed',
@@ -102,11 +148,39 @@ def task_import_db(self, file_path, form_data, brand_id):
                 'status': 'error',
                 'message': message
             }
+    except RETRYABLE_ERRORS as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        _cleanup_inventory_job(job, file_path)
+        return {'status': 'error', 'message': str(e)}
     except Exception as e:
         traceback.print_exc()
+        _cleanup_inventory_job(job, file_path)
         return {'status': 'error', 'message': str(e)}
     finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        job.release_lock()
         # [신규] 메모리 정리
         gc.collect()
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=300)
+def task_refresh_sales_analytics(self, brand_id=None, months=None):
+    """브랜드 판매 분석 컬럼 저장소 갱신 (brand_id가 없으면 전체 브랜드, months가 없으면 지난 달/이번 달)"""
+    try:
+        brand_ids = [brand_id] if brand_id else [b for (b,) in db.session.query(Brand.id).order_by(Brand.id)]
+        rows = 0
+        for i, b_id in enumerate(brand_ids):
+            rows += sum(SalesAnalytics.for_brand(b_id).refresh(months).values())
+            self.update_state(state='PROGRESS', meta={'current': i + 1, 'total': len(brand_ids), 'percent': int((i + 1) / len(brand_ids) * 100)})
+        return {
+            'status': 'completed',
+            'result': {'message': f"판매 분석 데이터 갱신 완료: {len(brand_ids)}개 브랜드, {rows}행"}
+        }
+    except RETRYABLE_ERRORS as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        return {'status': 'error', 'message': str(e)}
+    except Exception as e:
+        traceback.print_exc()
+        return {'status': 'error', 'message': str(e)}
+    finally:
+        gc.collect()
@@ -1,6 +1,23 @@
+import sys
+from celery.signals import worker_process_init, worker_process_shutdown
 from flowork import create_app
 from flowork.extensions import celery
 from config import Config
 
 app = create_app(Config)
-app.app_context().push()
\ No newline at end of file
+app.app_context().push()
+
+@worker_process_init.connect
+def prewarm_image_worker(**kwargs):
+    # 이미지 큐(-Q images)를 받는 워커만 이미지 모듈/ONNX 세션을 프로세스 시작 시 로드 (첫 작업 지연 제거)
+    if app.config['CELERY_IMAGE_QUEUE'] not in celery.amqp.queues.consume_from:
+        return
+    from flowork.services.image_process import warm_up_image_workers
+    with app.app_context():
+        warm_up_image_workers()
+
+@worker_process_shutdown.connect
+def shutdown_image_worker(**kwargs):
+    image_process = sys.modules.get('flowork.services.image_process')
+    if image_process:
+        image_process._shutdown_process_pool()
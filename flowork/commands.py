@@ -1,10 +1,14 @@
 import click
+from datetime import datetime
 from flask.cli import with_appcontext
 from .extensions import db
+from .services.product_search import ProductSearch
+from .services.sales_service import SalesService
+from .services.sales_analytics import SalesAnalytics, months_between
 # [수정] 모든 모델을 가져오도록 변경 (새로 추가된 모델들이 누락되지 않게)
 from .models import (
     Brand, Store, User, Product, Variant, StoreStock, StockHistory,
-    Order, OrderProcessing, Sale, SaleItem,
+    Order, OrderProcessing, Sale, SaleItem, SaleDailyCounter, DailySalesSummary,
     Staff, ScheduleEvent, Setting, Announcement, Comment,
     StockTransfer, Customer, Repair,
     Attendance, CompetitorBrand, CompetitorSale,
@@ -29,4 +33,53 @@ def update_db_command():
     """삭제 없이 누락된 새 테이블만 생성합니다."""
     print("Checking and creating missing tables...")
     db.create_all()
-    print("✅ DB 업데이트 완료. (누락된 테이블 생성됨)")
\ No newline at end of file
+    print("✅ DB 업데이트 완료. (누락된 테이블 생성됨)")
+
+@click.command("create-search-index")
+@with_appcontext
+def create_search_index_command():
+    """상품 검색용 pg_trgm GIN 인덱스를 생성합니다. (PostgreSQL 전용)"""
+    print("Creating pg_trgm search indexes...")
+    try:
+        if ProductSearch.create_indexes():
+            print("✅ 검색 인덱스 생성 완료.")
+        else:
+            print("⚠️ PostgreSQL이 아니므로 건너뜁니다. (메모리 n-gram 인덱스를 사용)")
+    except Exception as e:
+        print(f"🚨 검색 인덱스 생성 실패 (pg_trgm 확장 설치 여부 확인): {e}")
+
+@click.command("rebuild-sales-summary")
+@click.option('--store-id', type=int, default=None, help='매장 ID (생략 시 전체 매장)')
+@click.option('--start-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='시작일 (YYYY-MM-DD)')
+@click.option('--end-date', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='종료일 (YYYY-MM-DD)')
+@with_appcontext
+def rebuild_sales_summary_command(store_id, start_date, end_date):
+    """판매 데이터로 일자별 판매 집계(daily_sales_summary)를 다시 계산합니다. (update-db 후 최초 1회 실행)"""
+    print("Rebuilding daily sales summary...")
+    try:
+        rows = SalesService.rebuild_daily_summary(
+            store_id,
+            start_date.date() if start_date else None,
+            end_date.date() if end_date else None
+        )
+        print(f"✅ 일자별 판매 집계 재계산 완료. ({rows}개 매장/일자)")
+    except Exception as e:
+        print(f"🚨 일자별 판매 집계 재계산 실패: {e}")
+
+@click.command("extract-sales-analytics")
+@click.option('--brand-id', type=int, default=None, help='브랜드 ID (생략 시 전체 브랜드)')
+@click.option('--start-month', type=click.DateTime(formats=['%Y-%m']), default=None, help='시작 월 (YYYY-MM)')
+@click.option('--end-month', type=click.DateTime(formats=['%Y-%m']), default=None, help='종료 월 (YYYY-MM, 기본: 이번 달)')
+@with_appcontext
+def extract_sales_analytics_command(brand_id, start_month, end_month):
+    """브랜드 판매 분석용 컬럼 저장소를 추출합니다. (시작 월 생략 시 지난 달/이번 달, 과거 전체는 --start-month 지정)"""
+    months = None
+    if start_month:
+        months = months_between(start_month.date(), (end_month or datetime.now()).date())
+    brand_ids = [brand_id] if brand_id else [b.id for b in Brand.query.order_by(Brand.id)]
+    for b_id in brand_ids:
+        try:
+            counts = SalesAnalytics.for_brand(b_id).refresh(months)
+            print(f"✅ 브랜드 {b_id}: {len(counts)}개월, {sum(counts.values())}행 추출")
+        except Exception as e:
+            print(f"🚨 브랜드 {b_id} 판매 분석 데이터 추출 실패: {e}")
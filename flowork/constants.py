@@ -58,4 +58,12 @@ class TransferStatus:
     SHIPPED = 'SHIPPED'     # 출고됨 (이동중)
     RECEIVED = 'RECEIVED'   # 입고됨 (완료)
     REJECTED = 'REJECTED'   # 거절됨
-    CANCELLED = 'CANCELLED' # 취소됨
\ No newline at end of file
+    CANCELLED = 'CANCELLED' # 취소됨
+
+class TaskPriority:
+    """Celery 작업 우선순위 (Redis 브로커는 숫자가 작을수록 먼저 처리)"""
+    STORE_UPLOAD = 0 # 매장 재고 업로드 (매장 직원이 결과를 기다림)
+    DEFAULT = 3      # 기타 작업
+    HQ_BULK = 6      # 본사 대량 업로드/전체 DB 가져오기
+
+    STEPS = [0, 3, 6, 9]
@@ -2,7 +2,7 @@ from ..extensions import db
 from .auth import Brand, User
 from .store import Store, Staff, ScheduleEvent, Setting, Announcement, Comment
 from .product import Product, Variant, StoreStock, StockHistory
-from .sales import Order, OrderProcessing, Sale, SaleItem
+from .sales import Order, OrderProcessing, Sale, SaleItem, SaleDailyCounter, DailySalesSummary
 from .stock_transfer import StockTransfer
 from .crm import Customer, Repair
 from .operations import Attendance, CompetitorBrand, CompetitorSale
@@ -70,6 +70,33 @@ class Sale(db.Model):
     def receipt_number(self):
         return f"{self.sale_date.strftime('%Y-%m-%d')} {self.daily_number:04d}"
 
+class SaleDailyCounter(db.Model):
+    """매장/일자별 마지막 영수증 번호 (판매 등록 시 UPDATE ... RETURNING으로 발급)"""
+    __tablename__ = 'sale_daily_counters'
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.id'), primary_key=True)
+    sale_date = db.Column(db.Date, primary_key=True)
+    last_number = db.Column(db.Integer, nullable=False, default=0)
+
+class DailySalesSummary(db.Model):
+    """
+    매장/일자별 판매 집계 (판매/환불과 같은 트랜잭션에서 SalesService가 갱신, flask rebuild-sales-summary로 재계산)
+    - 판매 건수/금액/할인액/온라인·오프라인 구분: 유효(valid) 판매 기준 (부분 환불은 금액에서 차감)
+    - 환불 건수/금액: 전체 환불 상태가 된 판매 기준
+    환불도 환불한 날이 아니라 원래 판매일에 반영됩니다.
+    """
+    __tablename__ = 'daily_sales_summary'
+    store_id = db.Column(db.Integer, db.ForeignKey('stores.id'), primary_key=True)
+    sale_date = db.Column(db.Date, primary_key=True)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    discount_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    refund_count = db.Column(db.Integer, nullable=False, default=0)
+    refund_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    online_count = db.Column(db.Integer, nullable=False, default=0)
+    online_amount = db.Column(db.BigInteger, nullable=False, default=0)
+    offline_count = db.Column(db.Integer, nullable=False, default=0)
+    offline_amount = db.Column(db.BigInteger, nullable=False, default=0)
+
 class SaleItem(db.Model):
     __tablename__ = 'sale_items'
     id = db.Column(db.Integer, primary_key=True)
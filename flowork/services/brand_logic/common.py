@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+
+def str_column(df, name):
+    """행 단위 로직의 str(row.get(name, ''))과 같은 값을 열 단위로 반환 (None -> 'None', NaN -> 'nan')"""
+    if name not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    return df[name].astype(object).map(str)
+
+def item_category_or_default(df, default='기타'):
+    """엑셀의 item_category 값이 비어있지 않으면 그 값을, 아니면 default를 반환"""
+    val = str_column(df, 'item_category').str.strip()
+    valid = (val != '') & ~val.isin(['nan', 'None'])
+    return pd.Series(np.where(valid, val, default), index=df.index, dtype=object)
@@ -1,4 +1,7 @@
 # fileName: mingdezzi/flowork/FLOWORK-c3d0a854c8688593f920b4aabbc4e40547365c57/flowork/services/brand_logic/eider.py
+import numpy as np
+import pandas as pd
+from .common import str_column, item_category_or_default
 
 # [Refactor] 하드코딩된 로직을 매핑 테이블로 분리
 # 추후 DB의 Settings 테이블이나 JSON 설정 파일에서 로드하도록 개선 가능
@@ -50,4 +53,38 @@ def get_db_item_category(row, mapping_config=None):
             return mapping_map.get(code_char, default_value)
     
     val = str(row.get('item_category', '')).strip()
-    return val if val and val not in ['nan', 'None'] else '기타'
\ No newline at end of file
+    return val if val and val not in ['nan', 'None'] else '기타'
+
+# --- 열 단위(Series) 버전: transformer가 행 단위 apply 대신 우선 사용 ---
+
+def _product_code_series(df):
+    return str_column(df, 'product_number').str.strip().str.upper()
+
+def get_size_mapping_key_series(df):
+    pn = _product_code_series(df)
+    first = pn.str.get(0).fillna('')
+    gender = pn.str.get(1).fillna('')
+    code = pn.str.get(5).fillna('')
+
+    result = code.map(CATEGORY_MAP)
+    result = np.where(result.notna(), result, item_category_or_default(df))
+    result = np.where(code == "3", np.where(gender == "M", "남성하의", "여성하의"), result)
+    result = np.where(first == "J", "키즈", result)
+    result = np.where(pn == '', '기타', result)
+    return pd.Series(result, index=df.index, dtype=object)
+
+def get_db_item_category_series(df, mapping_config=None):
+    product_code = _product_code_series(df)
+    result = item_category_or_default(df)
+
+    if mapping_config:
+        target_index = mapping_config.get('INDEX', 5)
+        mapping_map = mapping_config.get('MAP', {})
+        default_value = mapping_config.get('DEFAULT', '기타')
+
+        code_char = product_code.str.get(target_index)
+        mapped = code_char.map(mapping_map).where(code_char.isin(list(mapping_map.keys())), default_value)
+        result = np.where(product_code.str.len() > target_index, mapped, result)
+
+    result = np.where(product_code.str.startswith("J"), "키즈", result)
+    return pd.Series(result, index=df.index, dtype=object)
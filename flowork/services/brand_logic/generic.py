@@ -1,3 +1,5 @@
+from .common import item_category_or_default
+
 def get_size_mapping_key(row):
     """
     [범용] 사이즈 매핑 키 결정
@@ -16,4 +18,12 @@ def get_db_item_category(row, mapping_config=None):
     val = str(row.get('item_category', '')).strip()
     if val and val not in ['nan', 'None', '']:
         return val
-    return '기타'
\ No newline at end of file
+    return '기타'
+
+def get_size_mapping_key_series(df):
+    """[범용] get_size_mapping_key의 열 단위 버전"""
+    return item_category_or_default(df)
+
+def get_db_item_category_series(df, mapping_config=None):
+    """[범용] get_db_item_category의 열 단위 버전"""
+    return item_category_or_default(df)
@@ -0,0 +1,112 @@
+import json
+import time
+import uuid
+import threading
+from flowork.extensions import cache
+from flowork.models import Setting
+
+# Redis 버전 키를 확인하지 못할 때를 대비한 프로세스 내 캐시 최대 보관 시간 (초)
+LOCAL_MAX_AGE = 300
+
+def _version_key(brand_id):
+    return f'brand_settings_version_{brand_id}'
+
+def _parse_json(raw, default):
+    if not raw:
+        return default
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return default
+    return value if isinstance(value, type(default)) else default
+
+class BrandConfig(dict):
+    """
+    브랜드 설정 원본(key -> value 문자열) dict에 JSON 설정을 미리 파싱한 속성을 더한 객체입니다.
+    기존 brand_settings dict 자리에 그대로 넘길 수 있으며, 여러 요청이 공유하므로 수정하지 않습니다.
+    """
+    def __init__(self, raw_settings):
+        super().__init__(raw_settings)
+        # 매트릭스 변환용 매핑 설정의 파싱 오류 (key -> 메시지). 잘못된 설정으로 매핑 없이 업로드되지 않도록 업로드 시 오류 처리
+        self.errors = {}
+        self.size_mapping = self._parse_mapping('SIZE_MAPPING')
+        self.category_mapping_rule = self._parse_mapping('CATEGORY_MAPPING_RULE')
+        self.barcode_format = raw_settings.get('BARCODE_FORMAT') or None
+
+        size_order = _parse_json(raw_settings.get('SIZE_SORT_ORDER'), [])
+        self.size_sort_map = {str(s).upper(): i for i, s in enumerate(size_order)}
+
+    def _parse_mapping(self, key):
+        raw = self.get(key)
+        if not raw:
+            return {}
+        try:
+            value = json.loads(raw)
+        except (TypeError, ValueError) as e:
+            self.errors[key] = f"{key} 설정 JSON 오류: {e}"
+        else:
+            if isinstance(value, dict):
+                return value
+            self.errors[key] = f"{key} 설정은 JSON 객체여야 합니다."
+        print(f"BrandConfig parse error: {self.errors[key]}")
+        return {}
+
+    @property
+    def mapping_error(self):
+        """매트릭스 업로드를 막아야 하는 매핑 설정 오류 메시지 (없으면 None)"""
+        return ', '.join(self.errors.values()) or None
+
+class BrandSettings:
+    """
+    브랜드별 Setting 조회/파싱 결과를 워커 프로세스 안에 캐싱합니다.
+    설정이 바뀌면 invalidate()가 Redis의 버전 키를 갱신하고,
+    각 워커는 다음 조회 시 버전이 달라진 것을 보고 자신의 사본을 다시 읽습니다.
+    """
+    _local = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(brand_id):
+        if not brand_id:
+            return BrandConfig({})
+
+        version = BrandSettings._current_version(brand_id)
+        now = time.monotonic()
+
+        if version is not None:
+            entry = BrandSettings._local.get(brand_id)
+            if entry and entry[0] == version and now - entry[1] < LOCAL_MAX_AGE:
+                return entry[2]
+
+        settings_query = Setting.query.filter_by(brand_id=brand_id).all()
+        config = BrandConfig({s.key: s.value for s in settings_query})
+
+        # 버전을 알 수 없으면(Redis 장애) 매번 DB에서 읽도록 로컬 캐시에 넣지 않음
+        if version is not None:
+            with BrandSettings._lock:
+                BrandSettings._local[brand_id] = (version, now, config)
+        return config
+
+    @staticmethod
+    def invalidate(brand_id):
+        """설정 변경 커밋 후 호출: 모든 워커의 캐시를 무효화합니다."""
+        with BrandSettings._lock:
+            BrandSettings._local.pop(brand_id, None)
+        try:
+            cache.set(_version_key(brand_id), uuid.uuid4().hex, timeout=0)
+        except Exception as e:
+            print(f"BrandSettings version bump failed (brand {brand_id}): {e}")
+
+    @staticmethod
+    def _current_version(brand_id):
+        key = _version_key(brand_id)
+        try:
+            version = cache.get(key)
+            if version is None:
+                # 최초 조회(또는 Redis 초기화) 시 버전을 만든다. 동시에 만든 경우 먼저 쓴 값을 사용
+                cache.add(key, uuid.uuid4().hex, timeout=0)
+                version = cache.get(key)
+            return version
+        except Exception as e:
+            print(f"BrandSettings version lookup failed (brand {brand_id}): {e}")
+            return None
@@ -0,0 +1,114 @@
+import json
+import asyncio
+import aiohttp
+from flowork.extensions import db
+from flowork.models import Setting
+from flowork.services.brand_settings import BrandSettings
+
+PLAN_SETTING_KEY = 'IMAGE_DOWNLOAD_PLAN'
+# 이미지 번호 표기 후보 (01, 1, 001)
+NUM_FORMATS = ['02d', 'd', '03d']
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+class DownloadPlanner:
+    """
+    브랜드/이미지 종류(DF, DM, DG)별로 실제로 이미지가 있었던 URL 패턴과 번호 표기를 기억해
+    다음 다운로드 때 그 조합을 먼저 시도하도록 후보 순서를 정합니다.
+    학습 결과는 브랜드 설정(IMAGE_DOWNLOAD_PLAN)에 저장됩니다.
+    """
+    def __init__(self, brand_id, plan=None):
+        self.brand_id = brand_id
+        self.plan = plan or {}
+        self.dirty = False
+
+    @staticmethod
+    def load(brand_id):
+        raw = BrandSettings.get(brand_id).get(PLAN_SETTING_KEY)
+        try:
+            plan = json.loads(raw) if raw else {}
+        except (TypeError, ValueError):
+            plan = {}
+        return DownloadPlanner(brand_id, plan if isinstance(plan, dict) else {})
+
+    def learned(self, img_type, patterns):
+        """저장된 (패턴, 번호 표기). 패턴 설정이 바뀌어 더 이상 없는 조합이면 None"""
+        entry = self.plan.get(img_type)
+        if entry and entry.get('pattern') in patterns and entry.get('num_format') in NUM_FORMATS:
+            return entry['pattern'], entry['num_format']
+        return None
+
+    def candidates(self, img_type, patterns):
+        """시도할 (패턴, 번호 표기) 목록. 학습된 조합이 맨 앞"""
+        combos = [(pattern, fmt) for fmt in NUM_FORMATS for pattern in patterns]
+        learned = self.learned(img_type, patterns)
+        if learned:
+            combos.remove(learned)
+            combos.insert(0, learned)
+        return combos
+
+    def record(self, img_type, pattern, num_format):
+        entry = self.plan.get(img_type)
+        if entry and entry.get('pattern') == pattern and entry.get('num_format') == num_format:
+            return
+        self.plan[img_type] = {'pattern': pattern, 'num_format': num_format}
+        self.dirty = True
+
+    def save(self):
+        """학습 결과가 바뀐 경우에만 브랜드 설정에 저장합니다."""
+        if not self.dirty:
+            return
+        try:
+            value = json.dumps(self.plan, ensure_ascii=False)
+            setting = Setting.query.filter_by(brand_id=self.brand_id, key=PLAN_SETTING_KEY).first()
+            if setting:
+                setting.value = value
+            else:
+                db.session.add(Setting(brand_id=self.brand_id, key=PLAN_SETTING_KEY, value=value))
+            db.session.commit()
+            BrandSettings.invalidate(self.brand_id)
+            self.dirty = False
+        except Exception as e:
+            db.session.rollback()
+            print(f"Download plan save error (brand {self.brand_id}): {e}")
+
+async def probe_url(session, url):
+    """본문 없이 이미지 존재 여부만 확인 (HEAD, 지원하지 않는 서버는 1바이트 Range GET)"""
+    try:
+        async with session.head(url, timeout=PROBE_TIMEOUT, allow_redirects=True) as response:
+            if response.status == 200:
+                return True
+            if response.status not in (405, 501):
+                return False
+        async with session.get(url, timeout=PROBE_TIMEOUT, headers={'Range': 'bytes=0-0'}) as response:
+            return response.status in (200, 206)
+    except Exception:
+        return False
+
+async def probe_first(session, urls):
+    """
+    여러 후보 URL을 동시에 확인해, 이미지가 있는 후보 중 순서가 가장 앞선 URL의 인덱스를 반환합니다. (없으면 None)
+    응답이 먼저 온 후보가 아니라 후보 순서로 고르므로, 확인된 후보보다 앞선 후보의 결과는 끝까지 기다리고
+    뒤 순서 후보는 즉시 취소합니다. (네트워크 타이밍과 관계없이 같은 조합/파일명을 사용)
+    """
+    if not urls:
+        return None
+    tasks = {asyncio.ensure_future(probe_url(session, url)): i for i, url in enumerate(urls)}
+    pending = set(tasks)
+    found = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            hits = [tasks[t] for t in done if t.result()]
+            if hits:
+                found = min(hits + ([found] if found is not None else []))
+                for t in pending:
+                    if tasks[t] > found:
+                        t.cancel()
+                pending = {t for t in pending if tasks[t] < found}
+    finally:
+        leftover = [t for t in tasks if not t.done()]
+        for t in leftover:
+            t.cancel()
+        if leftover:
+            await asyncio.gather(*leftover, return_exceptions=True)
+    return found
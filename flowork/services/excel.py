@@ -1,15 +1,21 @@
 import pandas as pd
 import numpy as np
+import openpyxl
 from openpyxl.utils import column_index_from_string
-from flowork.utils import clean_string_upper, get_choseong, generate_barcode
+from flowork.utils import get_choseong, clean_string_upper_series, generate_barcode_series
 import traceback
 import json
-from flowork.models import db, Product, Variant, StoreStock, Setting
+from flowork.models import db, Product, Variant, StoreStock
+from flowork.services.brand_settings import BrandSettings
 
 try:
-    from flowork.services.transformer import transform_horizontal_to_vertical
+    from flowork.services.transformer import transform_horizontal_to_vertical, transform_matrix_frame
 except ImportError:
     transform_horizontal_to_vertical = None
+    transform_matrix_frame = None
+
+# 스트리밍 파싱 시 한 번에 메모리에 올리는 엑셀 행 수
+STREAM_BATCH_SIZE = 5000
 
 def _get_column_indices_from_form(form, field_map, strict=True):
     column_map_indices = {}
@@ -98,22 +104,20 @@ def _optimize_dataframe(df, brand_settings, upload_mode):
     
     mask_no_barcode = df['barcode'].isna() | (df['barcode'] == '')
     if mask_no_barcode.any():
-        df.loc[mask_no_barcode, 'barcode'] = df[mask_no_barcode].apply(
-            lambda row: generate_barcode(row.to_dict(), brand_settings), axis=1
-        )
+        df.loc[mask_no_barcode, 'barcode'] = generate_barcode_series(df[mask_no_barcode], brand_settings)
 
     df = df.dropna(subset=['barcode'])
     
-    df['product_number_cleaned'] = df['product_number'].apply(clean_string_upper)
-    df['barcode_cleaned'] = df['barcode'].apply(clean_string_upper)
+    df['product_number_cleaned'] = clean_string_upper_series(df['product_number'])
+    df['barcode_cleaned'] = clean_string_upper_series(df['barcode'])
     
     if 'color' in df.columns:
-        df['color_cleaned'] = df['color'].apply(clean_string_upper)
+        df['color_cleaned'] = clean_string_upper_series(df['color'])
     if 'size' in df.columns:
-        df['size_cleaned'] = df['size'].apply(clean_string_upper)
+        df['size_cleaned'] = clean_string_upper_series(df['size'])
     
     if 'product_name' in df.columns:
-        df['product_name_cleaned'] = df['product_name'].apply(clean_string_upper)
+        df['product_name_cleaned'] = clean_string_upper_series(df['product_name'])
         df['product_name_choseong'] = df['product_name'].apply(get_choseong)
     
     if 'is_favorite' not in df.columns:
@@ -154,50 +158,54 @@ def verify_stock_excel(file_path, form, upload_mode):
     except Exception as e:
         return {'status': 'error', 'message': f"검증 중 오류: {e}"}
 
+def _build_stock_field_map(form, upload_mode):
+    is_horizontal = form.get('is_horizontal') == 'on'
+
+    field_map = {
+        'product_number': ('col_pn', True),
+        'color': ('col_color', True),
+        'product_name': ('col_pname', False),
+        'release_year': ('col_year', False),
+        'item_category': ('col_category', False),
+        'original_price': ('col_oprice', False),
+        'sale_price': ('col_sprice', False),
+        'is_favorite': ('col_favorite', False)
+    }
+    
+    import_strategy = None
+
+    if upload_mode == 'hq':
+        if is_horizontal:
+            import_strategy = 'horizontal_matrix'
+        else:
+            field_map['size'] = ('col_size', True)
+            field_map['hq_stock'] = ('col_hq_stock', True)
+
+    elif upload_mode == 'store':
+        if is_horizontal:
+            import_strategy = 'horizontal_matrix'
+        else:
+            field_map['size'] = ('col_size', True)
+            field_map['store_stock'] = ('col_store_stock', True)
+    
+    elif upload_mode == 'db': # DB 전체 업로드 모드
+         if is_horizontal:
+            import_strategy = 'horizontal_matrix'
+         else:
+            field_map['size'] = ('col_size', True)
+            field_map['hq_stock'] = ('col_hq_stock', False) # 선택
+
+    return field_map, import_strategy
+
 def parse_stock_excel(file_path, form, upload_mode, brand_id, excluded_row_indices=None):
     """
     엑셀 파일을 읽어서 정제된 딕셔너리 리스트로 반환합니다.
     (DB 작업 없음)
     """
     try:
-        settings_query = Setting.query.filter_by(brand_id=brand_id).all()
-        brand_settings = {s.key: s.value for s in settings_query}
-        
-        is_horizontal = form.get('is_horizontal') == 'on'
-
-        field_map = {
-            'product_number': ('col_pn', True),
-            'color': ('col_color', True),
-            'product_name': ('col_pname', False),
-            'release_year': ('col_year', False),
-            'item_category': ('col_category', False),
-            'original_price': ('col_oprice', False),
-            'sale_price': ('col_sprice', False),
-            'is_favorite': ('col_favorite', False)
-        }
-        
-        import_strategy = None
-
-        if upload_mode == 'hq':
-            if is_horizontal:
-                import_strategy = 'horizontal_matrix'
-            else:
-                field_map['size'] = ('col_size', True)
-                field_map['hq_stock'] = ('col_hq_stock', True)
-
-        elif upload_mode == 'store':
-            if is_horizontal:
-                import_strategy = 'horizontal_matrix'
-            else:
-                field_map['size'] = ('col_size', True)
-                field_map['store_stock'] = ('col_store_stock', True)
+        brand_settings = BrandSettings.get(brand_id)
         
-        elif upload_mode == 'db': # DB 전체 업로드 모드
-             if is_horizontal:
-                import_strategy = 'horizontal_matrix'
-             else:
-                field_map['size'] = ('col_size', True)
-                field_map['hq_stock'] = ('col_hq_stock', False) # 선택
+        field_map, import_strategy = _build_stock_field_map(form, upload_mode)
 
         column_map_indices = _get_column_indices_from_form(form, field_map, strict=False)
 
@@ -205,8 +213,10 @@ def parse_stock_excel(file_path, form, upload_mode, brand_id, excluded_row_indic
             df = pd.DataFrame()
             if import_strategy == 'horizontal_matrix' and transform_horizontal_to_vertical:
                 try:
-                    size_conf = json.loads(brand_settings.get('SIZE_MAPPING', '{}'))
-                    cat_conf = json.loads(brand_settings.get('CATEGORY_MAPPING_RULE', '{}'))
+                    if brand_settings.mapping_error:
+                        raise ValueError(brand_settings.mapping_error)
+                    size_conf = brand_settings.size_mapping
+                    cat_conf = brand_settings.category_mapping_rule
                     df = transform_horizontal_to_vertical(f, size_conf, cat_conf, column_map_indices)
                     
                     if upload_mode == 'store' and 'hq_stock' in df.columns:
@@ -235,6 +245,154 @@ def parse_stock_excel(file_path, form, upload_mode, brand_id, excluded_row_indic
         traceback.print_exc()
         return None, f"파싱 오류: {e}"
 
+def _detect_csv_encoding(file_path):
+    with open(file_path, 'rb') as f:
+        head = f.read(64 * 1024)
+    try:
+        head.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # 블록 경계에서 잘린 멀티바이트 문자는 UTF-8로 간주
+        if e.start >= len(head) - 3:
+            return 'utf-8'
+        return 'cp949'
+
+def _iter_raw_sheet_chunks(file_path, batch_size):
+    """
+    시트를 batch_size 행 단위로 읽어 (헤더, 위치 기반 컬럼 DataFrame) 튜플을 순회합니다.
+    각 DataFrame에는 원본 엑셀 행 번호('_row_index')가 포함됩니다.
+    """
+    try:
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    except Exception:
+        wb = None
+
+    if wb is not None:
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                return
+            width = len(header)
+
+            buffer, row_indices = [], []
+            for row_index, values in enumerate(rows, start=2):
+                if not any(v is not None and v != '' for v in values):
+                    continue
+                values = tuple(values[:width]) + (None,) * (width - len(values))
+                buffer.append(values)
+                row_indices.append(row_index)
+
+                if len(buffer) >= batch_size:
+                    chunk = pd.DataFrame(buffer, columns=range(width), dtype=object)
+                    chunk['_row_index'] = row_indices
+                    yield list(header), chunk
+                    buffer, row_indices = [], []
+
+            if buffer:
+                chunk = pd.DataFrame(buffer, columns=range(width), dtype=object)
+                chunk['_row_index'] = row_indices
+                yield list(header), chunk
+        finally:
+            wb.close()
+        return
+
+    reader = pd.read_csv(file_path, chunksize=batch_size, dtype=object, encoding=_detect_csv_encoding(file_path))
+    for chunk in reader:
+        header = list(chunk.columns)
+        row_indices = chunk.index + 2
+        chunk.columns = range(len(header))
+        chunk['_row_index'] = row_indices
+        yield header, chunk
+
+def _estimate_row_count(file_path):
+    try:
+        wb = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            max_row = wb.active.max_row
+        finally:
+            wb.close()
+        return max(max_row - 1, 0) if max_row else 0
+    except Exception:
+        return 0
+
+def _map_chunk_columns(chunk, header, column_map_indices):
+    total_cols = len(header)
+    df = pd.DataFrame(index=chunk.index)
+    for field_name, col_idx in column_map_indices.items():
+        if col_idx is not None and 0 <= col_idx < total_cols:
+            df[field_name] = chunk[col_idx]
+        else:
+            df[field_name] = np.nan
+    df['_row_index'] = chunk['_row_index']
+    return df
+
+def open_stock_excel_stream(file_path, form, upload_mode, brand_id, excluded_row_indices=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    parse_stock_excel의 스트리밍 버전입니다.
+    파일 전체를 DataFrame으로 올리지 않고, batch_size 행 단위로 컬럼 매핑/정제/바코드 생성을
+    적용한 레코드 리스트를 순회하는 제너레이터를 반환합니다.
+    중복 바코드는 묶음 안에서만 마지막 행 기준으로 제거되므로, 묶음 사이의 중복은
+    InventoryJob.write_chunks(dedupe_key='barcode_cleaned')로 저장하면서 제거합니다.
+    반환값: (batches, 예상 전체 행 수, 오류 메시지)
+    """
+    try:
+        brand_settings = BrandSettings.get(brand_id)
+
+        field_map, import_strategy = _build_stock_field_map(form, upload_mode)
+        column_map_indices = _get_column_indices_from_form(form, field_map, strict=False)
+
+        size_conf, cat_conf = None, None
+        if import_strategy == 'horizontal_matrix':
+            if not transform_matrix_frame:
+                return None, 0, "매트릭스 변환 모듈을 불러올 수 없습니다."
+            if brand_settings.mapping_error:
+                return None, 0, f"매트릭스 변환 오류: {brand_settings.mapping_error}"
+            size_conf = brand_settings.size_mapping
+            cat_conf = brand_settings.category_mapping_rule
+    except Exception as e:
+        traceback.print_exc()
+        return None, 0, f"파싱 오류: {e}"
+
+    excluded = set(excluded_row_indices or [])
+
+    def _batches():
+        yielded = False
+        for header, chunk in _iter_raw_sheet_chunks(file_path, batch_size):
+            if excluded:
+                chunk = chunk[~chunk['_row_index'].isin(excluded)]
+                if chunk.empty:
+                    continue
+
+            if import_strategy == 'horizontal_matrix':
+                try:
+                    raw = chunk.drop(columns=['_row_index'])
+                    raw = raw.astype(str).where(raw.notna(), np.nan)
+                    raw.columns = header
+                    df = transform_matrix_frame(raw, size_conf, cat_conf, column_map_indices)
+                except Exception as e:
+                    raise ValueError(f"매트릭스 변환 오류: {e}")
+
+                if upload_mode == 'store' and 'hq_stock' in df.columns:
+                    df = df.rename(columns={'hq_stock': 'store_stock'})
+            else:
+                df = _map_chunk_columns(chunk, header, column_map_indices)
+
+            if df.empty:
+                continue
+
+            df = _optimize_dataframe(df, brand_settings, upload_mode)
+            if df.empty:
+                continue
+
+            yielded = True
+            yield df.drop(columns=['_row_index'], errors='ignore').to_dict('records')
+
+        if not yielded:
+            raise ValueError("유효한 데이터 없음")
+
+    return _batches(), _estimate_row_count(file_path), None
+
 def export_db_to_excel(brand_id):
     import io
     import openpyxl
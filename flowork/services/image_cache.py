@@ -0,0 +1,85 @@
+import os
+import uuid
+import shutil
+import hashlib
+
+# 기록량이 최대 용량의 이 비율을 넘을 때마다 정리 (매 기록마다 폴더 전체를 훑지 않도록)
+EVICT_CHECK_RATIO = 0.05
+
+class NobgCache:
+    """
+    배경 제거 결과(PNG)를 원본 이미지 바이트 해시 + 모델명 + 최대 크기로 저장하는 디스크 캐시입니다.
+    - 같은 원본을 다시 처리하면(옵션만 바꾼 재처리 등) 모델 추론 없이 결과 파일을 복사
+    - 파일 수정 시각을 최근 사용 시각으로 사용하며, 전체 용량이 max_bytes를 넘으면 오래된 것부터 삭제
+    Flask 앱 컨텍스트 없이 동작하므로 이미지 처리 프로세스 풀에서도 사용할 수 있습니다.
+    """
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        self._written = 0
+
+    @staticmethod
+    def make_key(source_bytes, model_name, max_size):
+        digest = hashlib.sha256(source_bytes).hexdigest()
+        return hashlib.sha256(f"{digest}:{model_name}:{max_size}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def fetch(self, key, dest_path):
+        """캐시에 있으면 dest_path로 복사하고 True를 반환합니다."""
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, dest_path)
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def store(self, key, src_path):
+        """결과 파일을 캐시에 넣습니다. 임시 파일에 복사한 뒤 교체하므로 동시에 기록해도 안전합니다."""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, path)
+            self._written += os.path.getsize(path)
+        except OSError as e:
+            print(f"Nobg cache store error: {e}")
+            return
+
+        if self._written >= self.max_bytes * EVICT_CHECK_RATIO:
+            self._written = 0
+            self.evict()
+
+    def evict(self):
+        """최근 사용 시각이 오래된 파일부터 삭제해 전체 용량을 max_bytes 이하로 맞춥니다."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.png'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            if total <= self.max_bytes:
+                break
+        return removed
@@ -0,0 +1,111 @@
+import os
+import json
+import uuid
+import hashlib
+
+MANIFEST_FILENAME = 'manifest.json'
+# 합성 결과 형식(레이아웃 로직)이 바뀌면 올려서 기존 결과를 모두 다시 만들도록 함
+RENDER_VERSION = 1
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+class StyleManifest:
+    """
+    품번 이미지 폴더(product_images/브랜드/품번)의 manifest.json.
+    컬러별 원본(URL, ETag, 해시, 저장 경로), 배경 제거 결과와 그 원본 해시,
+    썸네일/상세 이미지를 만든 입력(옵션, 컬러별 원본 해시)의 키를 기록해 재처리 시 바뀐 부분만 다시 만듭니다.
+    경로는 품번 폴더 기준 상대 경로로 저장합니다.
+    """
+    def __init__(self, base_dir, data=None):
+        self.base_dir = base_dir
+        self.data = data or {'version': RENDER_VERSION, 'colors': {}, 'renders': {}}
+
+    @property
+    def path(self):
+        return os.path.join(self.base_dir, MANIFEST_FILENAME)
+
+    @staticmethod
+    def load(base_dir):
+        try:
+            with open(os.path.join(base_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get('version') == RENDER_VERSION:
+                return StyleManifest(base_dir, data)
+        except (OSError, ValueError):
+            pass
+        return StyleManifest(base_dir)
+
+    def _abs(self, rel_path):
+        return os.path.join(self.base_dir, rel_path) if rel_path else None
+
+    def known_sources(self, color):
+        """URL -> {etag, sha256, path(절대 경로)} (조건부 요청용, 저장 파일이 남아 있는 것만)"""
+        known = {}
+        for img_type in ('DF', 'DM'):
+            for entry in self.data['colors'].get(color, {}).get(img_type, []):
+                path = self._abs(entry.get('file'))
+                if entry.get('url') and path and os.path.exists(path):
+                    known[entry['url']] = {'etag': entry.get('etag'), 'sha256': entry.get('sha256'), 'path': path}
+        return known
+
+    def nobg_for(self, color, source_sha256):
+        """같은 원본으로 만든 배경 제거 결과가 남아 있으면 그 절대 경로"""
+        entry = self.data['colors'].get(color, {}).get('nobg')
+        if entry and source_sha256 and entry.get('source') == source_sha256:
+            path = self._abs(entry.get('file'))
+            if path and os.path.exists(path):
+                return path
+        return None
+
+    def renders_for(self, render_key, static_root):
+        """같은 입력으로 만든 썸네일/상세 이미지 링크 (파일이 남아 있을 때만)"""
+        renders = self.data.get('renders') or {}
+        if renders.get('key') != render_key:
+            return None
+        links = {k: renders.get(k) for k in ('thumbnail', 'colordetail')}
+        for link in links.values():
+            if link and not os.path.exists(os.path.join(static_root, link.lstrip('/'))):
+                return None
+        return links
+
+    def set_color(self, color, sources, nobg_rel_path, nobg_source):
+        self.data['colors'][color] = {
+            'DF': sources.get('DF', []),
+            'DM': sources.get('DM', []),
+            'nobg': {'file': nobg_rel_path, 'source': nobg_source} if nobg_rel_path else None,
+        }
+
+    def set_renders(self, render_key, links):
+        self.data['renders'] = {'key': render_key, 'thumbnail': links.get('thumbnail'), 'colordetail': links.get('colordetail')}
+
+    def save(self):
+        try:
+            os.makedirs(self.base_dir, exist_ok=True)
+            tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Image manifest save error ({self.base_dir}): {e}")
+
+def make_render_key(options, logo_path, color_sources):
+    """
+    썸네일/상세 이미지 입력 키: 옵션, 로고 파일, 컬러별 (대표 원본 해시, 모델 이미지 유무).
+    배경 제거 결과는 원본 해시에서 결정되므로 원본 해시로 대신합니다.
+    """
+    logo_sig = None
+    if logo_path and os.path.exists(logo_path):
+        st = os.stat(logo_path)
+        logo_sig = [st.st_size, int(st.st_mtime)]
+    payload = json.dumps({
+        'version': RENDER_VERSION,
+        'options': options,
+        'logo': logo_sig,
+        'colors': sorted(color_sources),
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
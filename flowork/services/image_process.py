@@ -1,30 +1,48 @@
 # fileName: mingdezzi/flowork/FLOWORK-c3d0a854c8688593f920b4aabbc4e40547365c57/flowork/services/image_process.py
 import os
+import atexit
 import asyncio
+import threading
 import aiohttp
 import shutil
+import filecmp
+import hashlib
 import random
 import traceback
 import json
 import statistics
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont, ImageStat
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
 from flask import current_app
 from flowork.extensions import db
 from flowork.models import Product, Setting, Brand
 from flowork.constants import ImageProcessStatus
-from rembg import remove, new_session
+from flowork.services.image_cache import NobgCache
+from flowork.services.rembg_batch import BatchBackgroundRemover
+from flowork.services.image_manifest import StyleManifest, make_render_key, file_sha256
+from flowork.services.download_planner import DownloadPlanner, probe_first, PROBE_TIMEOUT
 import io
 
 RESAMPLE_LANCZOS = Image.Resampling.LANCZOS
 
+HTTP_CONNECTION_LIMIT = 100
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 60
+
+REMBG_MODEL_NAME = "u2net"
+REMBG_MAX_SIZE = 1500
+
 _REMBG_SESSION = None
 
 def _get_rembg_session():
     global _REMBG_SESSION
     if _REMBG_SESSION is None:
-        model_name = "u2net"
-        _REMBG_SESSION = new_session(model_name)
+        # rembg(pymatting/numba)는 CPU 단계를 수행하는 프로세스에서만 로드 (로드 후 fork 하면 종료 시 멈춤)
+        from rembg import new_session
+        _REMBG_SESSION = new_session(REMBG_MODEL_NAME)
     return _REMBG_SESSION
 
 def _hex_to_rgb(hex_value):
@@ -32,22 +50,180 @@ def _hex_to_rgb(hex_value):
     return tuple(int(hex_value[i:i+2], 16) for i in (0, 2, 4))
 
 def process_style_code_group(brand_id, style_code, options=None):
-    products = []
+    """단일 품번 처리 (준비 -> 다운로드 -> 배경 제거/합성 -> 저장을 현재 프로세스에서 순서대로 수행)"""
+    if options is None:
+        options = {}
+
+    ctx, error = _prepare_style(brand_id, style_code)
+    if error:
+        return False, error
+
     try:
-        if options is None:
-            options = {}
+        planner = DownloadPlanner.load(brand_id)
+        _run_image_io(_download_all_variants(style_code, ctx['variants_map'], ctx['patterns_config'], ctx['temp_dir'], planner))
+        planner.save()
+        rendered = _render_style(_build_render_job(ctx, options))
+        return _finish_style(ctx, rendered)
+    except Exception as e:
+        _update_product_status(ctx['products'], ImageProcessStatus.FAILED, f"오류 발생: {str(e)}")
+        return False, f"오류 발생: {str(e)}"
+
+def process_style_codes(brand_id, style_codes, options=None, progress_callback=None):
+    """
+    여러 품번을 파이프라인으로 처리합니다.
+    - 다운로드는 asyncio 이벤트 루프에서, CPU 작업(배경 제거, 트림, 합성, JPEG 인코딩)은 프로세스 풀에서 수행
+    - 한 품번이 풀에서 처리되는 동안 다음 품번들의 다운로드가 진행됨 (동시 진행 품번 수는 풀 크기의 2배로 제한)
+    - progress_callback(완료 수, 전체 수)는 품번 하나가 끝날 때마다 호출
+    반환값: 입력 순서대로의 (품번, 성공 여부, 메시지) 목록
+    """
+    if options is None:
+        options = {}
+    max_workers = _get_max_workers()
+    return _run_image_io(_run_pipeline(brand_id, style_codes, options, progress_callback, max_workers))
+
+async def _run_pipeline(brand_id, style_codes, options, progress_callback, max_workers):
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(max_workers * 2)
+    results = {}
+    total = len(style_codes)
+    completed = 0
+    planner = DownloadPlanner.load(brand_id)
+
+    async def run_one(code):
+        nonlocal completed
+        async with in_flight:
+            ctx, error = _prepare_style(brand_id, code)
+            if error:
+                results[code] = (False, error)
+            else:
+                try:
+                    await _download_all_variants(code, ctx['variants_map'], ctx['patterns_config'], ctx['temp_dir'], planner)
+                    rendered = await _run_cpu_stage(loop, _build_render_job(ctx, options), max_workers)
+                    results[code] = _finish_style(ctx, rendered)
+                except Exception as e:
+                    traceback.print_exc()
+                    _update_product_status(ctx['products'], ImageProcessStatus.FAILED, f"오류 발생: {str(e)}")
+                    results[code] = (False, f"오류 발생: {str(e)}")
+
+        completed += 1
+        if progress_callback:
+            progress_callback(completed, total)
+
+    await asyncio.gather(*(run_one(code) for code in style_codes))
+    planner.save()
+    return [(code, *results[code]) for code in style_codes]
+
+# 워커(스레드)별로 유지하는 이벤트 루프와 HTTP 세션 (배치/품번 간 커넥션, DNS 캐시 재사용)
+_IMAGE_IO = threading.local()
+
+def _run_image_io(coro):
+    loop = getattr(_IMAGE_IO, 'loop', None)
+    if loop is None or loop.is_closed() or getattr(_IMAGE_IO, 'pid', None) != os.getpid():
+        loop = asyncio.new_event_loop()
+        _IMAGE_IO.loop = loop
+        _IMAGE_IO.pid = os.getpid()
+        _IMAGE_IO.session = None
+    return loop.run_until_complete(coro)
+
+async def _get_http_session():
+    session = getattr(_IMAGE_IO, 'session', None)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_CONNECTION_LIMIT,
+            limit_per_host=current_app.config.get('IMAGE_DOWNLOAD_PER_HOST', 8),
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        _IMAGE_IO.session = session
+    return session
 
+@atexit.register
+def _close_image_io():
+    loop = getattr(_IMAGE_IO, 'loop', None)
+    session = getattr(_IMAGE_IO, 'session', None)
+    if loop is None or loop.is_closed() or getattr(_IMAGE_IO, 'pid', None) != os.getpid():
+        return
+    try:
+        if session is not None and not session.closed:
+            loop.run_until_complete(session.close())
+        loop.close()
+    except Exception:
+        pass
+
+_PROCESS_POOL = None
+_PROCESS_POOL_SIZE = 0
+
+def _get_max_workers():
+    configured = current_app.config.get('IMAGE_PROCESS_WORKERS')
+    return max(1, int(configured or os.cpu_count() or 1))
+
+def _get_process_pool(max_workers, rembg_config=None):
+    """워커 프로세스 단위로 재사용하는 CPU 단계용 프로세스 풀 (각 자식 프로세스가 시작 시 ONNX 세션을 1회 로드)"""
+    global _PROCESS_POOL, _PROCESS_POOL_SIZE
+    if _PROCESS_POOL is None or _PROCESS_POOL_SIZE != max_workers:
+        if _PROCESS_POOL is not None:
+            _PROCESS_POOL.shutdown(wait=False)
+        _PROCESS_POOL = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_cpu_worker, initargs=(rembg_config,))
+        _PROCESS_POOL_SIZE = max_workers
+    return _PROCESS_POOL
+
+def _init_cpu_worker(rembg_config):
+    # 첫 품번이 모델 로드 시간을 기다리지 않도록 배치 추론 세션을 미리 생성
+    try:
+        _get_batch_remover(rembg_config)
+    except Exception as e:
+        print(f"Rembg session pre-warm error: {e}")
+
+def _noop():
+    return None
+
+def warm_up_image_workers():
+    """
+    이미지 큐 워커 프로세스 시작 시 호출(worker_process_init).
+    CPU 단계 프로세스 풀을 미리 띄워 각 프로세스에서 ONNX 세션을 로드해 둡니다. (fork 방식은 첫 작업 때 풀 전체가 생성됨)
+    """
+    max_workers = _get_max_workers()
+    rembg_config = _get_rembg_config()
+    try:
+        _get_process_pool(max_workers, rembg_config).submit(_noop).result()
+    except (BrokenProcessPool, AssertionError, OSError) as e:
+        # 풀을 만들 수 없는 환경이면 CPU 단계가 스레드에서 실행되므로 현재 프로세스에 로드
+        print(f"Image process pool unavailable, pre-warming in process: {e}")
+        _shutdown_process_pool()
+        _init_cpu_worker(rembg_config)
+
+def _shutdown_process_pool():
+    global _PROCESS_POOL
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(wait=False, cancel_futures=True)
+        _PROCESS_POOL = None
+
+async def _run_cpu_stage(loop, job, max_workers):
+    global _PROCESS_POOL
+    try:
+        pool = _get_process_pool(max_workers, job['rembg'])
+        return await loop.run_in_executor(pool, _render_style, job)
+    except (BrokenProcessPool, AssertionError, OSError) as e:
+        # 풀이 깨졌거나 자식 프로세스를 만들 수 없는 환경(데몬 프로세스 등)이면 스레드에서 수행
+        print(f"Image process pool unavailable, falling back to thread: {e}")
+        _PROCESS_POOL = None
+        return await loop.run_in_executor(None, _render_style, job)
+
+def _prepare_style(brand_id, style_code):
+    """DB 조회 및 작업 폴더 준비. (ctx, None) 또는 (None, 오류 메시지)를 반환합니다."""
+    products = []
+    try:
         brand = db.session.get(Brand, brand_id)
         if not brand:
-            return False, "브랜드 정보를 찾을 수 없습니다."
-        brand_name = brand.brand_name
+            return None, "브랜드 정보를 찾을 수 없습니다."
 
         products = Product.query.filter_by(brand_id=brand_id).filter(
             Product.product_number.like(f"{style_code}%")
         ).all()
-        
+
         if not products:
-            return False, "해당 품번의 상품이 없습니다."
+            return None, "해당 품번의 상품이 없습니다."
 
         variants_map = {}
         for p in products:
@@ -58,77 +234,196 @@ def process_style_code_group(brand_id, style_code, options=None):
             for v in p.variants:
                 if v.color:
                     unique_colors.add(v.color)
-            
+
             if not unique_colors:
                 unique_colors.add("UnknownColor")
 
             for color_name in unique_colors:
                 if color_name not in variants_map:
                     variants_map[color_name] = {
-                        'product': p,
+                        'product_number': p.product_number,
                         'color_code': color_name,
                         'files': {
-                            'DF': [], 
-                            'DM': [], 
-                            'NOBG': None 
-                        }
+                            'DF': [],
+                            'DM': [],
+                            'NOBG': None
+                        },
+                        'sources': {},
+                        'known': {}
                     }
-        
+
         if not variants_map:
             msg = "처리할 컬러 옵션을 찾을 수 없습니다."
             _update_product_status(products, ImageProcessStatus.FAILED, msg)
-            return False, msg
-
-        temp_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp_images', style_code)
-        os.makedirs(temp_dir, exist_ok=True)
+            return None, msg
 
         patterns_config = _get_brand_url_patterns(brand_id)
         if not patterns_config:
-             msg = "이미지 다운로드 URL 패턴 설정이 없습니다."
-             _update_product_status(products, ImageProcessStatus.FAILED, msg)
-             return False, msg
+            msg = "이미지 다운로드 URL 패턴 설정이 없습니다."
+            _update_product_status(products, ImageProcessStatus.FAILED, msg)
+            return None, msg
 
-        asyncio.run(_download_all_variants(style_code, variants_map, patterns_config, temp_dir))
+        temp_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'temp_images', style_code)
+        os.makedirs(temp_dir, exist_ok=True)
 
-        valid_variants = []
+        # 이전 처리 기록: 변경 없는 원본은 조건부 요청(ETag)으로 확인만 하고 기존 파일을 사용
+        product_base_dir = _product_image_dir(brand.brand_name, style_code)
+        manifest = StyleManifest.load(product_base_dir)
         for color_name, data in variants_map.items():
-            if data['files']['DF']:
-                rep_image_path = data['files']['DF'][0]
-                nobg_path = _remove_background(rep_image_path)
-                if nobg_path:
-                    data['files']['NOBG'] = nobg_path
-                    valid_variants.append(data)
-            elif data['files']['DM']:
-                 valid_variants.append(data)
-
-        if not valid_variants:
-            msg = "유효한 이미지를 하나도 다운로드하지 못했습니다."
-            _update_product_status(products, ImageProcessStatus.FAILED, msg)
-            return False, msg
+            data['known'] = manifest.known_sources(color_name)
 
         # [수정] 로고 경로: static/product_images 폴더 내 참조
         logo_path = os.path.join(current_app.root_path, 'static', 'product_images', 'thumbnail_logo.png')
         if not os.path.exists(logo_path):
             logo_path = None
 
-        thumbnail_path = _create_thumbnail(valid_variants, temp_dir, style_code, logo_path=logo_path, options=options)
-        detail_path = _create_detail_image(valid_variants, temp_dir, style_code, options=options)
-
-        result_links = _save_structure_locally(brand_name, style_code, variants_map, thumbnail_path, detail_path)
-
-        _update_product_db(products, result_links)
-        
-        try:
-            shutil.rmtree(temp_dir)
-        except:
-            pass
-
-        return True, f"성공: {len(valid_variants)}개 컬러 처리 완료"
+        return {
+            'style_code': style_code,
+            'brand_name': brand.brand_name,
+            'products': products,
+            'variants_map': variants_map,
+            'patterns_config': patterns_config,
+            'temp_dir': temp_dir,
+            'logo_path': logo_path,
+            'font_paths': _get_font_paths(),
+            'nobg_cache': _get_nobg_cache_config(),
+            'rembg': _get_rembg_config(),
+            'manifest': manifest,
+            'static_root': current_app.root_path,
+        }, None
 
     except Exception as e:
         if products:
             _update_product_status(products, ImageProcessStatus.FAILED, f"오류 발생: {str(e)}")
-        return False, f"오류 발생: {str(e)}"
+        return None, f"오류 발생: {str(e)}"
+
+def _build_render_job(ctx, options):
+    """
+    프로세스 풀로 넘길 수 있도록 ORM 객체/앱 컨텍스트 없이 경로와 옵션만 담은 작업.
+    매니페스트와 비교해 대표 원본이 그대로인 컬러는 기존 배경 제거 결과를 쓰고,
+    썸네일/상세 이미지 입력이 모두 같으면 합성도 생략하도록 표시합니다.
+    """
+    manifest = ctx['manifest']
+    variants = []
+    color_sources = []
+    for color_name, data in ctx['variants_map'].items():
+        files = {'DF': list(data['files']['DF']), 'DM': list(data['files']['DM']), 'NOBG': None}
+        source_hash = None
+        if files['DF']:
+            source_hash = _source_sha256(data, files['DF'][0])
+            previous = manifest.nobg_for(color_name, source_hash)
+            if previous:
+                files['NOBG'] = f"{os.path.splitext(files['DF'][0])[0]}_nobg.png"
+                shutil.copyfile(previous, files['NOBG'])
+        data['source_hash'] = source_hash
+        color_sources.append([color_name, source_hash, bool(files['DM'])])
+        variants.append({'color_code': color_name, 'files': files})
+
+    ctx['render_key'] = make_render_key(options, ctx['logo_path'], color_sources)
+    ctx['reuse_links'] = manifest.renders_for(ctx['render_key'], ctx['static_root'])
+
+    return {
+        'style_code': ctx['style_code'],
+        'temp_dir': ctx['temp_dir'],
+        'options': options,
+        'logo_path': ctx['logo_path'],
+        'font_paths': ctx['font_paths'],
+        'nobg_cache': ctx['nobg_cache'],
+        'rembg': ctx['rembg'],
+        'reuse_renders': ctx['reuse_links'] is not None,
+        'variants': variants,
+    }
+
+def _source_sha256(data, path):
+    source = data['sources'].get(path)
+    if source and source.get('sha256'):
+        return source['sha256']
+    return file_sha256(path)
+
+def _render_style(job):
+    """
+    CPU 단계: 대표 이미지 배경 제거 -> 썸네일/상세 이미지 합성 및 JPEG 저장.
+    프로세스 풀에서 실행되므로 DB/current_app에 접근하지 않습니다.
+    """
+    # 컬러별 대표 이미지를 모아 한 번에 배경 제거 (배치 추론, 이전 결과를 재사용하는 컬러 제외)
+    df_variants = [v for v in job['variants'] if v['files']['DF'] and not v['files']['NOBG']]
+    nobg_paths = _remove_backgrounds([v['files']['DF'][0] for v in df_variants],
+                                     cache_config=job['nobg_cache'], rembg_config=job['rembg'])
+    nobg_by_color = {v['color_code']: path for v, path in zip(df_variants, nobg_paths)}
+
+    valid_variants = []
+    for v in job['variants']:
+        if v['files']['DF']:
+            nobg_path = v['files']['NOBG'] or nobg_by_color.get(v['color_code'])
+            if nobg_path:
+                v['files']['NOBG'] = nobg_path
+                valid_variants.append(v)
+        elif v['files']['DM']:
+            valid_variants.append(v)
+
+    thumbnail_path, detail_path = None, None
+    if valid_variants and not job['reuse_renders']:
+        thumbnail_path = _create_thumbnail(valid_variants, job['temp_dir'], job['style_code'],
+                                           logo_path=job['logo_path'], options=job['options'])
+        detail_path = _create_detail_image(valid_variants, job['temp_dir'], job['style_code'],
+                                           options=job['options'], font_paths=job['font_paths'])
+
+    return {
+        'nobg': {v['color_code']: v['files']['NOBG'] for v in job['variants']},
+        'valid_count': len(valid_variants),
+        'thumbnail': thumbnail_path,
+        'detail': detail_path,
+        'reused_renders': job['reuse_renders'],
+    }
+
+def _finish_style(ctx, rendered):
+    """저장 및 DB 반영 (메인 프로세스)"""
+    products = ctx['products']
+    variants_map = ctx['variants_map']
+    for color_name, nobg_path in rendered['nobg'].items():
+        variants_map[color_name]['files']['NOBG'] = nobg_path
+
+    if not rendered['valid_count']:
+        msg = "유효한 이미지를 하나도 다운로드하지 못했습니다."
+        _update_product_status(products, ImageProcessStatus.FAILED, msg)
+        return False, msg
+
+    result_links = _save_structure_locally(ctx['brand_name'], ctx['style_code'], variants_map,
+                                           rendered['thumbnail'], rendered['detail'])
+    if rendered['reused_renders']:
+        result_links = dict(ctx['reuse_links'])
+
+    _update_manifest(ctx, result_links)
+
+    _update_product_db(products, result_links)
+
+    try:
+        shutil.rmtree(ctx['temp_dir'])
+    except:
+        pass
+
+    return True, f"성공: {rendered['valid_count']}개 컬러 처리 완료"
+
+def _update_manifest(ctx, links):
+    manifest = ctx['manifest']
+    folders = {'DF': 'ORIGINAL', 'DM': 'MODEL'}
+    for color_name, data in ctx['variants_map'].items():
+        sources = {}
+        for img_type, folder in folders.items():
+            sources[img_type] = [{
+                'url': data['sources'].get(path, {}).get('url'),
+                'etag': data['sources'].get(path, {}).get('etag'),
+                'sha256': data['sources'].get(path, {}).get('sha256'),
+                'file': f"{color_name}/{folder}/{os.path.basename(path)}",
+            } for path in data['files'][img_type]]
+
+        nobg_rel_path = None
+        if data['files']['NOBG']:
+            nobg_rel_path = f"{color_name}/NOBG/{os.path.basename(data['files']['NOBG'])}"
+        manifest.set_color(color_name, sources, nobg_rel_path, data.get('source_hash'))
+
+    manifest.set_renders(ctx['render_key'], links)
+    manifest.save()
 
 def _update_product_status(products, status, message=None):
     try:
@@ -188,118 +483,279 @@ def _get_brand_url_patterns(brand_id):
         return config.get('IMAGE_DOWNLOAD_PATTERNS', {})
     return {}
 
-async def _download_all_variants(style_code, variants_map, patterns_config, save_dir):
-    connector = aiohttp.TCPConnector(limit=10)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        tasks = []
-        year = ""
-        if len(style_code) >= 5 and style_code[3:5].isdigit():
-            year = "20" + style_code[3:5]
+async def _download_all_variants(style_code, variants_map, patterns_config, save_dir, planner=None):
+    session = await _get_http_session()
+    tasks = []
+    year = ""
+    if len(style_code) >= 5 and style_code[3:5].isdigit():
+        year = "20" + style_code[3:5]
+
+    for color_name, data in variants_map.items():
+        p_num = data['product_number']
+        c_code = color_name.strip() if color_name and color_name != "UnknownColor" else ""
+        full_code = f"{p_num}{c_code}"
+        
+        color_dir = os.path.join(save_dir, color_name)
+        os.makedirs(color_dir, exist_ok=True)
+
+        if 'DF' in patterns_config:
+            tasks.append(_download_sequence(session, full_code, year, patterns_config['DF'], color_dir, 'DF', data, planner))
+        if 'DM' in patterns_config:
+            tasks.append(_download_sequence(session, full_code, year, patterns_config['DM'], color_dir, 'DM', data, planner))
+        if 'DG' in patterns_config:
+            tasks.append(_download_sequence(session, full_code, year, patterns_config['DG'], color_dir, 'DG', data, planner))
+    await asyncio.gather(*tasks)
+
+async def _download_sequence(session, code, year, patterns, save_dir, img_type, data_ref, planner=None):
+    """
+    번호를 1부터 올려가며 이미지를 받고, 연속 MAX_FAILURES개 번호가 비면 종료합니다.
+    - 첫 후보(학습된 패턴/번호 표기)는 바로 GET, 없으면 나머지 후보를 HEAD로 동시에 확인 (있는 후보 중 후보 순서가 가장 앞선 것을 사용)
+    - 이번 순서에서 한 번 찾은 조합은 이후 번호에서 그 조합만 확인 (없으면 빈 번호로 확정)
+    """
+    if planner is None:
+        planner = DownloadPlanner(None)
+    candidates = planner.candidates(img_type, patterns)
+    confirmed = None
 
-        for color_name, data in variants_map.items():
-            p_num = data['product'].product_number
-            c_code = color_name.strip() if color_name and color_name != "UnknownColor" else ""
-            full_code = f"{p_num}{c_code}"
-            
-            color_dir = os.path.join(save_dir, color_name)
-            os.makedirs(color_dir, exist_ok=True)
-
-            if 'DF' in patterns_config:
-                tasks.append(_download_sequence(session, full_code, year, patterns_config['DF'], color_dir, 'DF', data))
-            if 'DM' in patterns_config:
-                tasks.append(_download_sequence(session, full_code, year, patterns_config['DM'], color_dir, 'DM', data))
-            if 'DG' in patterns_config:
-                tasks.append(_download_sequence(session, full_code, year, patterns_config['DG'], color_dir, 'DG', data))
-        await asyncio.gather(*tasks)
-
-async def _download_sequence(session, code, year, patterns, save_dir, img_type, data_ref):
     num = 1
     consecutive_failures = 0
     MAX_FAILURES = 5 
 
-    while True:
-        found_any_pattern = False
-        num_formats = [f"{num:02d}", f"{num}", f"{num:03d}"]
-        for num_fmt in num_formats: 
-            for pattern in patterns:
-                url = pattern.format(year=year, code=code, num=num_fmt)
-                try:
-                    async with session.get(url, timeout=10) as response:
-                        if response.status == 200:
-                            content = await response.read()
-                            ext = ".jpg"
-                            if url.lower().endswith(".png"): ext = ".png"
-                            elif url.endswith(".JPG"): ext = ".JPG"
-                            
-                            filename = f"{code}_{img_type}_{num_fmt}{ext}"
-                            save_path = os.path.join(save_dir, filename)
-                            
-                            with open(save_path, 'wb') as f:
-                                f.write(content)
-                            
-                            data_ref['files'][img_type].append(save_path)
-                            found_any_pattern = True
-                            break 
-                except:
-                    continue
-            if found_any_pattern: break
-        
-        if found_any_pattern:
-            num += 1
+    while consecutive_failures < MAX_FAILURES:
+        order = [confirmed] if confirmed else candidates
+        urls = [_build_image_url(pattern, year, code, num, fmt) for pattern, fmt in order]
+
+        hit = None
+        if urls[0] and await _fetch_image(session, urls[0], code, img_type, f"{num:{order[0][1]}}", save_dir, data_ref):
+            hit = order[0]
+        elif len(order) > 1:
+            rest = [(combo, url) for combo, url in zip(order[1:], urls[1:]) if url]
+            idx = await probe_first(session, [url for _, url in rest])
+            if idx is not None:
+                combo, url = rest[idx]
+                if await _fetch_image(session, url, code, img_type, f"{num:{combo[1]}}", save_dir, data_ref):
+                    hit = combo
+
+        if hit:
+            confirmed = hit
+            planner.record(img_type, *hit)
             consecutive_failures = 0
         else:
             consecutive_failures += 1
-            if consecutive_failures >= MAX_FAILURES: 
-                break
-            num += 1
+        num += 1
+
+def _build_image_url(pattern, year, code, num, num_format):
+    try:
+        return pattern.format(year=year, code=code, num=f"{num:{num_format}}")
+    except (KeyError, IndexError, ValueError):
+        return None
+
+async def _fetch_image(session, url, code, img_type, num_fmt, save_dir, data_ref):
+    # 이전에 받은 URL이면 ETag로 조건부 요청 (304면 기존 파일을 복사해 사용)
+    known = data_ref.get('known', {}).get(url)
+    headers = {'If-None-Match': known['etag']} if known and known.get('etag') else None
+    try:
+        async with session.get(url, timeout=PROBE_TIMEOUT, headers=headers) as response:
+            if response.status == 304 and headers:
+                content = None
+            elif response.status != 200:
+                return False
+            else:
+                content = await response.read()
+                etag = response.headers.get('ETag')
+    except Exception:
+        return False
+
+    ext = ".jpg"
+    if url.lower().endswith(".png"): ext = ".png"
+    elif url.endswith(".JPG"): ext = ".JPG"
+
+    filename = f"{code}_{img_type}_{num_fmt}{ext}"
+    save_path = os.path.join(save_dir, filename)
+
+    if content is None:
+        shutil.copyfile(known['path'], save_path)
+        etag, sha256 = known['etag'], known['sha256']
+    else:
+        with open(save_path, 'wb') as f:
+            f.write(content)
+        sha256 = hashlib.sha256(content).hexdigest()
+
+    data_ref['files'].setdefault(img_type, []).append(save_path)
+    data_ref.setdefault('sources', {})[save_path] = {'url': url, 'etag': etag, 'sha256': sha256}
+    return True
+
+_NOBG_CACHE = None
+
+def _get_nobg_cache(cache_config):
+    global _NOBG_CACHE
+    if not cache_config:
+        return None
+    if _NOBG_CACHE is None or (_NOBG_CACHE.cache_dir, _NOBG_CACHE.max_bytes) != (cache_config['dir'], cache_config['max_bytes']):
+        _NOBG_CACHE = NobgCache(cache_config['dir'], cache_config['max_bytes'])
+    return _NOBG_CACHE
+
+def _get_nobg_cache_config():
+    cache_dir = current_app.config.get('NOBG_CACHE_DIR')
+    if cache_dir is None:
+        cache_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'nobg_cache')
+    if not cache_dir:
+        return None
+    return {'dir': cache_dir, 'max_bytes': current_app.config.get('NOBG_CACHE_MAX_BYTES', 2 * 1024 ** 3)}
 
-def _remove_background(input_path):
+def _remove_background(input_path, cache_config=None):
     try:
         name, ext = os.path.splitext(input_path)
         output_path = f"{name}_nobg.png"
-        
+
+        with open(input_path, 'rb') as f:
+            source_bytes = f.read()
+
+        # 같은 원본/모델/크기로 처리한 결과가 있으면 추론 생략
+        cache = _get_nobg_cache(cache_config)
+        cache_key = NobgCache.make_key(source_bytes, REMBG_MODEL_NAME, REMBG_MAX_SIZE)
+        if cache and cache.fetch(cache_key, output_path):
+            return output_path
+
         model_home = '/app/models'
         os.environ['U2NET_HOME'] = model_home
         os.makedirs(model_home, exist_ok=True)
 
+        from rembg import remove
         session = _get_rembg_session()
 
-        with Image.open(input_path) as img:
-            max_size = 1500
-            if img.width > max_size or img.height > max_size:
-                img.thumbnail((max_size, max_size), RESAMPLE_LANCZOS)
-            
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='PNG')
-            input_data = img_byte_arr.getvalue()
+        with Image.open(io.BytesIO(source_bytes)) as img:
+            if img.width > REMBG_MAX_SIZE or img.height > REMBG_MAX_SIZE:
+                img.thumbnail((REMBG_MAX_SIZE, REMBG_MAX_SIZE), RESAMPLE_LANCZOS)
 
-        output_data = remove(input_data, session=session)
-        
-        with open(output_path, 'wb') as o:
-            o.write(output_data)
-            
+            # PIL 이미지를 그대로 전달 (PNG 재인코딩/디코딩 생략)
+            output_img = remove(img, session=session)
+
+        output_img.save(output_path, format='PNG')
+
+        if cache:
+            cache.store(cache_key, output_path)
         return output_path
     except Exception as e:
         print(f"Background removal error for {input_path}: {e}")
         return None
 
-def _calculate_brightness(image):
+_BATCH_REMOVER = None
+_BATCH_REMOVER_KEY = None
+
+def _get_rembg_config():
+    return {
+        'model_path': current_app.config.get('REMBG_MODEL_PATH'),
+        'batch_size': current_app.config.get('REMBG_BATCH_SIZE', 4),
+        'intra_op_threads': current_app.config.get('REMBG_INTRA_OP_THREADS', 0),
+    }
+
+def _get_batch_remover(rembg_config):
+    """배치 추론용 ONNX 세션 (프로세스당 1회 로드). 모델 파일이 없으면 None"""
+    global _BATCH_REMOVER, _BATCH_REMOVER_KEY
+    if not rembg_config or not rembg_config.get('model_path') or not os.path.exists(rembg_config['model_path']):
+        return None
+    key = (rembg_config['model_path'], rembg_config['batch_size'], rembg_config['intra_op_threads'])
+    if _BATCH_REMOVER is None or _BATCH_REMOVER_KEY != key:
+        _BATCH_REMOVER = BatchBackgroundRemover(*key)
+        _BATCH_REMOVER_KEY = key
+    return _BATCH_REMOVER
+
+def _remove_backgrounds(input_paths, cache_config=None, rembg_config=None):
+    """
+    여러 원본 이미지의 배경을 제거하고 입력 순서대로 결과 경로(실패 시 None) 목록을 반환합니다.
+    캐시에 있는 것은 그대로 사용하고, 나머지는 배치 추론합니다. (모델 파일이 없으면 이미지별 rembg)
+    """
+    cache = _get_nobg_cache(cache_config)
+    outputs = [None] * len(input_paths)
+    pending = []
+
+    for i, input_path in enumerate(input_paths):
+        try:
+            output_path = f"{os.path.splitext(input_path)[0]}_nobg.png"
+            with open(input_path, 'rb') as f:
+                source_bytes = f.read()
+
+            cache_key = NobgCache.make_key(source_bytes, REMBG_MODEL_NAME, REMBG_MAX_SIZE)
+            if cache and cache.fetch(cache_key, output_path):
+                outputs[i] = output_path
+                continue
+
+            img = Image.open(io.BytesIO(source_bytes))
+            img.load()
+            if img.width > REMBG_MAX_SIZE or img.height > REMBG_MAX_SIZE:
+                img.thumbnail((REMBG_MAX_SIZE, REMBG_MAX_SIZE), RESAMPLE_LANCZOS)
+            pending.append((i, input_path, output_path, cache_key, img))
+        except Exception as e:
+            print(f"Background removal error for {input_path}: {e}")
+
+    if not pending:
+        return outputs
+
     try:
-        greyscale_image = image.convert('L')
-        stat = ImageStat.Stat(greyscale_image)
-        return stat.mean[0]
-    except:
-        return 0
+        remover = _get_batch_remover(rembg_config)
+        if remover is not None:
+            cutouts = remover.remove([item[4] for item in pending])
+            for (i, input_path, output_path, cache_key, _), cut in zip(pending, cutouts):
+                cut.save(output_path, format='PNG')
+                if cache:
+                    cache.store(cache_key, output_path)
+                outputs[i] = output_path
+            return outputs
+    except Exception as e:
+        print(f"Batch background removal error, falling back to per-image: {e}")
+
+    for i, input_path, _, _, _ in pending:
+        outputs[i] = _remove_background(input_path, cache_config=cache_config)
+    return outputs
 
-def _trim_image(img):
-    bbox = img.getbbox()
+def _alpha_bbox(alpha):
+    """알파 채널 기준 불투명 영역 (left, top, right, bottom). 전부 투명이면 None"""
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(alpha.any(axis=0))
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+def _load_trimmed(path):
+    """NOBG 이미지를 RGBA 배열로 읽고 투명 여백을 잘라냅니다. (잘라낸 배열은 원본의 view)"""
+    with Image.open(path) as img:
+        rgba = np.asarray(img.convert("RGBA"))
+    bbox = _alpha_bbox(rgba[..., 3])
     if bbox:
-        return img.crop(bbox)
-    return img
+        left, top, right, bottom = bbox
+        rgba = rgba[top:bottom, left:right]
+    return rgba
 
-def _paste_logo(final_image, logo_path, logo_config):
+def _calculate_brightness(rgba):
+    """PIL 'L' 변환과 같은 계수의 휘도 평균 (투명 영역 포함)"""
     try:
-        logo = Image.open(logo_path).convert("RGBA")
+        rgb = rgba[..., :3].reshape(-1, 3).astype(np.uint32)
+        luma = (rgb @ np.array([19595, 38470, 7471], dtype=np.uint32) + 0x8000) >> 16
+        return float(luma.mean())
+    except Exception:
+        return 0
+
+def _resize_rgba(rgba, size):
+    return np.asarray(Image.fromarray(rgba).resize(size, RESAMPLE_LANCZOS))
+
+def _blend_into(canvas, rgba, x, y):
+    """RGBA 배열을 불투명 RGB 캔버스의 (x, y)에 알파 블렌딩합니다. (캔버스 밖은 잘라냄, 제자리 갱신)"""
+    h, w = rgba.shape[:2]
+    ch, cw = canvas.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, cw), min(y + h, ch)
+    if x0 >= x1 or y0 >= y1:
+        return
+    src = rgba[y0 - y:y1 - y, x0 - x:x1 - x]
+    alpha = src[..., 3:4].astype(np.uint16)
+    dst = canvas[y0:y1, x0:x1]
+    dst[...] = (src[..., :3] * alpha + dst * (255 - alpha) + 127) // 255
+
+def _paste_logo(canvas, logo_path, logo_config):
+    try:
+        with Image.open(logo_path) as logo_img:
+            logo = logo_img.convert("RGBA")
         
         area_height = logo_config.get('height', 80)
         align = logo_config.get('align', 'left')
@@ -309,9 +765,9 @@ def _paste_logo(final_image, logo_path, logo_config):
         ratio = max_logo_h / logo.height
         new_w = int(logo.width * ratio)
         new_h = int(logo.height * ratio)
-        logo = logo.resize((new_w, new_h), RESAMPLE_LANCZOS)
+        logo = np.asarray(logo.resize((new_w, new_h), RESAMPLE_LANCZOS))
         
-        canvas_w = final_image.width
+        canvas_w = canvas.shape[1]
         
         margin_x = 20
         
@@ -324,7 +780,7 @@ def _paste_logo(final_image, logo_path, logo_config):
         else:
             x = margin_x
             
-        final_image.paste(logo, (x, y), logo)
+        _blend_into(canvas, logo, x, y)
         
     except Exception as e:
         pass
@@ -352,13 +808,10 @@ def _create_thumbnail(variants, temp_dir, style_code, logo_path=None, options=No
         prod_area_w = canvas_w
         prod_area_h = canvas_h - logo_area_h
         
-        layout_layer = Image.new("RGBA", (canvas_w, canvas_h), (255, 255, 255, 0))
-        
         loaded_images = []
         for v in variants:
             if v['files']['NOBG']:
-                img = Image.open(v['files']['NOBG']).convert("RGBA")
-                img = _trim_image(img)
+                img = _load_trimmed(v['files']['NOBG'])
                 brightness = _calculate_brightness(img)
                 loaded_images.append({'img': img, 'brightness': brightness})
         
@@ -386,7 +839,7 @@ def _create_thumbnail(variants, temp_dir, style_code, logo_path=None, options=No
         resized_images = []
         for item in loaded_images:
             img = item['img']
-            width, height = img.size
+            height, width = img.shape[:2]
             
             if width > height:
                 ratio = target_max_size / width
@@ -397,9 +850,10 @@ def _create_thumbnail(variants, temp_dir, style_code, logo_path=None, options=No
                 new_h = target_max_size
                 new_w = int(width * ratio)
                 
-            resized_images.append(img.resize((new_w, new_h), RESAMPLE_LANCZOS))
+            resized_images.append(_resize_rgba(img, (new_w, new_h)))
+            item['img'] = None
         
-        first_w, first_h = resized_images[0].size
+        first_h, first_w = resized_images[0].shape[:2]
         
         offset_y = logo_area_h
         
@@ -451,28 +905,36 @@ def _create_thumbnail(variants, temp_dir, style_code, logo_path=None, options=No
             start_x, start_y = s_x, s_y
             step_x = (e_x - s_x) // (count - 1)
             step_y = (e_y - s_y) // (count - 1)
+
+        # 배경색으로 채운 출력 버퍼에 앞 순서부터 차례로 블렌딩 (중간 RGBA 레이어 없음)
+        canvas = np.empty((canvas_h, canvas_w, 3), dtype=np.uint8)
+        canvas[...] = bg_color
                 
         for idx, img in enumerate(resized_images):
             x = int(start_x + (idx * step_x))
             y = int(start_y + (idx * step_y))
-            layout_layer.alpha_composite(img, (x, y))
-            
-        final_image = Image.new("RGB", (canvas_w, canvas_h), bg_color)
-        
-        final_image.paste(layout_layer, (0, 0), layout_layer)
+            _blend_into(canvas, img, x, y)
         
         if logo_path:
-            _paste_logo(final_image, logo_path, logo_config)
+            _paste_logo(canvas, logo_path, logo_config)
             
         output_path = os.path.join(temp_dir, f"{style_code}_thumbnail.jpg")
-        final_image.save(output_path, "JPEG", quality=95)
+        Image.fromarray(canvas).save(output_path, "JPEG", quality=95)
         return output_path
         
     except Exception as e:
         traceback.print_exc()
         return None
 
-def _create_detail_image(variants, temp_dir, style_code, options=None):
+def _get_font_paths():
+    # [수정] 폰트 경로: static 폴더 우선 탐색, 실패 시 기본값
+    return [
+        os.path.join(current_app.root_path, 'static', 'fonts', 'NanumGothicBold.ttf'),
+        "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf",
+        "arial.ttf"
+    ]
+
+def _create_detail_image(variants, temp_dir, style_code, options=None, font_paths=None):
     try:
         if options is None:
             options = {}
@@ -487,11 +949,10 @@ def _create_detail_image(variants, temp_dir, style_code, options=None):
         
         if not variants or not variants[0]['files']['NOBG']: return None
         
-        sample_img = Image.open(variants[0]['files']['NOBG'])
-        sample_img = _trim_image(sample_img)
+        sample_img = _load_trimmed(variants[0]['files']['NOBG'])
         
-        ratio = target_img_width / sample_img.width
-        target_img_height = int(sample_img.height * ratio)
+        ratio = target_img_width / sample_img.shape[1]
+        target_img_height = int(sample_img.shape[0] * ratio)
         
         cell_height = target_img_height + text_area_height + 40
         
@@ -499,17 +960,13 @@ def _create_detail_image(variants, temp_dir, style_code, options=None):
         rows = (count + 1) // 2
         total_height = rows * cell_height
         
-        layout_layer = Image.new("RGBA", (canvas_width, total_height), (255, 255, 255, 0))
-        draw = ImageDraw.Draw(layout_layer)
+        canvas = np.empty((total_height, canvas_width, 3), dtype=np.uint8)
+        canvas[...] = bg_color
         
-        # [수정] 폰트 경로: static 폴더 우선 탐색, 실패 시 기본값
         font = None
-        font_paths = [
-            os.path.join(current_app.root_path, 'static', 'fonts', 'NanumGothicBold.ttf'),
-            "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf",
-            "arial.ttf"
-        ]
-        
+        if font_paths is None:
+            font_paths = _get_font_paths()
+
         for path in font_paths:
             try:
                 font = ImageFont.truetype(path, 25)
@@ -520,17 +977,18 @@ def _create_detail_image(variants, temp_dir, style_code, options=None):
         if font is None:
             font = ImageFont.load_default()
 
+        # 이미지는 배열에 먼저 블렌딩하고, 글자는 완성된 버퍼 위에 그림 (컬러별로 한 장씩만 메모리에 올림)
+        labels = []
         for idx, v in enumerate(variants):
             if not v['files']['NOBG']: continue
             
-            img = Image.open(v['files']['NOBG']).convert("RGBA")
-            img = _trim_image(img)
+            img = sample_img if idx == 0 else _load_trimmed(v['files']['NOBG'])
             
-            w, h = img.size
+            h, w = img.shape[:2]
             ratio = target_img_width / w
             new_w = int(w * ratio)
             new_h = int(h * ratio)
-            resized = img.resize((new_w, new_h), RESAMPLE_LANCZOS)
+            resized = _resize_rgba(img, (new_w, new_h))
             
             row = idx // 2
             col = idx % 2
@@ -541,10 +999,12 @@ def _create_detail_image(variants, temp_dir, style_code, options=None):
             img_x = cell_x + (cell_width - new_w) // 2
             img_y = cell_y + 20
             
-            layout_layer.alpha_composite(resized, (img_x, img_y))
-            
-            color_text = f"#COLOR : {v['color_code']}"
-            
+            _blend_into(canvas, resized, img_x, img_y)
+            labels.append((cell_x, img_y + new_h + 15, f"#COLOR : {v['color_code']}"))
+
+        final_image = Image.fromarray(canvas)
+        draw = ImageDraw.Draw(final_image)
+        for cell_x, text_y, color_text in labels:
             try:
                 bbox = draw.textbbox((0, 0), color_text, font=font)
                 text_w = bbox[2] - bbox[0]
@@ -552,12 +1012,8 @@ def _create_detail_image(variants, temp_dir, style_code, options=None):
                 text_w = len(color_text) * 10
             
             text_x = cell_x + (cell_width - text_w) // 2
-            text_y = img_y + new_h + 15
             
             draw.text((text_x, text_y), color_text, fill="black", font=font)
-            
-        final_image = Image.new("RGB", (canvas_width, total_height), bg_color)
-        final_image.paste(layout_layer, (0, 0), layout_layer)
 
         output_path = os.path.join(temp_dir, f"{style_code}_detail.jpg")
         final_image.save(output_path, "JPEG", quality=90)
@@ -567,10 +1023,18 @@ def _create_detail_image(variants, temp_dir, style_code, options=None):
         traceback.print_exc()
         return None
 
-def _save_structure_locally(brand_name, style_code, variants_map, thumb_path, detail_path):
+def _product_image_dir(brand_name, style_code):
     # [수정] 이미지 저장 기본 경로 통일
-    base_static_path = os.path.join(current_app.root_path, 'static', 'product_images')
-    product_base_dir = os.path.join(base_static_path, brand_name, style_code)
+    return os.path.join(current_app.root_path, 'static', 'product_images', brand_name, style_code)
+
+def _copy_if_changed(src, dest):
+    """내용이 같은 파일이 이미 있으면 복사하지 않음 (재처리 시 바뀐 파일만 갱신)"""
+    if os.path.exists(dest) and filecmp.cmp(src, dest, shallow=False):
+        return
+    shutil.copy2(src, dest)
+
+def _save_structure_locally(brand_name, style_code, variants_map, thumb_path, detail_path):
+    product_base_dir = _product_image_dir(brand_name, style_code)
     
     thumb_dir = os.path.join(product_base_dir, 'THUMBNAIL')
     colordetail_dir = os.path.join(product_base_dir, 'COLORDETAIL')
@@ -602,17 +1066,17 @@ def _save_structure_locally(brand_name, style_code, variants_map, thumb_path, de
             os.makedirs(original_dir, exist_ok=True)
             for path in data['files']['DF']:
                 filename = os.path.basename(path)
-                shutil.copy2(path, os.path.join(original_dir, filename))
+                _copy_if_changed(path, os.path.join(original_dir, filename))
         
         if data['files']['DM']:
             os.makedirs(model_dir, exist_ok=True)
             for path in data['files']['DM']:
                 filename = os.path.basename(path)
-                shutil.copy2(path, os.path.join(model_dir, filename))
+                _copy_if_changed(path, os.path.join(model_dir, filename))
             
         if data['files']['NOBG'] and os.path.exists(data['files']['NOBG']):
             os.makedirs(nobg_dir, exist_ok=True)
             filename = os.path.basename(data['files']['NOBG'])
-            shutil.copy2(data['files']['NOBG'], os.path.join(nobg_dir, filename))
+            _copy_if_changed(data['files']['NOBG'], os.path.join(nobg_dir, filename))
 
     return result
\ No newline at end of file
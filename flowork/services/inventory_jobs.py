@@ -0,0 +1,148 @@
+import os
+import json
+import fcntl
+import uuid
+import pickle
+import shutil
+
+# 전체 DB 가져오기 중간 파일의 묶음 크기 (재고 업로드는 엑셀 스트리밍 묶음을 그대로 사용)
+IMPORT_CHUNK_SIZE = 20000
+
+META_FILENAME = 'meta.json'
+
+def iter_chunks(records, size=IMPORT_CHUNK_SIZE):
+    for i in range(0, len(records), size):
+        yield records[i:i + size]
+
+class InventoryJob:
+    """
+    재고 업로드/DB 가져오기 작업의 중간 파일과 체크포인트 (job_dir/작업ID/).
+    - 파싱 단계: 정제된 레코드 묶음을 chunk_00000.pkl ... 로 저장하고 meta.json에 묶음 수/행 수를 기록
+    - 반영 단계: 묶음을 커밋할 때마다 next_chunk와 누적 결과(state)를 meta.json에 기록
+    같은 작업이 재시도/재전달되면 엑셀을 다시 파싱하지 않고 마지막으로 커밋된 묶음 다음부터 이어서 처리합니다.
+    처리 중에는 job_dir/작업ID.lock 파일을 잠가 같은 작업의 재전달된 사본이 동시에 묶음을 반영하지 않게 합니다.
+    Flask 앱 컨텍스트 없이 동작합니다.
+    """
+    def __init__(self, job_id, job_dir):
+        self.job_id = job_id
+        self.dir = os.path.join(job_dir, job_id)
+        self.lock_path = os.path.join(job_dir, f"{job_id}.lock")
+        self.meta = self._load_meta()
+        self._lock_file = None
+
+    @property
+    def parsed(self):
+        return self.meta is not None
+
+    @property
+    def chunks(self):
+        return self.meta['chunks']
+
+    @property
+    def rows(self):
+        return self.meta['rows']
+
+    @property
+    def next_chunk(self):
+        return self.meta['next_chunk']
+
+    @property
+    def state(self):
+        return self.meta['state']
+
+    def acquire_lock(self):
+        """
+        작업 잠금을 시도합니다. 다른 프로세스가 같은 작업을 처리 중이면 기다리지 않고 False를 반환합니다.
+        잠근 뒤에는 체크포인트를 다시 읽어 앞서 실행된 사본이 커밋한 묶음부터 이어서 처리합니다.
+        """
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.meta = self._load_meta()
+        return True
+
+    def release_lock(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _chunk_path(self, index):
+        return os.path.join(self.dir, f"chunk_{index:05d}.pkl")
+
+    def _load_meta(self):
+        try:
+            with open(os.path.join(self.dir, META_FILENAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self):
+        self._write_atomic(os.path.join(self.dir, META_FILENAME),
+                           json.dumps(self.meta, ensure_ascii=False).encode('utf-8'))
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def write_chunks(self, batches, dedupe_key=None):
+        """
+        레코드 묶음을 중간 파일로 저장합니다. meta.json은 모든 묶음을 쓴 뒤에 만들어 중간에 멈추면 처음부터 다시 파싱합니다.
+        dedupe_key를 주면 묶음 사이에 같은 키가 다시 나올 때 마지막 행만 남깁니다. (앞 묶음 파일을 다시 저장)
+        """
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.makedirs(self.dir, exist_ok=True)
+
+        count, rows = 0, 0
+        last_chunk = {}     # 키 -> 마지막으로 나온 묶음 번호
+        superseded = set()  # 뒤 묶음에 같은 키가 있어 다시 저장할 묶음 번호
+        for records in batches:
+            if not records:
+                continue
+            if dedupe_key:
+                for item in records:
+                    key = item.get(dedupe_key)
+                    if key is None:
+                        continue
+                    prev = last_chunk.get(key)
+                    if prev is not None and prev != count:
+                        superseded.add(prev)
+                    last_chunk[key] = count
+            self._write_atomic(self._chunk_path(count), pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL))
+            count += 1
+            rows += len(records)
+
+        for index in sorted(superseded):
+            records = self.read_chunk(index)
+            kept = [item for item in records if last_chunk.get(item.get(dedupe_key), index) == index]
+            rows -= len(records) - len(kept)
+            self._write_atomic(self._chunk_path(index), pickle.dumps(kept, protocol=pickle.HIGHEST_PROTOCOL))
+
+        self.meta = {'chunks': count, 'rows': rows, 'next_chunk': 0, 'state': {}}
+        self._save_meta()
+
+    def read_chunk(self, index):
+        with open(self._chunk_path(index), 'rb') as f:
+            return pickle.load(f)
+
+    def checkpoint(self, next_chunk, **state):
+        """커밋이 끝난 뒤 호출: 다음에 처리할 묶음 번호와 누적 결과를 기록"""
+        self.meta['next_chunk'] = next_chunk
+        self.meta['state'].update(state)
+        self._save_meta()
+
+    def remove(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        # 잠금을 가진 상태에서 호출 (release_lock 전에 삭제해 완료 후 도착한 사본이 새 잠금 파일을 사용)
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+        self.meta = None
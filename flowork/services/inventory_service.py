@@ -1,229 +1,236 @@
+import io
+import csv
 import traceback
 from datetime import datetime
-from sqlalchemy import select
+from sqlalchemy import text
 from flowork.extensions import db
 from flowork.models import Product, Variant, StoreStock, Store, StockHistory
 from flowork.utils import clean_string_upper, get_choseong
-from flowork.constants import StockChangeType
+from flowork.constants import StockChangeType, ImageProcessStatus
 
-class InventoryService:
-    @staticmethod
-    def process_stock_data(records, upload_mode, brand_id, target_store_id=None, allow_create=True, progress_callback=None):
-        try:
-            if not records:
-                return 0, 0, "데이터가 없습니다."
+_STAGING_COLUMNS = (
+    'seq', 'product_number', 'product_name', 'product_number_cleaned', 'product_name_cleaned',
+    'product_name_choseong', 'release_year', 'item_category', 'is_favorite',
+    'barcode', 'color', 'size', 'original_price', 'sale_price', 'hq_quantity',
+    'barcode_cleaned', 'color_cleaned', 'size_cleaned', 'store_stock'
+)
 
-            total_items = len(records)
-            
-            pn_list = list(set(item['product_number_cleaned'] for item in records if item.get('product_number_cleaned')))
-            barcode_list = list(set(item['barcode_cleaned'] for item in records if item.get('barcode_cleaned')))
+# 트랜잭션 동안만 유지되는 스테이징 테이블 (같은 트랜잭션 내 여러 배치는 TRUNCATE 후 재사용)
+_CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS inventory_staging (
+        seq integer, product_number text, product_name text, product_number_cleaned text,
+        product_name_cleaned text, product_name_choseong text, release_year integer,
+        item_category text, is_favorite integer, barcode text, color text, size text,
+        original_price integer, sale_price integer, hq_quantity integer,
+        barcode_cleaned text, color_cleaned text, size_cleaned text, store_stock integer
+    ) ON COMMIT DROP
+"""
 
-            existing_products = db.session.query(Product).filter(
-                Product.brand_id == brand_id,
-                Product.product_number_cleaned.in_(pn_list)
-            ).all()
-            product_map = {p.product_number_cleaned: p for p in existing_products}
+_COPY_STAGING_SQL = f"COPY inventory_staging ({', '.join(_STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
 
-            new_products_data = []
-            seen_new_pns = set()
+# 바코드별 첫 행 기준으로 옵션 생성 (_apply_import_chunk_orm의 seen_barcodes와 동일한 규칙)
+_INSERT_VARIANTS_FROM_STAGING_SQL = """
+    INSERT INTO variants (
+        product_id, barcode, color, size, original_price, sale_price, hq_quantity,
+        barcode_cleaned, color_cleaned, size_cleaned
+    )
+    SELECT p.id, s.barcode, s.color, s.size, COALESCE(s.original_price, 0), COALESCE(s.sale_price, 0),
+           COALESCE(s.hq_quantity, 0), s.barcode_cleaned, s.color_cleaned, s.size_cleaned
+    FROM (
+        SELECT DISTINCT ON (barcode_cleaned) *
+        FROM inventory_staging
+        WHERE barcode_cleaned IS NOT NULL AND barcode_cleaned <> ''
+        ORDER BY barcode_cleaned, seq
+    ) s
+    JOIN products p ON p.brand_id = :brand_id AND p.product_number_cleaned = s.product_number_cleaned
+"""
 
-            for item in records:
-                pn_clean = item.get('product_number_cleaned')
-                if not pn_clean: continue
-                
-                if pn_clean not in product_map and pn_clean not in seen_new_pns:
-                    if allow_create:
-                        pname = item.get('product_name') or item.get('product_number')
-                        new_products_data.append({
-                            'brand_id': brand_id,
-                            'product_number': item.get('product_number'),
-                            'product_name': pname,
-                            'product_number_cleaned': pn_clean,
-                            'product_name_cleaned': clean_string_upper(pname),
-                            'product_name_choseong': item.get('product_name_choseong'),
-                            'release_year': item.get('release_year'),
-                            'item_category': item.get('item_category'),
-                            'is_favorite': item.get('is_favorite', 0)
-                        })
-                        seen_new_pns.add(pn_clean)
+# --- 재고 업로드(apply_stock_job) 집합 기반 upsert ---
 
-            if new_products_data:
-                db.session.bulk_insert_mappings(Product, new_products_data)
-                db.session.flush()
-                
-                created_products = db.session.query(Product).filter(
-                    Product.brand_id == brand_id,
-                    Product.product_number_cleaned.in_(seen_new_pns)
-                ).all()
-                for p in created_products:
-                    product_map[p.product_number_cleaned] = p
+# 브랜드에 없는 품번만 신규 상품으로 생성 (products에는 유니크 제약이 없어 NOT EXISTS 사용)
+_UPSERT_NEW_PRODUCTS_SQL = """
+    INSERT INTO products (
+        brand_id, product_number, product_name, product_number_cleaned, product_name_cleaned,
+        product_name_choseong, release_year, item_category, is_favorite, image_status
+    )
+    SELECT :brand_id, s.product_number, s.product_name, s.product_number_cleaned, s.product_name_cleaned,
+           s.product_name_choseong, s.release_year, s.item_category, COALESCE(s.is_favorite, 0), :image_status
+    FROM (
+        SELECT DISTINCT ON (product_number_cleaned) *
+        FROM inventory_staging
+        ORDER BY product_number_cleaned, seq
+    ) s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM products p
+        WHERE p.brand_id = :brand_id AND p.product_number_cleaned = s.product_number_cleaned
+    )
+"""
 
-            existing_variants = db.session.query(Variant).join(Product).filter(
-                Product.brand_id == brand_id,
-                Variant.barcode_cleaned.in_(barcode_list)
-            ).all()
-            variant_map = {v.barcode_cleaned: v for v in existing_variants}
+# 신규 바코드는 삽입, 기존 바코드는 가격(0보다 클 때)/본사재고(hq 모드)를 갱신
+# 다른 브랜드의 동일 바코드는 건드리지 않음
+_UPSERT_VARIANTS_SQL = """
+    WITH upserted AS (
+        INSERT INTO variants (
+            product_id, barcode, color, size, original_price, sale_price, hq_quantity,
+            barcode_cleaned, color_cleaned, size_cleaned
+        )
+        SELECT p.id, s.barcode, s.color, s.size, COALESCE(s.original_price, 0), COALESCE(s.sale_price, 0),
+               CASE WHEN :is_hq THEN COALESCE(s.hq_quantity, 0) ELSE 0 END,
+               s.barcode_cleaned, s.color_cleaned, s.size_cleaned
+        FROM (
+            SELECT DISTINCT ON (barcode_cleaned) *
+            FROM inventory_staging
+            WHERE barcode_cleaned IS NOT NULL AND barcode_cleaned <> ''
+            ORDER BY barcode_cleaned, seq DESC
+        ) s
+        CROSS JOIN LATERAL (
+            SELECT id FROM products
+            WHERE brand_id = :brand_id AND product_number_cleaned = s.product_number_cleaned
+            ORDER BY id LIMIT 1
+        ) p
+        ON CONFLICT (barcode_cleaned) DO UPDATE SET
+            original_price = CASE WHEN EXCLUDED.original_price > 0 THEN EXCLUDED.original_price ELSE variants.original_price END,
+            sale_price = CASE WHEN EXCLUDED.sale_price > 0 THEN EXCLUDED.sale_price ELSE variants.sale_price END,
+            hq_quantity = CASE WHEN :is_hq THEN EXCLUDED.hq_quantity ELSE variants.hq_quantity END
+        WHERE (EXCLUDED.original_price > 0 OR EXCLUDED.sale_price > 0 OR :is_hq)
+          AND variants.product_id IN (SELECT id FROM products WHERE brand_id = :brand_id)
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted
+"""
 
-            new_variants_data = []
-            variants_to_update = []
-            seen_new_barcodes = set()
+# allow_create=False: 기존 옵션만 갱신
+_UPDATE_VARIANTS_SQL = """
+    UPDATE variants v SET
+        original_price = CASE WHEN s.original_price > 0 THEN s.original_price ELSE v.original_price END,
+        sale_price = CASE WHEN s.sale_price > 0 THEN s.sale_price ELSE v.sale_price END,
+        hq_quantity = CASE WHEN :is_hq THEN COALESCE(s.hq_quantity, 0) ELSE v.hq_quantity END
+    FROM (
+        SELECT DISTINCT ON (barcode_cleaned) *
+        FROM inventory_staging
+        WHERE barcode_cleaned IS NOT NULL AND barcode_cleaned <> ''
+        ORDER BY barcode_cleaned, seq DESC
+    ) s
+    WHERE v.barcode_cleaned = s.barcode_cleaned
+      AND (s.original_price > 0 OR s.sale_price > 0 OR :is_hq)
+      AND v.product_id IN (SELECT id FROM products WHERE brand_id = :brand_id)
+      AND EXISTS (
+          SELECT 1 FROM products p
+          WHERE p.brand_id = :brand_id AND p.product_number_cleaned = s.product_number_cleaned
+      )
+"""
 
-            for item in records:
-                pn_clean = item.get('product_number_cleaned')
-                bc_clean = item.get('barcode_cleaned')
-                if not pn_clean or not bc_clean: continue
-
-                prod = product_map.get(pn_clean)
-                if not prod: continue 
-
-                if bc_clean not in variant_map and bc_clean not in seen_new_barcodes:
-                    if allow_create:
-                        new_variants_data.append({
-                            'product_id': prod.id,
-                            'barcode': item.get('barcode'),
-                            'color': item.get('color'),
-                            'size': item.get('size'),
-                            'original_price': item.get('original_price', 0),
-                            'sale_price': item.get('sale_price', 0),
-                            'hq_quantity': item.get('hq_stock', 0) if upload_mode == 'hq' else 0,
-                            'barcode_cleaned': bc_clean,
-                            'color_cleaned': clean_string_upper(item.get('color')),
-                            'size_cleaned': clean_string_upper(item.get('size'))
-                        })
-                        seen_new_barcodes.add(bc_clean)
-                elif bc_clean in variant_map:
-                    v = variant_map[bc_clean]
-                    update_dict = {'id': v.id}
-                    changed = False
-                    
-                    if item.get('original_price') and item['original_price'] > 0:
-                        update_dict['original_price'] = item['original_price']
-                        changed = True
-                    if item.get('sale_price') and item['sale_price'] > 0:
-                        update_dict['sale_price'] = item['sale_price']
-                        changed = True
-                    
-                    if upload_mode == 'hq' and 'hq_stock' in item:
-                        update_dict['hq_quantity'] = item['hq_stock']
-                        changed = True
-                    
-                    if changed:
-                        variants_to_update.append(update_dict)
+# 매장 재고 upsert + 변동 이력 생성. 모든 CTE는 같은 스냅샷을 보므로 prev는 갱신 전 수량
+_UPSERT_STORE_STOCK_SQL = """
+    WITH src AS (
+        SELECT DISTINCT ON (v.id) v.id AS variant_id, s.store_stock AS quantity
+        FROM inventory_staging s
+        JOIN variants v ON v.barcode_cleaned = s.barcode_cleaned
+        JOIN products p ON p.id = v.product_id AND p.brand_id = :brand_id
+        WHERE s.store_stock IS NOT NULL
+        ORDER BY v.id, s.seq DESC
+    ),
+    prev AS (
+        SELECT src.variant_id, ss.quantity AS old_quantity
+        FROM src
+        LEFT JOIN store_stock ss ON ss.store_id = :store_id AND ss.variant_id = src.variant_id
+    ),
+    upserted AS (
+        INSERT INTO store_stock (store_id, variant_id, quantity)
+        SELECT :store_id, variant_id, quantity FROM src
+        ON CONFLICT (store_id, variant_id) DO UPDATE SET quantity = EXCLUDED.quantity
+        WHERE store_stock.quantity IS DISTINCT FROM EXCLUDED.quantity
+        RETURNING variant_id, quantity
+    ),
+    history AS (
+        INSERT INTO stock_history (store_id, variant_id, change_type, quantity_change, current_quantity, created_at)
+        SELECT :store_id, u.variant_id, :change_type, u.quantity - COALESCE(prev.old_quantity, 0), u.quantity, :now
+        FROM upserted u
+        JOIN prev ON prev.variant_id = u.variant_id
+    )
+    SELECT COUNT(*) FILTER (WHERE prev.old_quantity IS NOT NULL)
+    FROM upserted u
+    JOIN prev ON prev.variant_id = u.variant_id
+"""
 
-            if new_variants_data:
-                db.session.bulk_insert_mappings(Variant, new_variants_data)
-                db.session.flush()
-                
-            if variants_to_update:
-                db.session.bulk_update_mappings(Variant, variants_to_update)
-                db.session.flush()
-
-            if upload_mode == 'store' and target_store_id:
-                all_variants_involved = db.session.query(Variant).join(Product).filter(
-                    Product.brand_id == brand_id,
-                    Variant.barcode_cleaned.in_(barcode_list)
-                ).all()
-                variant_id_map = {v.barcode_cleaned: v.id for v in all_variants_involved}
-                
-                variant_ids = list(variant_id_map.values())
-                existing_stocks = db.session.query(StoreStock).filter(
-                    StoreStock.store_id == target_store_id,
-                    StoreStock.variant_id.in_(variant_ids)
-                ).all()
-                stock_map = {s.variant_id: s for s in existing_stocks}
+# --- 묶음 단위 전체 DB 가져오기 (apply_import_job) ---
 
-                new_stocks_data = []
-                stocks_to_update = []
-                history_data = []
+# 앞 묶음에서 이미 만든 옵션은 건너뜀 (바코드별 첫 행 기준 유지, 같은 묶음을 다시 반영해도 안전)
+_INSERT_NEW_VARIANTS_FROM_STAGING_SQL = _INSERT_VARIANTS_FROM_STAGING_SQL + """
+    WHERE NOT EXISTS (
+        SELECT 1 FROM variants v
+        JOIN products vp ON vp.id = v.product_id
+        WHERE vp.brand_id = :brand_id AND v.barcode_cleaned = s.barcode_cleaned
+    )
+"""
 
-                for item in records:
-                    bc_clean = item.get('barcode_cleaned')
-                    v_id = variant_id_map.get(bc_clean)
-                    
-                    if v_id and 'store_stock' in item:
-                        new_qty = int(item['store_stock'])
-                        
-                        if v_id in stock_map:
-                            current_stock = stock_map[v_id]
-                            if current_stock.quantity != new_qty:
-                                change_amt = new_qty - current_stock.quantity
-                                stocks_to_update.append({
-                                    'id': current_stock.id,
-                                    'quantity': new_qty
-                                })
-                                history_data.append({
-                                    'store_id': target_store_id,
-                                    'variant_id': v_id,
-                                    'change_type': StockChangeType.EXCEL_UPLOAD,
-                                    'quantity_change': change_amt,
-                                    'current_quantity': new_qty,
-                                    'created_at': datetime.now()
-                                })
-                        else:
-                            new_stocks_data.append({
-                                'store_id': target_store_id,
-                                'variant_id': v_id,
-                                'quantity': new_qty
-                            })
-                            history_data.append({
-                                'store_id': target_store_id,
-                                'variant_id': v_id,
-                                'change_type': StockChangeType.EXCEL_UPLOAD,
-                                'quantity_change': new_qty,
-                                'current_quantity': new_qty,
-                                'created_at': datetime.now()
-                            })
+class InventoryService:
+    @staticmethod
+    def apply_stock_job(job, upload_mode, brand_id, target_store_id=None, allow_create=True, progress_callback=None):
+        """
+        중간 파일(InventoryJob)의 묶음을 순서대로 반영하고 묶음마다 커밋 후 체크포인트를 남깁니다.
+        재시도 시 마지막으로 커밋된 묶음 다음부터 이어서 처리합니다.
+        (묶음 반영은 같은 값으로 덮어쓰는 upsert라 체크포인트 직전에 중단되어 다시 반영해도 결과가 같음)
+        """
+        if job.rows == 0:
+            return 0, 0, "데이터가 없습니다."
 
-                if new_stocks_data:
-                    db.session.bulk_insert_mappings(StoreStock, new_stocks_data)
-                if stocks_to_update:
-                    db.session.bulk_update_mappings(StoreStock, stocks_to_update)
-                if history_data:
-                    db.session.bulk_insert_mappings(StockHistory, history_data)
+        if db.session.get_bind().dialect.name == 'postgresql':
+            apply_batch = InventoryService._apply_stock_batch_upsert
+        else:
+            apply_batch = InventoryService._apply_stock_batch
 
-            db.session.commit()
-            
-            if progress_callback:
-                progress_callback(total_items, total_items)
+        counts = job.state.get('counts') or {'updated': 0, 'new_products': 0, 'new_variants': 0}
+        processed = job.state.get('processed', 0)
+        try:
+            for index in range(job.next_chunk, job.chunks):
+                records = job.read_chunk(index)
+                # 뒤 묶음의 중복 바코드로 모두 대체된 묶음은 빈 목록
+                if records:
+                    updated, new_products, new_variants = apply_batch(
+                        records, upload_mode, brand_id, target_store_id, allow_create
+                    )
+                    db.session.commit()
 
-            return len(variants_to_update) + (len(stocks_to_update) if upload_mode=='store' else 0), len(new_variants_data), f"처리가 완료되었습니다. (상품 {len(new_products_data)}건, 옵션 {len(new_variants_data)}건 신규)"
+                    counts['updated'] += updated
+                    counts['new_products'] += new_products
+                    counts['new_variants'] += new_variants
+                processed += len(records)
+                job.checkpoint(index + 1, counts=counts, processed=processed)
+
+                if progress_callback:
+                    progress_callback(processed, job.rows)
 
         except Exception as e:
             db.session.rollback()
             traceback.print_exc()
             raise e
 
+        return counts['updated'], counts['new_variants'], f"처리가 완료되었습니다. (상품 {counts['new_products']}건, 옵션 {counts['new_variants']}건 신규)"
+
     @staticmethod
-    def full_import_db(records, brand_id, progress_callback=None):
-        try:
-            if not records:
-                return True, "데이터가 없습니다."
+    def _apply_stock_batch(records, upload_mode, brand_id, target_store_id, allow_create):
+        # ORM 객체 대신 필요한 컬럼만 조회하여 묶음이 끝나도 세션에 객체가 쌓이지 않도록 함
+        pn_list = list(set(item['product_number_cleaned'] for item in records if item.get('product_number_cleaned')))
+        barcode_list = list(set(item['barcode_cleaned'] for item in records if item.get('barcode_cleaned')))
 
-            total_items = len(records)
-            BATCH_SIZE = 2000
-            
-            store_ids = db.session.query(Store.id).filter_by(brand_id=brand_id).all()
-            store_ids = [s[0] for s in store_ids]
-            
-            if store_ids:
-                db.session.query(StoreStock).filter(StoreStock.store_id.in_(store_ids)).delete(synchronize_session=False)
-                db.session.query(StockHistory).filter(StockHistory.store_id.in_(store_ids)).delete(synchronize_session=False)
-            
-            product_ids = db.session.query(Product.id).filter_by(brand_id=brand_id).all()
-            product_ids = [p[0] for p in product_ids]
-            
-            if product_ids:
-                db.session.query(Variant).filter(Variant.product_id.in_(product_ids)).delete(synchronize_session=False)
-            
-            db.session.query(Product).filter_by(brand_id=brand_id).delete(synchronize_session=False)
-            db.session.commit()
+        existing_products = db.session.query(Product.product_number_cleaned, Product.id).filter(
+            Product.brand_id == brand_id,
+            Product.product_number_cleaned.in_(pn_list)
+        ).all()
+        product_map = {pn: p_id for pn, p_id in existing_products}
 
-            unique_products = {}
-            for item in records:
-                pn_clean = item.get('product_number_cleaned')
-                if pn_clean and pn_clean not in unique_products:
+        new_products_data = []
+        seen_new_pns = set()
+
+        for item in records:
+            pn_clean = item.get('product_number_cleaned')
+            if not pn_clean: continue
+            
+            if pn_clean not in product_map and pn_clean not in seen_new_pns:
+                if allow_create:
                     pname = item.get('product_name') or item.get('product_number')
-                    unique_products[pn_clean] = {
+                    new_products_data.append({
                         'brand_id': brand_id,
                         'product_number': item.get('product_number'),
                         'product_name': pname,
@@ -233,54 +240,355 @@ class InventoryService:
                         'release_year': item.get('release_year'),
                         'item_category': item.get('item_category'),
                         'is_favorite': item.get('is_favorite', 0)
-                    }
+                    })
+                    seen_new_pns.add(pn_clean)
+
+        if new_products_data:
+            db.session.bulk_insert_mappings(Product, new_products_data)
+            db.session.flush()
             
-            product_list = list(unique_products.values())
-            for i in range(0, len(product_list), BATCH_SIZE):
-                batch = product_list[i:i+BATCH_SIZE]
-                db.session.bulk_insert_mappings(Product, batch)
-                db.session.commit()
-                if progress_callback:
-                    progress_callback(i, total_items)
+            created_products = db.session.query(Product.product_number_cleaned, Product.id).filter(
+                Product.brand_id == brand_id,
+                Product.product_number_cleaned.in_(seen_new_pns)
+            ).all()
+            for pn, p_id in created_products:
+                product_map[pn] = p_id
 
-            all_products = db.session.query(Product.product_number_cleaned, Product.id).filter_by(brand_id=brand_id).all()
-            product_id_map = {p[0]: p[1] for p in all_products}
+        existing_variants = db.session.query(Variant.barcode_cleaned, Variant.id).join(Product).filter(
+            Product.brand_id == brand_id,
+            Variant.barcode_cleaned.in_(barcode_list)
+        ).all()
+        variant_map = {bc: v_id for bc, v_id in existing_variants}
 
-            variant_list = []
-            seen_barcodes = set()
-            
-            for item in records:
-                pn_clean = item.get('product_number_cleaned')
-                bc_clean = item.get('barcode_cleaned')
-                
-                if pn_clean in product_id_map and bc_clean and bc_clean not in seen_barcodes:
-                    variant_list.append({
-                        'product_id': product_id_map[pn_clean],
+        new_variants_data = []
+        variants_to_update = []
+        seen_new_barcodes = set()
+
+        for item in records:
+            pn_clean = item.get('product_number_cleaned')
+            bc_clean = item.get('barcode_cleaned')
+            if not pn_clean or not bc_clean: continue
+
+            prod_id = product_map.get(pn_clean)
+            if not prod_id: continue 
+
+            if bc_clean not in variant_map and bc_clean not in seen_new_barcodes:
+                if allow_create:
+                    new_variants_data.append({
+                        'product_id': prod_id,
                         'barcode': item.get('barcode'),
                         'color': item.get('color'),
                         'size': item.get('size'),
                         'original_price': item.get('original_price', 0),
                         'sale_price': item.get('sale_price', 0),
-                        'hq_quantity': item.get('hq_stock', 0),
+                        'hq_quantity': item.get('hq_stock', 0) if upload_mode == 'hq' else 0,
                         'barcode_cleaned': bc_clean,
                         'color_cleaned': clean_string_upper(item.get('color')),
                         'size_cleaned': clean_string_upper(item.get('size'))
                     })
-                    seen_barcodes.add(bc_clean)
+                    seen_new_barcodes.add(bc_clean)
+            elif bc_clean in variant_map:
+                update_dict = {'id': variant_map[bc_clean]}
+                changed = False
+                
+                if item.get('original_price') and item['original_price'] > 0:
+                    update_dict['original_price'] = item['original_price']
+                    changed = True
+                if item.get('sale_price') and item['sale_price'] > 0:
+                    update_dict['sale_price'] = item['sale_price']
+                    changed = True
+                
+                if upload_mode == 'hq' and 'hq_stock' in item:
+                    update_dict['hq_quantity'] = item['hq_stock']
+                    changed = True
+                
+                if changed:
+                    variants_to_update.append(update_dict)
+
+        if new_variants_data:
+            db.session.bulk_insert_mappings(Variant, new_variants_data)
+            db.session.flush()
+            
+        if variants_to_update:
+            db.session.bulk_update_mappings(Variant, variants_to_update)
+            db.session.flush()
+
+        stocks_to_update = []
+        if upload_mode == 'store' and target_store_id:
+            # 기존 옵션은 이미 조회했으므로 이번에 새로 만든 바코드의 ID만 추가 조회
+            variant_id_map = dict(variant_map)
+            if seen_new_barcodes:
+                created_variants = db.session.query(Variant.barcode_cleaned, Variant.id).filter(
+                    Variant.barcode_cleaned.in_(seen_new_barcodes)
+                ).all()
+                variant_id_map.update({bc: v_id for bc, v_id in created_variants})
+            
+            variant_ids = list(variant_id_map.values())
+            existing_stocks = db.session.query(StoreStock.variant_id, StoreStock.id, StoreStock.quantity).filter(
+                StoreStock.store_id == target_store_id,
+                StoreStock.variant_id.in_(variant_ids)
+            ).all()
+            stock_map = {v_id: (s_id, qty) for v_id, s_id, qty in existing_stocks}
+
+            new_stocks_data = []
+            history_data = []
+
+            for item in records:
+                bc_clean = item.get('barcode_cleaned')
+                v_id = variant_id_map.get(bc_clean)
+                
+                if v_id and 'store_stock' in item:
+                    new_qty = int(item['store_stock'])
+                    
+                    if v_id in stock_map:
+                        stock_id, current_qty = stock_map[v_id]
+                        if current_qty != new_qty:
+                            change_amt = new_qty - current_qty
+                            stocks_to_update.append({
+                                'id': stock_id,
+                                'quantity': new_qty
+                            })
+                            history_data.append({
+                                'store_id': target_store_id,
+                                'variant_id': v_id,
+                                'change_type': StockChangeType.EXCEL_UPLOAD,
+                                'quantity_change': change_amt,
+                                'current_quantity': new_qty,
+                                'created_at': datetime.now()
+                            })
+                    else:
+                        new_stocks_data.append({
+                            'store_id': target_store_id,
+                            'variant_id': v_id,
+                            'quantity': new_qty
+                        })
+                        history_data.append({
+                            'store_id': target_store_id,
+                            'variant_id': v_id,
+                            'change_type': StockChangeType.EXCEL_UPLOAD,
+                            'quantity_change': new_qty,
+                            'current_quantity': new_qty,
+                            'created_at': datetime.now()
+                        })
+
+            if new_stocks_data:
+                db.session.bulk_insert_mappings(StoreStock, new_stocks_data)
+            if stocks_to_update:
+                db.session.bulk_update_mappings(StoreStock, stocks_to_update)
+            if history_data:
+                db.session.bulk_insert_mappings(StockHistory, history_data)
+            db.session.flush()
+
+        return len(variants_to_update) + len(stocks_to_update), len(new_products_data), len(new_variants_data)
+
+    @staticmethod
+    def _apply_stock_batch_upsert(records, upload_mode, brand_id, target_store_id, allow_create):
+        """
+        배치를 스테이징 테이블에 COPY한 뒤 INSERT ... ON CONFLICT로 상품/옵션/매장재고를 반영합니다.
+        행 수와 관계없이 배치당 왕복 횟수가 일정하며, 큰 IN 목록을 바인드 파라미터로 보내지 않습니다.
+        """
+        InventoryService._reset_staging()
+        InventoryService._copy_to_staging(records)
+
+        params = {
+            'brand_id': brand_id,
+            'image_status': ImageProcessStatus.READY,
+            'is_hq': upload_mode == 'hq',
+        }
+
+        new_products = 0
+        if allow_create:
+            new_products = db.session.execute(text(_UPSERT_NEW_PRODUCTS_SQL), params).rowcount
+            new_variants, updated_variants = db.session.execute(text(_UPSERT_VARIANTS_SQL), params).one()
+        else:
+            new_variants = 0
+            updated_variants = db.session.execute(text(_UPDATE_VARIANTS_SQL), params).rowcount
+
+        updated_stocks = 0
+        if upload_mode == 'store' and target_store_id:
+            updated_stocks = db.session.execute(text(_UPSERT_STORE_STOCK_SQL), {
+                'brand_id': brand_id,
+                'store_id': target_store_id,
+                'change_type': StockChangeType.EXCEL_UPLOAD,
+                'now': datetime.now(),
+            }).scalar()
 
-            for i in range(0, len(variant_list), BATCH_SIZE):
-                batch = variant_list[i:i+BATCH_SIZE]
-                db.session.bulk_insert_mappings(Variant, batch)
+        return updated_variants + updated_stocks, new_products, new_variants
+
+    @staticmethod
+    def apply_import_job(job, brand_id, progress_callback=None):
+        """
+        전체 DB 가져오기를 묶음 단위로 수행합니다. 브랜드 카탈로그 삭제 후 체크포인트를 남기고,
+        묶음마다 신규 상품/옵션만 삽입하고 커밋합니다. 재시도 시 삭제는 다시 하지 않고 다음 묶음부터 이어서 처리합니다.
+        """
+        if job.rows == 0:
+            return True, "데이터가 없습니다."
+
+        if db.session.get_bind().dialect.name == 'postgresql':
+            apply_chunk = InventoryService._apply_import_chunk_copy
+        else:
+            apply_chunk = InventoryService._apply_import_chunk_orm
+
+        try:
+            if not job.state.get('catalogue_deleted'):
+                InventoryService._delete_brand_catalogue(brand_id)
+                db.session.commit()
+                job.checkpoint(0, catalogue_deleted=True)
+
+            counts = job.state.get('counts') or {'products': 0, 'variants': 0}
+            processed = job.state.get('processed', 0)
+            for index in range(job.next_chunk, job.chunks):
+                records = job.read_chunk(index)
+                product_count, variant_count = apply_chunk(records, brand_id)
                 db.session.commit()
-                if progress_callback:
-                    progress_callback(min(i + len(product_list), total_items), total_items)
 
-            if progress_callback:
-                progress_callback(total_items, total_items)
+                counts['products'] += product_count
+                counts['variants'] += variant_count
+                processed += len(records)
+                job.checkpoint(index + 1, counts=counts, processed=processed)
 
-            return True, f"초기화 완료: 상품 {len(product_list)}개, 옵션 {len(variant_list)}개 등록"
+                if progress_callback:
+                    progress_callback(processed, job.rows)
+
+            return True, f"초기화 완료: 상품 {counts['products']}개, 옵션 {counts['variants']}개 등록"
 
         except Exception as e:
             db.session.rollback()
             traceback.print_exc()
             raise e
+
+    @staticmethod
+    def _apply_import_chunk_copy(records, brand_id):
+        InventoryService._reset_staging()
+        InventoryService._copy_to_staging(records)
+
+        params = {'brand_id': brand_id, 'image_status': ImageProcessStatus.READY}
+        product_count = db.session.execute(text(_UPSERT_NEW_PRODUCTS_SQL), params).rowcount
+        variant_count = db.session.execute(text(_INSERT_NEW_VARIANTS_FROM_STAGING_SQL), params).rowcount
+        return product_count, variant_count
+
+    @staticmethod
+    def _apply_import_chunk_orm(records, brand_id):
+        # 앞 묶음에서 만든 상품/옵션은 건너뛰고 품번/바코드별 첫 행 기준으로 삽입 (PostgreSQL 경로와 같은 규칙)
+        pn_list = list(set(item['product_number_cleaned'] for item in records if item.get('product_number_cleaned')))
+        existing_products = db.session.query(Product.product_number_cleaned, Product.id).filter(
+            Product.brand_id == brand_id,
+            Product.product_number_cleaned.in_(pn_list)
+        ).all()
+        product_id_map = {pn: p_id for pn, p_id in existing_products}
+
+        new_products = {}
+        for item in records:
+            pn_clean = item.get('product_number_cleaned')
+            if pn_clean and pn_clean not in product_id_map and pn_clean not in new_products:
+                pname = item.get('product_name') or item.get('product_number')
+                new_products[pn_clean] = {
+                    'brand_id': brand_id,
+                    'product_number': item.get('product_number'),
+                    'product_name': pname,
+                    'product_number_cleaned': pn_clean,
+                    'product_name_cleaned': clean_string_upper(pname),
+                    'product_name_choseong': item.get('product_name_choseong'),
+                    'release_year': item.get('release_year'),
+                    'item_category': item.get('item_category'),
+                    'is_favorite': item.get('is_favorite', 0)
+                }
+
+        if new_products:
+            db.session.bulk_insert_mappings(Product, list(new_products.values()))
+            db.session.flush()
+            created = db.session.query(Product.product_number_cleaned, Product.id).filter(
+                Product.brand_id == brand_id,
+                Product.product_number_cleaned.in_(list(new_products))
+            ).all()
+            product_id_map.update({pn: p_id for pn, p_id in created})
+
+        barcode_list = list(set(item['barcode_cleaned'] for item in records if item.get('barcode_cleaned')))
+        seen_barcodes = set(bc for (bc,) in db.session.query(Variant.barcode_cleaned).join(Product).filter(
+            Product.brand_id == brand_id,
+            Variant.barcode_cleaned.in_(barcode_list)
+        ).all())
+
+        variant_list = []
+        for item in records:
+            pn_clean = item.get('product_number_cleaned')
+            bc_clean = item.get('barcode_cleaned')
+            if pn_clean in product_id_map and bc_clean and bc_clean not in seen_barcodes:
+                variant_list.append({
+                    'product_id': product_id_map[pn_clean],
+                    'barcode': item.get('barcode'),
+                    'color': item.get('color'),
+                    'size': item.get('size'),
+                    'original_price': item.get('original_price', 0),
+                    'sale_price': item.get('sale_price', 0),
+                    'hq_quantity': item.get('hq_stock', 0),
+                    'barcode_cleaned': bc_clean,
+                    'color_cleaned': clean_string_upper(item.get('color')),
+                    'size_cleaned': clean_string_upper(item.get('size'))
+                })
+                seen_barcodes.add(bc_clean)
+
+        if variant_list:
+            db.session.bulk_insert_mappings(Variant, variant_list)
+            db.session.flush()
+
+        return len(new_products), len(variant_list)
+
+    @staticmethod
+    def _delete_brand_catalogue(brand_id):
+        store_ids = db.session.query(Store.id).filter_by(brand_id=brand_id).all()
+        store_ids = [s[0] for s in store_ids]
+        
+        if store_ids:
+            db.session.query(StoreStock).filter(StoreStock.store_id.in_(store_ids)).delete(synchronize_session=False)
+            db.session.query(StockHistory).filter(StockHistory.store_id.in_(store_ids)).delete(synchronize_session=False)
+        
+        product_ids = db.session.query(Product.id).filter_by(brand_id=brand_id).all()
+        product_ids = [p[0] for p in product_ids]
+        
+        if product_ids:
+            db.session.query(Variant).filter(Variant.product_id.in_(product_ids)).delete(synchronize_session=False)
+        
+        db.session.query(Product).filter_by(brand_id=brand_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def _staging_row(seq, item):
+        pname = item.get('product_name') or item.get('product_number')
+        return (
+            seq,
+            item.get('product_number'),
+            pname,
+            item.get('product_number_cleaned'),
+            clean_string_upper(pname),
+            item.get('product_name_choseong'),
+            item.get('release_year'),
+            item.get('item_category'),
+            item.get('is_favorite', 0),
+            item.get('barcode'),
+            item.get('color'),
+            item.get('size'),
+            item.get('original_price', 0),
+            item.get('sale_price', 0),
+            item.get('hq_stock', 0),
+            item.get('barcode_cleaned'),
+            clean_string_upper(item.get('color')),
+            clean_string_upper(item.get('size')),
+            item.get('store_stock')
+        )
+
+    @staticmethod
+    def _reset_staging():
+        db.session.execute(text(_CREATE_STAGING_SQL))
+        db.session.execute(text("TRUNCATE inventory_staging"))
+
+    @staticmethod
+    def _copy_to_staging(records):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for seq, item in enumerate(records):
+            if item.get('product_number_cleaned'):
+                writer.writerow(InventoryService._staging_row(seq, item))
+        buffer.seek(0)
+
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(_COPY_STAGING_SQL, buffer)
@@ -0,0 +1,188 @@
+import time
+import threading
+from collections import defaultdict
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, or_, case, text, true, false
+from flowork.extensions import db
+from flowork.models import Product
+from flowork.utils import clean_string_upper
+
+# 검색 대상 필드 이름 -> Product 컬럼
+SEARCH_FIELDS = {
+    'number': Product.product_number_cleaned,
+    'name': Product.product_name_cleaned,
+    'choseong': Product.product_name_choseong,
+}
+ALL_FIELDS = ('number', 'name', 'choseong')
+
+NGRAM = 3
+# 메모리 인덱스 유효 시간 (초). 상품 수/최대 ID가 같아도 이름 수정 등을 반영하기 위해 주기적으로 재구성
+INDEX_MAX_AGE = 60
+# 메모리 인덱스 결과가 이보다 많으면 IN 목록 대신 LIKE 조건으로 조회 (SQLite 바인드 변수 한도)
+MAX_IN_IDS = 5000
+
+# pg_trgm GIN 인덱스 (flask create-search-index 로 생성)
+_TRGM_INDEXES = {
+    'ix_product_number_trgm': 'product_number_cleaned',
+    'ix_product_name_trgm': 'product_name_cleaned',
+    'ix_product_choseong_trgm': 'product_name_choseong',
+}
+
+def _escape_like(term):
+    return term.replace('/', '//').replace('%', '/%').replace('_', '/_')
+
+def _ngrams(s, n=NGRAM):
+    return {s[i:i + n] for i in range(len(s) - n + 1)}
+
+class _NgramIndex:
+    """
+    SQLite 등 pg_trgm이 없는 환경용 브랜드 단위 메모리 n-gram 역색인.
+    필드별로 n-gram -> 정렬된 상품 ID 배열을 보관하고, 교집합 후보를 부분 문자열로 재확인합니다.
+    """
+    def __init__(self, rows):
+        self.texts = {field: {} for field in ALL_FIELDS}
+        postings = {field: defaultdict(list) for field in ALL_FIELDS}
+
+        for row in rows:
+            pid = row[0]
+            for field, value in zip(ALL_FIELDS, row[1:]):
+                if not value:
+                    continue
+                self.texts[field][pid] = value
+                for gram in _ngrams(value):
+                    postings[field][gram].append(pid)
+
+        # 행은 id 순으로 읽으므로 각 목록은 이미 정렬되어 있음
+        self.postings = {
+            field: {gram: np.array(ids, dtype=np.int64) for gram, ids in grams.items()}
+            for field, grams in postings.items()
+        }
+
+    def search(self, term, fields):
+        matched = set()
+        for field in fields:
+            texts = self.texts[field]
+            if len(term) < NGRAM:
+                # 짧은 검색어는 n-gram으로 후보를 줄일 수 없으므로 직접 비교
+                matched.update(pid for pid, value in texts.items() if term in value)
+                continue
+
+            grams = sorted(_ngrams(term), key=lambda g: len(self.postings[field].get(g, ())))
+            candidates = self.postings[field].get(grams[0])
+            if candidates is None:
+                continue
+            for gram in grams[1:]:
+                if len(candidates) == 0:
+                    break
+                candidates = np.intersect1d(candidates, self.postings[field].get(gram, candidates[:0]), assume_unique=True)
+
+            matched.update(pid for pid in candidates.tolist() if term in texts[pid])
+        return matched
+
+class ProductSearch:
+    """
+    상품 검색 공통 API (품번/상품명/초성 부분 일치 + 순위).
+    PostgreSQL: pg_trgm GIN 인덱스가 LIKE '%term%' 조건을 처리합니다.
+    그 외(SQLite): 브랜드별 메모리 n-gram 인덱스로 후보 ID를 구한 뒤 IN 조건으로 조회합니다.
+    """
+    _lock = threading.Lock()
+
+    @staticmethod
+    def clean_term(query):
+        return clean_string_upper(query)
+
+    @staticmethod
+    def criterion(brand_id, query, fields=ALL_FIELDS):
+        """Product 쿼리의 filter()에 넣을 검색 조건을 반환합니다. (brand_id 조건은 호출부에서 지정)"""
+        term = ProductSearch.clean_term(query)
+        if not term:
+            return true()
+
+        if not ProductSearch._is_postgres():
+            ids = ProductSearch._get_memory_index(brand_id).search(term, fields)
+            if len(ids) <= MAX_IN_IDS:
+                return Product.id.in_(sorted(ids)) if ids else false()
+
+        pattern = f"%{_escape_like(term)}%"
+        return or_(*[SEARCH_FIELDS[f].like(pattern, escape='/') for f in fields])
+
+    @staticmethod
+    def rank(query, fields=ALL_FIELDS):
+        """검색어 기준 정렬 조건 목록: 앞부분 일치 우선, PostgreSQL에서는 trigram 유사도 순"""
+        term = ProductSearch.clean_term(query)
+        if not term:
+            return []
+
+        prefix = f"{_escape_like(term)}%"
+        whens = [(SEARCH_FIELDS[f].like(prefix, escape='/'), i) for i, f in enumerate(fields)]
+        order = [case(*whens, else_=len(fields))]
+
+        if ProductSearch._has_pg_trgm():
+            similarity = [func.similarity(SEARCH_FIELDS[f], term) for f in fields]
+            order.append((func.greatest(*similarity) if len(similarity) > 1 else similarity[0]).desc())
+        else:
+            order.append(func.length(SEARCH_FIELDS[fields[0]]))
+        return order
+
+    @staticmethod
+    def invalidate(brand_id):
+        """상품명/품번 수정 후 호출: 메모리 인덱스를 다음 검색 때 재구성"""
+        indexes = current_app.extensions.get('product_search_index')
+        if indexes is not None:
+            indexes.pop(brand_id, None)
+
+    @staticmethod
+    def create_indexes():
+        """pg_trgm 확장과 GIN 인덱스를 생성합니다. (PostgreSQL 전용, 운영 중 잠금 없이 CONCURRENTLY 생성)"""
+        if not ProductSearch._is_postgres():
+            return False
+
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for index_name, column in _TRGM_INDEXES.items():
+                conn.execute(text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                    f"ON products USING gin ({column} gin_trgm_ops)"
+                ))
+        current_app.extensions.pop('product_search_pg_trgm', None)
+        return True
+
+    @staticmethod
+    def _is_postgres():
+        return db.session.get_bind().dialect.name == 'postgresql'
+
+    @staticmethod
+    def _has_pg_trgm():
+        if not ProductSearch._is_postgres():
+            return False
+        cached = current_app.extensions.get('product_search_pg_trgm')
+        if cached is None:
+            cached = db.session.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).first() is not None
+            current_app.extensions['product_search_pg_trgm'] = cached
+        return cached
+
+    @staticmethod
+    def _get_memory_index(brand_id):
+        indexes = current_app.extensions.setdefault('product_search_index', {})
+        signature = db.session.query(func.count(Product.id), func.max(Product.id)).filter(
+            Product.brand_id == brand_id
+        ).one()
+        signature = tuple(signature)
+        now = time.monotonic()
+
+        entry = indexes.get(brand_id)
+        if entry and entry[0] == signature and now - entry[1] < INDEX_MAX_AGE:
+            return entry[2]
+
+        rows = db.session.query(
+            Product.id, Product.product_number_cleaned,
+            Product.product_name_cleaned, Product.product_name_choseong
+        ).filter(Product.brand_id == brand_id).order_by(Product.id).all()
+
+        index = _NgramIndex(rows)
+        with ProductSearch._lock:
+            indexes[brand_id] = (signature, now, index)
+        return index
@@ -1,9 +1,10 @@
 import traceback
 from sqlalchemy import func
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm import selectinload
 from flask import current_app
-from flowork.extensions import db, cache
+from flowork.extensions import db
 from flowork.models import Product, Variant, Store, StoreStock
+from flowork.services.stock_matrix import StockMatrixRegistry
 
 class ProductService:
     @staticmethod
@@ -81,42 +82,13 @@ class ProductService:
             raise e
 
     @staticmethod
-    @cache.memoize(timeout=300) # 5분간 캐싱 (브랜드 ID 기준)
     def get_stock_overview_matrix(brand_id):
+        """
+        통합 재고 매트릭스(StockOverviewMatrix)를 반환합니다.
+        워커별로 보관한 배열을 재고 변동 이력으로 증분 갱신하므로 전체 재조회 없이 최신 수량을 제공합니다.
+        """
         try:
-            current_app.logger.info(f"Fetching stock overview matrix for brand_id: {brand_id} (Not Cached)")
-            
-            all_stores = Store.query.filter(
-                Store.brand_id == brand_id,
-                Store.is_active == True
-            ).order_by(Store.store_name).all()
-            
-            store_id_set = {s.id for s in all_stores}
-
-            all_variants = db.session.query(Variant)\
-                .join(Product)\
-                .filter(Product.brand_id == brand_id)\
-                .options(
-                    joinedload(Variant.product),
-                    selectinload(Variant.stock_levels)
-                )\
-                .order_by(Product.product_number, Variant.color, Variant.size)\
-                .all()
-            
-            stock_matrix = {}
-            for v in all_variants:
-                stock_map_for_variant = {}
-                for stock_level in v.stock_levels:
-                    if stock_level.store_id in store_id_set:
-                        stock_map_for_variant[stock_level.store_id] = stock_level.quantity
-                
-                stock_matrix[v.id] = stock_map_for_variant
-                
-            return {
-                'all_stores': all_stores,
-                'all_variants': all_variants,
-                'stock_matrix': stock_matrix
-            }
+            return StockMatrixRegistry.get(brand_id)
         except Exception as e:
             current_app.logger.error(f"Error in ProductService.get_stock_overview_matrix: {e}")
             traceback.print_exc()
@@ -0,0 +1,69 @@
+import numpy as np
+from PIL import Image, ImageOps
+
+RESAMPLE_LANCZOS = Image.Resampling.LANCZOS
+
+# rembg U2netSession과 같은 입력 크기/정규화 값
+U2NET_INPUT_SIZE = (320, 320)
+U2NET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+U2NET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+def preprocess_batch(images):
+    """PIL 이미지 목록 -> (N, 3, 320, 320) float32 입력 텐서 (이미지별 최대값으로 나눈 뒤 평균/표준편차 정규화)"""
+    arr = np.stack([
+        np.asarray(img.convert('RGB').resize(U2NET_INPUT_SIZE, RESAMPLE_LANCZOS)) for img in images
+    ]).astype(np.float32)
+    peak = np.maximum(arr.max(axis=(1, 2, 3), keepdims=True), 1e-6)
+    arr = (arr / peak - U2NET_MEAN) / U2NET_STD
+    return np.ascontiguousarray(arr.transpose(0, 3, 1, 2))
+
+def masks_from_predictions(pred, sizes):
+    """모델 출력 (N, C, 320, 320)의 첫 채널을 이미지별 min-max 정규화해 원본 크기의 L 마스크로 변환"""
+    pred = pred[:, 0, :, :]
+    lo = pred.min(axis=(1, 2), keepdims=True)
+    hi = pred.max(axis=(1, 2), keepdims=True)
+    pred = (pred - lo) / np.maximum(hi - lo, 1e-6)
+    masks = (pred.clip(0, 1) * 255).astype(np.uint8)
+    return [Image.fromarray(m, mode='L').resize(size, RESAMPLE_LANCZOS) for m, size in zip(masks, sizes)]
+
+def cutout(img, mask):
+    """마스크를 알파로 사용하는 RGBA 결과 (rembg naive_cutout과 같이 색상에 알파를 곱함)"""
+    rgb = np.asarray(img.convert('RGB'), dtype=np.uint16)
+    alpha = np.asarray(mask, dtype=np.uint16)
+    out = np.empty(rgb.shape[:2] + (4,), dtype=np.uint8)
+    out[..., :3] = (rgb * alpha[..., None] + 127) // 255
+    out[..., 3] = alpha
+    return Image.fromarray(out, mode='RGBA')
+
+class BatchBackgroundRemover:
+    """
+    U2Net ONNX 모델을 직접 실행해 여러 이미지를 한 번에(N 배치) 배경 제거합니다.
+    전처리/마스크 후처리는 NumPy로 벡터화하며, 배치 차원이 1로 고정된 모델이면 이미지별로 실행합니다.
+    """
+    def __init__(self, model_path, batch_size=4, intra_op_threads=0):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        if intra_op_threads:
+            opts.intra_op_num_threads = int(intra_op_threads)
+        opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, sess_options=opts, providers=['CPUExecutionProvider'])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        fixed_batch = isinstance(model_input.shape[0], int) and model_input.shape[0] == 1
+        self.batch_size = 1 if fixed_batch else max(1, int(batch_size))
+
+    def predict(self, images):
+        """이미지 목록 -> 마스크 목록"""
+        pred = self.session.run(None, {self.input_name: preprocess_batch(images)})[0]
+        return masks_from_predictions(pred, [img.size for img in images])
+
+    def remove(self, images):
+        """이미지 목록 -> 배경이 제거된 RGBA 이미지 목록 (입력 순서 유지)"""
+        images = [ImageOps.exif_transpose(img) for img in images]
+        results = []
+        for start in range(0, len(images), self.batch_size):
+            chunk = images[start:start + self.batch_size]
+            results.extend(cutout(img, mask) for img, mask in zip(chunk, self.predict(chunk)))
+        return results
@@ -0,0 +1,341 @@
+import os
+import json
+import uuid
+import fcntl
+import shutil
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import select, func
+from flowork.extensions import db
+from flowork.models import Sale, SaleItem, Store, Product, Variant, StoreStock
+from flowork.constants import SaleStatus
+
+MANIFEST_FILENAME = 'manifest.json'
+EXTRACT_BATCH_SIZE = 50000
+UNCATEGORIZED = '미분류'
+
+# 월별 판매 품목 컬럼 (유효 판매의 남은 수량 기준, 컬럼마다 .npy 파일 1개)
+LINE_COLUMNS = {
+    'sale_date': 'datetime64[D]',
+    'store_id': np.int32,
+    'product_id': np.int32,
+    'variant_id': np.int32,
+    'quantity': np.int32,
+    'amount': np.int64,
+    'discount': np.int64,
+    'is_online': np.bool_,
+}
+# 추출 시점의 매장 재고 (판매율 계산용)
+STOCK_COLUMNS = {
+    'store_id': np.int32,
+    'product_id': np.int32,
+    'variant_id': np.int32,
+    'quantity': np.int32,
+}
+
+def month_key(d):
+    return f"{d.year:04d}-{d.month:02d}"
+
+def month_range(key):
+    """'YYYY-MM' -> (월 첫날, 다음 달 첫날)"""
+    year, month = int(key[:4]), int(key[5:7])
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+def months_between(start_date, end_date):
+    """start_date ~ end_date가 걸치는 월 키 목록"""
+    keys = []
+    key = month_key(start_date)
+    while key <= month_key(end_date):
+        keys.append(key)
+        key = month_key(month_range(key)[1])
+    return keys
+
+def _week_start(dates):
+    """datetime64[D] 배열 -> 그 주 월요일 (1970-01-01은 목요일)"""
+    days = dates.astype(np.int64)
+    return (days - (days + 3) % 7).astype('datetime64[D]')
+
+def _records(df):
+    # jsonify가 처리할 수 있도록 NumPy 스칼라를 파이썬 값으로 변환
+    return df.astype(object).where(pd.notna(df), None).to_dict('records')
+
+class SalesAnalytics:
+    """
+    브랜드 전체 판매 분석용 컬럼 저장소 (base_dir/브랜드ID/).
+    - 월별 디렉터리(YYYY-MM-토큰/)에 판매 품목을 컬럼별 .npy로 저장하고 조회 시 메모리 맵으로 읽습니다.
+    - 매장 재고/상품/매장 정보는 추출 시점 스냅숏(snapshot-토큰/)으로 저장합니다.
+    - manifest.json이 현재 사용할 디렉터리를 가리키며, 새 디렉터리를 모두 쓴 뒤 교체하므로 조회 중에도 갱신할 수 있습니다.
+    추출은 야간 주기 작업(현재/지난 달)과 CLI(전체 기간)로 하고, 조회는 DB를 사용하지 않습니다.
+    """
+    def __init__(self, brand_id, base_dir):
+        self.brand_id = brand_id
+        self.dir = os.path.join(base_dir, str(brand_id))
+        self.manifest = self._load_manifest()
+
+    @staticmethod
+    def for_brand(brand_id):
+        base_dir = current_app.config.get('SALES_ANALYTICS_DIR') or os.path.join(
+            current_app.config['UPLOAD_FOLDER'], 'sales_analytics'
+        )
+        return SalesAnalytics(brand_id, base_dir)
+
+    @property
+    def months(self):
+        return sorted(self.manifest['months'])
+
+    @property
+    def extracted_at(self):
+        snapshot = self.manifest.get('snapshot')
+        return snapshot['extracted_at'] if snapshot else None
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if isinstance(manifest, dict) and isinstance(manifest.get('months'), dict):
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'months': {}, 'snapshot': None}
+
+    def _save_manifest(self):
+        path = os.path.join(self.dir, MANIFEST_FILENAME)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    # --- 저장 ---
+
+    def _write_dir(self, prefix, columns, extra_files=None):
+        """컬럼(.npy)과 부가 JSON 파일을 새 디렉터리에 쓰고 디렉터리 이름을 반환"""
+        name = f"{prefix}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(self.dir, name)
+        os.makedirs(path, exist_ok=True)
+        for column, values in columns.items():
+            np.save(os.path.join(path, f"{column}.npy"), values)
+        for filename, data in (extra_files or {}).items():
+            with open(os.path.join(path, filename), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        return name
+
+    def _replace(self, month, entry):
+        """
+        manifest의 월(month=None이면 스냅숏) 항목을 새 디렉터리로 교체한 뒤 이전 디렉터리를 삭제합니다.
+        야간 작업과 수동 갱신이 겹쳐도 서로의 항목을 덮어쓰지 않도록 잠금 후 manifest를 다시 읽어 수정합니다.
+        """
+        with open(os.path.join(self.dir, f"{MANIFEST_FILENAME}.lock"), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.manifest = self._load_manifest()
+            if month:
+                old_entry = self.manifest['months'].get(month)
+                self.manifest['months'][month] = entry
+            else:
+                old_entry = self.manifest.get('snapshot')
+                self.manifest['snapshot'] = entry
+            self._save_manifest()
+        if old_entry:
+            shutil.rmtree(os.path.join(self.dir, old_entry['dir']), ignore_errors=True)
+
+    def write_month(self, key, columns):
+        """월 판매 품목 컬럼 저장 (LINE_COLUMNS 순서/형식으로 변환)"""
+        columns = {c: np.asarray(columns[c], dtype=dtype) for c, dtype in LINE_COLUMNS.items()}
+        rows = len(columns['sale_date'])
+        entry = {
+            'dir': self._write_dir(key, columns),
+            'rows': rows,
+            'extracted_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self._replace(key, entry)
+
+    def write_snapshot(self, stock, products, stores):
+        """매장 재고 컬럼과 상품/매장 정보 저장. products: [(id, 품번, 품명, 카테고리)], stores: [(id, 매장명)]"""
+        columns = {c: np.asarray(stock[c], dtype=dtype) for c, dtype in STOCK_COLUMNS.items()}
+        entry = {
+            'dir': self._write_dir('snapshot', columns, {
+                'products.json': [list(p) for p in products],
+                'stores.json': [list(s) for s in stores],
+            }),
+            'extracted_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self._replace(None, entry)
+
+    # --- 추출 (DB) ---
+
+    def extract_month(self, key):
+        """한 달 치 유효 판매 품목을 DB에서 묶음 단위로 읽어 컬럼 파일로 저장합니다. 반환값: 행 수"""
+        start, end = month_range(key)
+        query = (
+            select(Sale.sale_date, Sale.store_id, Variant.product_id, SaleItem.variant_id, SaleItem.quantity,
+                   func.coalesce(SaleItem.subtotal, 0),
+                   func.coalesce(SaleItem.discount_amount, 0) * SaleItem.quantity,
+                   func.coalesce(Sale.is_online, False))
+            .join(Sale, SaleItem.sale_id == Sale.id)
+            .join(Store, Store.id == Sale.store_id)
+            .join(Variant, Variant.id == SaleItem.variant_id)
+            .where(Store.brand_id == self.brand_id,
+                   Sale.sale_date >= start, Sale.sale_date < end,
+                   Sale.status == SaleStatus.VALID,
+                   SaleItem.quantity > 0)
+            .execution_options(yield_per=EXTRACT_BATCH_SIZE)
+        )
+        parts = {c: [] for c in LINE_COLUMNS}
+        for rows in db.session.execute(query).partitions():
+            for column, values in zip(LINE_COLUMNS, zip(*rows)):
+                parts[column].append(np.array(values, dtype=LINE_COLUMNS[column]))
+
+        columns = {
+            c: np.concatenate(chunks) if chunks else np.empty(0, dtype=LINE_COLUMNS[c])
+            for c, chunks in parts.items()
+        }
+        self.write_month(key, columns)
+        return len(columns['sale_date'])
+
+    def extract_snapshot(self):
+        """매장 재고(0이 아닌 행)와 상품/매장 정보를 저장합니다."""
+        stock_rows = db.session.execute(
+            select(StoreStock.store_id, Variant.product_id, StoreStock.variant_id, StoreStock.quantity)
+            .join(Store, Store.id == StoreStock.store_id)
+            .join(Variant, Variant.id == StoreStock.variant_id)
+            .where(Store.brand_id == self.brand_id, StoreStock.quantity != 0)
+        ).all()
+        stock = {c: [row[i] for row in stock_rows] for i, c in enumerate(STOCK_COLUMNS)}
+        products = db.session.execute(
+            select(Product.id, Product.product_number, Product.product_name, Product.item_category)
+            .where(Product.brand_id == self.brand_id)
+        ).all()
+        stores = db.session.execute(
+            select(Store.id, Store.store_name).where(Store.brand_id == self.brand_id)
+        ).all()
+        self.write_snapshot(stock, products, stores)
+
+    def refresh(self, months=None):
+        """지정한 월(기본: 지난 달, 이번 달)과 스냅숏을 다시 추출합니다. 반환값: 월별 행 수"""
+        if months is None:
+            today = date.today()
+            months = months_between(today.replace(day=1) - timedelta(days=1), today)
+        counts = {key: self.extract_month(key) for key in months}
+        self.extract_snapshot()
+        return counts
+
+    # --- 조회 (NumPy/pandas, DB 사용 안 함) ---
+
+    def _load_columns(self, entry, spec):
+        path = os.path.join(self.dir, entry['dir'])
+        return {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode='r') for c in spec}
+
+    def lines(self, start_date, end_date):
+        """기간의 판매 품목 컬럼 (컬럼명 -> 배열). 기간 전체가 포함된 월은 복사 없이 메모리 맵을 그대로 사용"""
+        start, end = np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D')
+        parts = []
+        for key in self.months:
+            month_start, month_end = month_range(key)
+            if month_start > end_date or month_end <= start_date:
+                continue
+            columns = self._load_columns(self.manifest['months'][key], LINE_COLUMNS)
+            if month_start < start_date or month_end > end_date:
+                dates = columns['sale_date']
+                mask = (dates >= start) & (dates <= end)
+                columns = {c: v[mask] for c, v in columns.items()}
+            parts.append(columns)
+
+        if not parts:
+            return {c: np.empty(0, dtype=dtype) for c, dtype in LINE_COLUMNS.items()}
+        if len(parts) == 1:
+            return parts[0]
+        return {c: np.concatenate([p[c] for p in parts]) for c in LINE_COLUMNS}
+
+    def _snapshot(self):
+        entry = self.manifest.get('snapshot')
+        if not entry:
+            empty = {c: np.empty(0, dtype=dtype) for c, dtype in STOCK_COLUMNS.items()}
+            return empty, pd.DataFrame(columns=['product_number', 'product_name', 'category']), pd.Series(dtype=object)
+        path = os.path.join(self.dir, entry['dir'])
+        with open(os.path.join(path, 'products.json'), 'r', encoding='utf-8') as f:
+            products = pd.DataFrame(json.load(f), columns=['product_id', 'product_number', 'product_name', 'category'])
+        with open(os.path.join(path, 'stores.json'), 'r', encoding='utf-8') as f:
+            stores = pd.DataFrame(json.load(f), columns=['store_id', 'store_name'])
+        products['category'] = products['category'].fillna(UNCATEGORIZED)
+        return (self._load_columns(entry, STOCK_COLUMNS),
+                products.set_index('product_id'),
+                stores.set_index('store_id')['store_name'])
+
+    def store_category_week(self, start_date, end_date):
+        """매장 x 카테고리 x 주(월요일 시작)별 판매 수량/금액"""
+        lines = self.lines(start_date, end_date)
+        _, products, stores = self._snapshot()
+
+        # 상품 ID -> 카테고리 코드 (벡터화 조회, 스냅숏에 없는 상품은 미분류)
+        categories = pd.Categorical(products['category'])
+        labels = list(categories.categories)
+        codes = np.asarray(categories.codes)
+        position = products.index.get_indexer(lines['product_id'])
+        found = position >= 0
+        category_code = np.full(len(position), -1, dtype=np.int64)
+        category_code[found] = codes[position[found]]
+        if (category_code < 0).any():
+            if UNCATEGORIZED not in labels:
+                labels.append(UNCATEGORIZED)
+            category_code = np.where(category_code < 0, labels.index(UNCATEGORIZED), category_code)
+
+        df = pd.DataFrame({
+            'store_id': lines['store_id'],
+            'category': category_code,
+            'week': _week_start(lines['sale_date']),
+            'quantity': lines['quantity'],
+            'amount': lines['amount'],
+        })
+        grouped = df.groupby(['week', 'store_id', 'category'], sort=True)[['quantity', 'amount']].sum().reset_index()
+        grouped['week'] = grouped['week'].dt.strftime('%Y-%m-%d')
+        grouped['category'] = np.asarray(labels, dtype=object)[grouped['category'].to_numpy()]
+        grouped.insert(2, 'store_name', grouped['store_id'].map(stores))
+        return grouped
+
+    def _by_product(self, start_date, end_date):
+        lines = self.lines(start_date, end_date)
+        df = pd.DataFrame({'product_id': lines['product_id'], 'quantity': lines['quantity'], 'amount': lines['amount']})
+        return df.groupby('product_id')[['quantity', 'amount']].sum()
+
+    def _with_product_info(self, df, products):
+        info = products.reindex(df.index)
+        df = df.join(info)
+        df['category'] = df['category'].fillna(UNCATEGORIZED)
+        return df.reset_index()
+
+    def top_styles(self, start_date, end_date, n=20, by='amount'):
+        """판매 금액(또는 수량) 상위 N개 품번"""
+        by = by if by in ('amount', 'quantity') else 'amount'
+        _, products, _ = self._snapshot()
+        sold = self._by_product(start_date, end_date)
+        top = sold.sort_values([by, 'quantity' if by == 'amount' else 'amount'], ascending=False, kind='stable').head(n)
+        return self._with_product_info(top, products)
+
+    def sell_through(self, start_date, end_date, n=None):
+        """품번별 판매율: 기간 판매 수량 / (기간 판매 수량 + 추출 시점 매장 재고). 판매 수량순"""
+        stock, products, _ = self._snapshot()
+        sold = self._by_product(start_date, end_date)['quantity'].rename('sold')
+        on_hand = pd.Series(stock['quantity'], index=stock['product_id']).clip(lower=0).groupby(level=0).sum().rename('stock')
+
+        df = pd.concat([sold, on_hand], axis=1).fillna(0).astype(np.int64)
+        df = df[df['sold'] > 0]
+        total = df['sold'] + df['stock']
+        df['sell_through'] = (df['sold'] / total).round(4)
+        df.index.name = 'product_id'
+        df = df.sort_values(['sold', 'sell_through'], ascending=False, kind='stable')
+        if n:
+            df = df.head(n)
+        return self._with_product_info(df, products)
+
+    def report(self, name, start_date, end_date, n=20, by='amount'):
+        """API용 보고서 (JSON 변환 가능한 레코드 목록)"""
+        if name == 'store_category_week':
+            return _records(self.store_category_week(start_date, end_date))
+        if name == 'top_styles':
+            return _records(self.top_styles(start_date, end_date, n=n, by=by))
+        if name == 'sell_through':
+            return _records(self.sell_through(start_date, end_date, n=n))
+        raise ValueError(f"지원하지 않는 보고서입니다: {name}")
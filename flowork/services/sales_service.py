@@ -1,103 +1,143 @@
 import traceback
 from datetime import datetime, date
-from sqlalchemy import func, exc
+from sqlalchemy import func, select, insert, update, delete, case, exists, values, column, Integer
+from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects import postgresql, sqlite
 from flask import current_app
 from flowork.extensions import db
-from flowork.models import Sale, SaleItem, StoreStock, StockHistory, Variant, Store
+from flowork.models import Sale, SaleItem, SaleDailyCounter, DailySalesSummary, StoreStock, StockHistory, Variant, Store
 from flowork.constants import SaleStatus, StockChangeType
 
+# 일자별 판매 집계 컬럼 (DailySalesSummary)
+SUMMARY_FIELDS = (
+    'sale_count', 'total_amount', 'discount_amount', 'refund_count', 'refund_amount',
+    'online_count', 'online_amount', 'offline_count', 'offline_amount',
+)
+
+def _dialect_insert():
+    # ON CONFLICT 구문은 방언별 insert 구성자를 사용 (운영 PostgreSQL, 테스트 SQLite)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert
+    return sqlite.insert
+
 class SalesService:
     @staticmethod
     def create_sale(store_id, user_id, sale_date_str, items, payment_method, is_online):
         try:
-            store = db.session.query(Store).with_for_update().get(store_id)
+            # 재고 잠금 전에 빈 판매 요청을 거절
+            if not items:
+                raise ValueError("판매할 상품이 없습니다.")
+
+            # 매장 행은 잠그지 않음 (영수증 번호는 트랜잭션 끝에서 매장/일자 카운터로 발급)
+            store = db.session.get(Store, store_id)
             if not store:
                 raise ValueError("매장을 찾을 수 없습니다.")
 
             sale_date = datetime.strptime(sale_date_str, '%Y-%m-%d').date() if sale_date_str else date.today()
-            
-            last_sale = Sale.query.filter_by(store_id=store_id, sale_date=sale_date)\
-                                  .order_by(Sale.daily_number.desc()).first()
-            next_num = (last_sale.daily_number + 1) if last_sale else 1
-            
-            new_sale = Sale(
-                store_id=store_id,
-                user_id=user_id,
-                payment_method=payment_method,
-                sale_date=sale_date,
-                daily_number=next_num,
-                status=SaleStatus.VALID,
-                is_online=is_online
-            )
-            db.session.add(new_sale)
-            db.session.flush()
-            
-            total_amount = 0
-            
+
+            # 1. 입력 검증 및 옵션/상품 일괄 조회 (품목 수와 관계없이 한 번)
+            lines = []
             for item in items:
-                variant_id = item.get('variant_id')
-                
                 try:
                     qty = int(item.get('quantity', 1))
                 except (ValueError, TypeError):
                     raise ValueError("수량은 숫자여야 합니다.")
-                    
+
                 if qty <= 0:
                     raise ValueError(f"판매 수량은 1개 이상이어야 합니다. 입력값: {qty}")
-                
-                variant = db.session.get(Variant, variant_id)
-                if not variant:
-                    raise ValueError(f"상품 정보를 찾을 수 없습니다. Variant ID: {variant_id}")
 
-                unit_price = variant.sale_price
-                
+                try:
+                    variant_id = int(item.get('variant_id'))
+                except (ValueError, TypeError):
+                    raise ValueError(f"상품 정보를 찾을 수 없습니다. Variant ID: {item.get('variant_id')}")
+
                 discount_amt = int(item.get('discount_amount', 0))
                 if discount_amt < 0: discount_amt = 0
-                if discount_amt > unit_price:
+                lines.append((variant_id, qty, discount_amt))
+
+            variant_map = SalesService._load_variants([variant_id for variant_id, _, _ in lines])
+
+            for variant_id, _, discount_amt in lines:
+                variant = variant_map.get(variant_id)
+                if not variant:
+                    raise ValueError(f"상품 정보를 찾을 수 없습니다. Variant ID: {variant_id}")
+                if discount_amt > variant.sale_price:
                     raise ValueError(f"할인 금액이 상품 가격보다 클 수 없습니다. {variant.product.product_name}")
 
+            # 2. 필요한 매장 재고 행을 variant_id 순서로 한 번에 잠금 (없는 행은 생성 후 잠금)
+            stock_map = SalesService._lock_store_stocks(store_id, list(variant_map))
+
+            # 3. 품목별 재고 차감 (같은 옵션이 여러 줄이면 순서대로 누적) 후 일괄 반영
+            total_amount = 0
+            total_discount = 0
+            sale_items = []
+            histories = []
+            now = datetime.now()
+
+            for variant_id, qty, discount_amt in lines:
+                variant = variant_map[variant_id]
+                unit_price = variant.sale_price
                 discounted_price = unit_price - discount_amt
                 subtotal = discounted_price * qty
-                
-                stock = db.session.query(StoreStock).filter_by(store_id=store_id, variant_id=variant_id).with_for_update().first()
-                if not stock:
-                    try:
-                        with db.session.begin_nested():
-                            stock = StoreStock(store_id=store_id, variant_id=variant_id, quantity=0)
-                            db.session.add(stock)
-                    except exc.IntegrityError:
-                        stock = db.session.query(StoreStock).filter_by(store_id=store_id, variant_id=variant_id).with_for_update().first()
-                
-                stock.quantity -= qty
-                
-                history = StockHistory(
-                    store_id=store_id,
-                    variant_id=variant_id,
-                    change_type=StockChangeType.SALE,
-                    quantity_change=-qty,
-                    current_quantity=stock.quantity,
-                    user_id=user_id
-                )
-                db.session.add(history)
-                
-                sale_item = SaleItem(
-                    sale_id=new_sale.id,
-                    variant_id=variant_id,
-                    product_name=variant.product.product_name,
-                    product_number=variant.product.product_number,
-                    color=variant.color,
-                    size=variant.size,
-                    original_price=variant.original_price,
-                    unit_price=unit_price,
-                    discount_amount=discount_amt,
-                    discounted_price=discounted_price,
-                    quantity=qty,
-                    subtotal=subtotal
-                )
-                db.session.add(sale_item)
+
+                stock_id, quantity = stock_map[variant_id]
+                quantity -= qty
+                stock_map[variant_id] = (stock_id, quantity)
+
+                histories.append({
+                    'store_id': store_id,
+                    'variant_id': variant_id,
+                    'change_type': StockChangeType.SALE,
+                    'quantity_change': -qty,
+                    'current_quantity': quantity,
+                    'user_id': user_id,
+                    'created_at': now
+                })
+                sale_items.append({
+                    'variant_id': variant_id,
+                    'product_name': variant.product.product_name,
+                    'product_number': variant.product.product_number,
+                    'color': variant.color,
+                    'size': variant.size,
+                    'original_price': variant.original_price,
+                    'unit_price': unit_price,
+                    'discount_amount': discount_amt,
+                    'discounted_price': discounted_price,
+                    'quantity': qty,
+                    'subtotal': subtotal
+                })
                 total_amount += subtotal
-                
-            new_sale.total_amount = total_amount
+                total_discount += discount_amt * qty
+
+            SalesService._update_stock_quantities(stock_map.values())
+            if histories:
+                db.session.execute(insert(StockHistory), histories)
+
+            # 4. 영수증 번호 발급 후 판매/품목 저장 (카운터 행 잠금은 여기서 커밋까지만 유지)
+            new_sale = Sale(
+                store_id=store_id,
+                user_id=user_id,
+                payment_method=payment_method,
+                sale_date=sale_date,
+                daily_number=SalesService._next_daily_number(store_id, sale_date),
+                status=SaleStatus.VALID,
+                is_online=is_online,
+                total_amount=total_amount
+            )
+            db.session.add(new_sale)
+            db.session.flush()
+
+            for sale_item in sale_items:
+                sale_item['sale_id'] = new_sale.id
+            if sale_items:
+                db.session.execute(insert(SaleItem), sale_items)
+
+            SalesService._apply_daily_summary(
+                store_id, sale_date, is_online,
+                sale_count=1, total_amount=total_amount, discount_amount=total_discount,
+                channel_count=1, channel_amount=total_amount
+            )
+
             db.session.commit()
             
             return {
@@ -112,6 +152,271 @@ class SalesService:
             traceback.print_exc()
             return {'status': 'error', 'message': f'판매 등록 중 오류 발생: {str(e)}'}
 
+    @staticmethod
+    def _next_daily_number(store_id, sale_date):
+        """
+        (매장, 일자) 카운터를 UPDATE ... RETURNING으로 1 증가시켜 영수증 번호를 발급합니다.
+        카운터 행 잠금은 커밋까지 유지되므로 트랜잭션 마지막에 호출합니다.
+        카운터가 없는 날은 그날 판매의 최대 번호로 먼저 만듭니다. (동시에 만들면 ON CONFLICT로 하나만 생성)
+        """
+        increment = (
+            update(SaleDailyCounter)
+            .where(SaleDailyCounter.store_id == store_id, SaleDailyCounter.sale_date == sale_date)
+            .values(last_number=SaleDailyCounter.last_number + 1)
+            .returning(SaleDailyCounter.last_number)
+            .execution_options(synchronize_session=False)
+        )
+        number = db.session.execute(increment).scalar()
+        if number is None:
+            last_number = select(func.coalesce(func.max(Sale.daily_number), 0)).where(
+                Sale.store_id == store_id, Sale.sale_date == sale_date
+            ).scalar_subquery()
+            db.session.execute(
+                _dialect_insert()(SaleDailyCounter)
+                .values(store_id=store_id, sale_date=sale_date, last_number=last_number)
+                .on_conflict_do_nothing(index_elements=['store_id', 'sale_date'])
+            )
+            number = db.session.execute(increment).scalar()
+        return number
+
+    @staticmethod
+    def _apply_daily_summary(store_id, sale_date, is_online, channel_count=0, channel_amount=0, **deltas):
+        """
+        매장/일자 집계 행에 증감분을 더합니다. (판매/환불 트랜잭션 안, 커밋 직전에 호출)
+        channel_count/channel_amount는 판매의 온라인 여부에 따라 online_*/offline_* 컬럼에 반영합니다.
+        집계 행이 없는 날은 이미 반영된 현재 판매 데이터로 그날 행을 만들므로 증감분을 따로 더하지 않습니다.
+        """
+        channel = 'online' if is_online else 'offline'
+        deltas[f'{channel}_count'] = channel_count
+        deltas[f'{channel}_amount'] = channel_amount
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+
+        add_deltas = (
+            update(DailySalesSummary)
+            .where(DailySalesSummary.store_id == store_id, DailySalesSummary.sale_date == sale_date)
+            .values({k: getattr(DailySalesSummary, k) + v for k, v in deltas.items()})
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.execute(add_deltas).rowcount:
+            return
+
+        seed = SalesService._summary_select(Sale.store_id == store_id, Sale.sale_date == sale_date)
+        inserted = db.session.execute(
+            _dialect_insert()(DailySalesSummary)
+            .from_select(['store_id', 'sale_date', *SUMMARY_FIELDS], seed)
+            .on_conflict_do_nothing(index_elements=['store_id', 'sale_date'])
+        ).rowcount
+        if not inserted:
+            # 동시에 다른 트랜잭션이 먼저 만든 행 (그 시점에는 이 판매가 보이지 않았으므로 증감분을 더함)
+            db.session.execute(add_deltas)
+
+    @staticmethod
+    def _summary_select(*filters):
+        """sales/sale_items에서 매장/일자별 집계를 계산하는 SELECT (컬럼 순서: store_id, sale_date, SUMMARY_FIELDS)"""
+        per_sale = (
+            select(Sale.store_id, Sale.sale_date, Sale.status, Sale.is_online,
+                   func.coalesce(Sale.total_amount, 0).label('amount'),
+                   func.coalesce(func.sum(SaleItem.discount_amount * SaleItem.quantity), 0).label('discount'))
+            .outerjoin(SaleItem, SaleItem.sale_id == Sale.id)
+            .where(*filters)
+            .group_by(Sale.id)
+            .subquery()
+        )
+        valid = per_sale.c.status == SaleStatus.VALID
+        refunded = per_sale.c.status == SaleStatus.REFUNDED
+        online = valid & per_sale.c.is_online.is_(True)
+        offline = valid & per_sale.c.is_online.is_not(True)
+
+        def total(condition, value):
+            return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+        columns = {
+            'sale_count': total(valid, 1),
+            'total_amount': total(valid, per_sale.c.amount),
+            'discount_amount': total(valid, per_sale.c.discount),
+            'refund_count': total(refunded, 1),
+            'refund_amount': total(refunded, per_sale.c.amount),
+            'online_count': total(online, 1),
+            'online_amount': total(online, per_sale.c.amount),
+            'offline_count': total(offline, 1),
+            'offline_amount': total(offline, per_sale.c.amount),
+        }
+        return (
+            select(per_sale.c.store_id, per_sale.c.sale_date, *(columns[f].label(f) for f in SUMMARY_FIELDS))
+            .group_by(per_sale.c.store_id, per_sale.c.sale_date)
+        )
+
+    @staticmethod
+    def rebuild_daily_summary(store_id=None, start_date=None, end_date=None):
+        """
+        판매 데이터로 일자별 집계를 다시 계산합니다. (범위 안의 기존 집계 행은 삭제 후 재생성)
+        반환값: 생성된 집계 행 수
+        """
+        sale_filters, summary_filters = [], []
+        if store_id:
+            sale_filters.append(Sale.store_id == store_id)
+            summary_filters.append(DailySalesSummary.store_id == store_id)
+        if start_date:
+            sale_filters.append(Sale.sale_date >= start_date)
+            summary_filters.append(DailySalesSummary.sale_date >= start_date)
+        if end_date:
+            sale_filters.append(Sale.sale_date <= end_date)
+            summary_filters.append(DailySalesSummary.sale_date <= end_date)
+
+        try:
+            db.session.execute(delete(DailySalesSummary).where(*summary_filters))
+            rows = db.session.execute(
+                insert(DailySalesSummary).from_select(
+                    ['store_id', 'sale_date', *SUMMARY_FIELDS], SalesService._summary_select(*sale_filters)
+                )
+            ).rowcount
+            db.session.commit()
+            return rows
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def get_period_summary(store_id, start_date, end_date, sale_total=None):
+        """
+        기간 판매 통계 (유효 판매 기준 금액/할인액/건수 + 온라인/오프라인, 전체 환불 건수/금액).
+        하루는 판매 데이터를 직접 집계하고, 그보다 긴 기간은 일자별 집계 테이블의 합계를 읽습니다.
+        sale_total(기간 전체 판매 건수)을 주면 집계 합계와 비교해, 집계가 없거나 일부만 있는 기간은 직접 집계합니다.
+        """
+        live_filters = (Sale.store_id == store_id, Sale.sale_date >= start_date, Sale.sale_date <= end_date)
+        sums = None
+        if start_date < end_date:
+            row = db.session.execute(
+                select(*(func.coalesce(func.sum(getattr(DailySalesSummary, f)), 0) for f in SUMMARY_FIELDS))
+                .where(DailySalesSummary.store_id == store_id,
+                       DailySalesSummary.sale_date >= start_date,
+                       DailySalesSummary.sale_date <= end_date)
+            ).one()
+            sums = dict(zip(SUMMARY_FIELDS, row))
+            if sale_total is not None and (sums['sale_count'] or 0) + (sums['refund_count'] or 0) != sale_total:
+                sums = None
+        if sums is None:
+            live = SalesService._summary_select(*live_filters).subquery()
+            row = db.session.execute(
+                select(*(func.coalesce(func.sum(live.c[f]), 0) for f in SUMMARY_FIELDS))
+            ).one()
+            sums = dict(zip(SUMMARY_FIELDS, row))
+        return {f: int(sums.get(f) or 0) for f in SUMMARY_FIELDS}
+
+    @staticmethod
+    def get_daily_summaries(store_id, start_date, end_date, sale_total=None):
+        """
+        기간의 일자별 집계 행 (판매가 없는 날은 제외, 날짜순)
+        sale_total을 주면 집계 합계와 비교해, 집계가 없거나 일부만 있는 기간은 판매 데이터를 직접 집계합니다.
+        """
+        summaries = DailySalesSummary.query.filter(
+            DailySalesSummary.store_id == store_id,
+            DailySalesSummary.sale_date >= start_date,
+            DailySalesSummary.sale_date <= end_date
+        ).order_by(DailySalesSummary.sale_date).all()
+        if sale_total is None or sum(s.sale_count + s.refund_count for s in summaries) == sale_total:
+            return summaries
+
+        live = SalesService._summary_select(
+            Sale.store_id == store_id, Sale.sale_date >= start_date, Sale.sale_date <= end_date
+        ).subquery()
+        return db.session.execute(select(live).order_by(live.c.sale_date)).all()
+
+    @staticmethod
+    def _load_variants(variant_ids):
+        """옵션과 상품을 한 번의 조인 쿼리로 조회 (variant_id -> Variant)"""
+        ids = set(variant_ids)
+        if not ids:
+            return {}
+        variants = Variant.query.options(joinedload(Variant.product)).filter(Variant.id.in_(ids)).all()
+        return {v.id: v for v in variants}
+
+    @staticmethod
+    def _lock_store_stocks(store_id, variant_ids):
+        """
+        매장 재고 행을 variant_id 순서로 한 번에 FOR UPDATE 잠금합니다. (동시 판매 간 잠금 순서를 같게 해 교착 방지)
+        없는 행은 ON CONFLICT DO NOTHING으로 한 번에 만든 뒤 그 행들만 다시 잠급니다.
+        반환값: variant_id -> (store_stock.id, quantity)
+        """
+        variant_ids = sorted(set(variant_ids))
+
+        def lock(ids):
+            rows = db.session.execute(
+                select(StoreStock.variant_id, StoreStock.id, StoreStock.quantity)
+                .where(StoreStock.store_id == store_id, StoreStock.variant_id.in_(ids))
+                .order_by(StoreStock.variant_id)
+                .with_for_update()
+            ).all()
+            return {v_id: (s_id, qty or 0) for v_id, s_id, qty in rows}
+
+        stock_map = lock(variant_ids)
+        missing = [v_id for v_id in variant_ids if v_id not in stock_map]
+        if missing:
+            insert_stmt = _dialect_insert()(StoreStock).values(
+                [{'store_id': store_id, 'variant_id': v_id, 'quantity': 0} for v_id in missing]
+            ).on_conflict_do_nothing(index_elements=['store_id', 'variant_id'])
+            db.session.execute(insert_stmt)
+            stock_map.update(lock(missing))
+        return stock_map
+
+    @staticmethod
+    def _update_stock_quantities(stocks):
+        """(store_stock.id, 새 수량) 목록을 UPDATE 한 번으로 반영"""
+        quantities = {stock_id: quantity for stock_id, quantity in stocks}
+        if not quantities:
+            return
+        db.session.execute(
+            update(StoreStock)
+            .where(StoreStock.id.in_(list(quantities)))
+            .values(quantity=case(quantities, value=StoreStock.id))
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def _restore_stocks(store_id, user_id, lines, change_type):
+        """
+        환불 품목 (variant_id, 수량) 목록만큼 매장 재고를 되돌립니다.
+        옵션별 합계를 VALUES로 묶어 UPDATE store_stock ... FROM ... RETURNING 한 번으로 반영하고,
+        반환된 최종 수량에서 줄별 누적 수량을 계산해 재고 이력을 한 번에 저장합니다.
+        """
+        totals = {}
+        for variant_id, qty in lines:
+            totals[variant_id] = totals.get(variant_id, 0) + qty
+        if not totals:
+            return
+
+        # create_sale과 같은 순서로 잠금 (없는 재고 행은 여기서 생성)
+        SalesService._lock_store_stocks(store_id, list(totals))
+
+        refund_lines = values(
+            column('variant_id', Integer), column('quantity', Integer), name='refund_lines'
+        ).data(sorted(totals.items())).cte('refund_lines')
+        restored = db.session.execute(
+            update(StoreStock)
+            .where(StoreStock.store_id == store_id, StoreStock.variant_id == refund_lines.c.variant_id)
+            .values(quantity=func.coalesce(StoreStock.quantity, 0) + refund_lines.c.quantity)
+            .returning(StoreStock.variant_id, StoreStock.quantity)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        current = {variant_id: quantity - totals[variant_id] for variant_id, quantity in restored}
+        histories = []
+        now = datetime.now()
+        for variant_id, qty in lines:
+            current[variant_id] += qty
+            histories.append({
+                'store_id': store_id,
+                'variant_id': variant_id,
+                'change_type': change_type,
+                'quantity_change': qty,
+                'current_quantity': current[variant_id],
+                'user_id': user_id,
+                'created_at': now
+            })
+        db.session.execute(insert(StockHistory), histories)
+
     @staticmethod
     def refund_sale_full(sale_id, store_id, user_id):
         try:
@@ -119,32 +424,28 @@ class SalesService:
             if not sale: return {'status': 'error', 'message': '내역 없음'}
             if sale.status == SaleStatus.REFUNDED: 
                 return {'status': 'error', 'message': '이미 환불된 건입니다.'}
-            
-            for item in sale.items:
-                if item.quantity <= 0: continue
-                
-                stock = StoreStock.query.filter_by(store_id=store_id, variant_id=item.variant_id).with_for_update().first()
-                if not stock:
-                    try:
-                        with db.session.begin_nested():
-                            stock = StoreStock(store_id=store_id, variant_id=item.variant_id, quantity=0)
-                            db.session.add(stock)
-                    except exc.IntegrityError:
-                        stock = StoreStock.query.filter_by(store_id=store_id, variant_id=item.variant_id).with_for_update().first()
-
-                stock.quantity += item.quantity
-                
-                history = StockHistory(
-                    store_id=store_id,
-                    variant_id=item.variant_id,
-                    change_type=StockChangeType.REFUND_FULL,
-                    quantity_change=item.quantity,
-                    current_quantity=stock.quantity,
-                    user_id=user_id
-                )
-                db.session.add(history)
-                
+
+            lines = db.session.execute(
+                select(SaleItem.variant_id, SaleItem.quantity, SaleItem.discount_amount)
+                .where(SaleItem.sale_id == sale.id, SaleItem.quantity > 0)
+                .order_by(SaleItem.id)
+            ).all()
+            SalesService._restore_stocks(store_id, user_id, [(v, qty) for v, qty, _ in lines],
+                                         StockChangeType.REFUND_FULL)
+
+            # 집계 행이 없는 날은 현재 판매 데이터로 행을 만들므로 환불 상태를 먼저 반영
             sale.status = SaleStatus.REFUNDED
+            db.session.flush()
+
+            amount = sale.total_amount or 0
+            SalesService._apply_daily_summary(
+                store_id, sale.sale_date, sale.is_online,
+                sale_count=-1, total_amount=-amount,
+                discount_amount=-sum((discount or 0) * qty for _, qty, discount in lines),
+                refund_count=1, refund_amount=amount,
+                channel_count=-1, channel_amount=-amount
+            )
+
             db.session.commit()
             return {'status': 'success', 'message': f'환불 완료 {sale.receipt_number}'}
             
@@ -161,53 +462,84 @@ class SalesService:
             if sale.status == SaleStatus.REFUNDED: 
                 return {'status': 'error', 'message': '이미 전체 환불된 건입니다.'}
 
-            total_refunded_amount = 0
-
+            # 같은 옵션이 여러 번 요청되면 합산
+            requested = {}
             for r_item in refund_items:
-                variant_id = r_item['variant_id']
+                variant_id = int(r_item['variant_id'])
                 refund_qty = int(r_item['quantity'])
-                
                 if refund_qty <= 0: continue
+                requested[variant_id] = requested.get(variant_id, 0) + refund_qty
 
-                sale_item = SaleItem.query.filter_by(sale_id=sale.id, variant_id=variant_id).first()
-                
-                if sale_item and sale_item.quantity >= refund_qty:
-                    refund_amount = sale_item.discounted_price * refund_qty
-                    
-                    sale_item.quantity -= refund_qty
-                    sale_item.subtotal -= refund_amount
-                    sale.total_amount -= refund_amount
-                    total_refunded_amount += refund_amount
-                    
-                    stock = StoreStock.query.filter_by(store_id=store_id, variant_id=variant_id).with_for_update().first()
-                    if not stock:
-                        try:
-                            with db.session.begin_nested():
-                                stock = StoreStock(store_id=store_id, variant_id=variant_id, quantity=0)
-                                db.session.add(stock)
-                        except exc.IntegrityError:
-                            stock = StoreStock.query.filter_by(store_id=store_id, variant_id=variant_id).with_for_update().first()
-
-                    stock.quantity += refund_qty
-                        
-                    history = StockHistory(
-                        store_id=store_id,
-                        variant_id=variant_id,
-                        change_type=StockChangeType.REFUND_PARTIAL,
-                        quantity_change=refund_qty,
-                        current_quantity=stock.quantity,
-                        user_id=user_id
-                    )
-                    db.session.add(history)
-
-            all_zero = True
-            for item in sale.items:
-                if item.quantity > 0:
-                    all_zero = False
-                    break
-            
-            if all_zero:
-                sale.status = SaleStatus.REFUNDED
+            # 옵션별 요청 수량을 그 옵션의 판매 품목 줄에 id 순서로 나눠 차감
+            # (남은 수량 합계보다 많이 요청한 옵션은 건너뜀)
+            lines = db.session.execute(
+                select(SaleItem.id, SaleItem.variant_id, SaleItem.quantity,
+                       SaleItem.discounted_price, SaleItem.discount_amount)
+                .where(SaleItem.sale_id == sale.id,
+                       SaleItem.variant_id.in_(list(requested)),
+                       SaleItem.quantity > 0)
+                .order_by(SaleItem.id)
+            ).all() if requested else []
+
+            available = {}
+            for _, variant_id, quantity, _, _ in lines:
+                available[variant_id] = available.get(variant_id, 0) + quantity
+            remaining = {v: qty for v, qty in requested.items() if available.get(v, 0) >= qty}
+
+            taken = []  # (sale_item.id, variant_id, 차감 수량, 할인적용가, 할인액)
+            for item_id, variant_id, quantity, price, discount in lines:
+                take = min(quantity, remaining.get(variant_id, 0))
+                if take > 0:
+                    remaining[variant_id] -= take
+                    taken.append((item_id, variant_id, take, price or 0, discount or 0))
+
+            if not taken:
+                db.session.rollback()
+                return {'status': 'error', 'message': '환불 가능한 품목이 없습니다. (수량 확인)'}
+
+            refund_lines = values(
+                column('id', Integer), column('quantity', Integer), name='refund_lines'
+            ).data([(item_id, take) for item_id, _, take, _, _ in taken]).cte('refund_lines')
+            db.session.execute(
+                update(SaleItem)
+                .where(SaleItem.id == refund_lines.c.id)
+                .values(quantity=SaleItem.quantity - refund_lines.c.quantity,
+                        subtotal=SaleItem.subtotal - SaleItem.discounted_price * refund_lines.c.quantity)
+                .execution_options(synchronize_session=False)
+            )
+
+            refunded_qty = {}
+            for _, variant_id, take, _, _ in taken:
+                refunded_qty[variant_id] = refunded_qty.get(variant_id, 0) + take
+            SalesService._restore_stocks(store_id, user_id, sorted(refunded_qty.items()),
+                                         StockChangeType.REFUND_PARTIAL)
+
+            # 합계 차감과 전체 환불 여부(남은 수량이 모두 0) 판단을 한 번의 UPDATE로 처리
+            total_refunded_amount = sum(price * take for _, _, take, price, _ in taken)
+            has_remaining = exists().where(SaleItem.sale_id == Sale.id, SaleItem.quantity > 0)
+            status, remaining_amount = db.session.execute(
+                update(Sale)
+                .where(Sale.id == sale.id)
+                .values(total_amount=Sale.total_amount - total_refunded_amount,
+                        status=case((~has_remaining, SaleStatus.REFUNDED), else_=Sale.status))
+                .returning(Sale.status, Sale.total_amount)
+                .execution_options(synchronize_session=False)
+            ).one()
+
+            # 남은 금액은 부분 환불로 차감하고, 전체 환불이 되면 판매 건수에서 빠지고 환불 건수로 이동
+            became_refunded = status == SaleStatus.REFUNDED
+            remaining_amount = remaining_amount or 0
+            removed_amount = total_refunded_amount + (remaining_amount if became_refunded else 0)
+            SalesService._apply_daily_summary(
+                store_id, sale.sale_date, sale.is_online,
+                sale_count=-1 if became_refunded else 0,
+                total_amount=-removed_amount,
+                discount_amount=-sum(discount * take for _, _, take, _, discount in taken),
+                refund_count=1 if became_refunded else 0,
+                refund_amount=remaining_amount if became_refunded else 0,
+                channel_count=-1 if became_refunded else 0,
+                channel_amount=-removed_amount
+            )
 
             db.session.commit()
             return {'status': 'success', 'message': '부분 환불이 완료되었습니다.'}
@@ -215,4 +547,4 @@ class SalesService:
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"Refund Partial Error: {e}")
-            return {'status': 'error', 'message': str(e)}
\ No newline at end of file
+            return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,276 @@
+import time
+import zlib
+import threading
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+from flowork.extensions import db
+from flowork.models import Product, Variant, Store, StoreStock, StockHistory
+
+# 재고 변동 이력을 다시 읽는 여유 구간 (ID 발급 순서와 커밋 순서가 다른 동시 트랜잭션 보정)
+HISTORY_LAG_WINDOW = 500
+# 증분 반영과 별개로 주기적으로 전체를 다시 구성하는 간격 (초, 상품명/카테고리 수정 반영용)
+FULL_REBUILD_INTERVAL = 600
+# 브랜드별 옵션/매장 구성 확인(COUNT/MAX, 매장 목록) 최소 간격 (초)
+SIGNATURE_CHECK_INTERVAL = 5
+# window() 한 번에 반환하는 최대 행/열 수
+MAX_WINDOW_ROWS = 500
+MAX_WINDOW_COLS = 100
+
+class StockOverviewMatrix:
+    """
+    브랜드 통합 재고 매트릭스 (옵션 행 x 매장 열, int32 수량 배열).
+    옵션 정보는 열(column) 단위 배열로 보관하며, 행 순서는 품번/컬러/사이즈 순입니다.
+    """
+    def __init__(self, brand_id, stores, variant_rows, stock_rows, last_history_id):
+        self.brand_id = brand_id
+        self.built_at = time.monotonic()
+        self.checked_at = self.built_at
+        self.last_history_id = last_history_id
+        # 마지막 catch_up 시점의 MAX(stock_history.id)와 시각 (MAX가 그대로면 여유 구간을 다시 읽지 않음)
+        self.seen_max_history_id = None
+        self.caught_up_at = None
+
+        self.store_ids = np.array([s[0] for s in stores], dtype=np.int64)
+        self.store_names = [s[1] for s in stores]
+        self._store_pos = {sid: i for i, sid in enumerate(self.store_ids.tolist())}
+
+        self.variant_ids = np.array([r[0] for r in variant_rows], dtype=np.int64)
+        columns = list(zip(*variant_rows)) if variant_rows else [()] * 8
+        (_, self.product_ids, self.product_numbers, self.product_names, self.item_categories,
+         self.release_years, self.colors, self.sizes) = [list(c) for c in columns]
+        self._category_arr = np.array(self.item_categories, dtype=object)
+        self._year_arr = np.array(self.release_years, dtype=object)
+        self._variant_order = np.argsort(self.variant_ids, kind='stable')
+        self._sorted_variant_ids = self.variant_ids[self._variant_order]
+        # 행/열 배치 식별값 (워커 프로세스가 달라도 같은 배치면 같은 값, 클라이언트 블록 캐시 무효화용)
+        self.layout_version = format(zlib.crc32(self.store_ids.tobytes(), zlib.crc32(self.variant_ids.tobytes())), '08x')
+
+        self.quantities = np.zeros((len(self.variant_ids), len(self.store_ids)), dtype=np.int32)
+        if stock_rows:
+            stock = np.array(stock_rows, dtype=np.int64)
+            self.set_quantities(stock[:, 0], stock[:, 1], stock[:, 2])
+
+    @property
+    def shape(self):
+        return self.quantities.shape
+
+    def variant_positions(self, variant_ids):
+        """variant_id 배열 -> 행 위치 배열 (매트릭스에 없는 ID는 -1)"""
+        variant_ids = np.asarray(variant_ids, dtype=np.int64)
+        if len(self._sorted_variant_ids) == 0:
+            return np.full(len(variant_ids), -1, dtype=np.int64)
+        idx = np.searchsorted(self._sorted_variant_ids, variant_ids)
+        idx = np.minimum(idx, len(self._sorted_variant_ids) - 1)
+        found = self._sorted_variant_ids[idx] == variant_ids
+        return np.where(found, self._variant_order[idx], -1)
+
+    def store_positions(self, store_ids):
+        return np.array([self._store_pos.get(int(s), -1) for s in store_ids], dtype=np.int64)
+
+    def set_quantities(self, variant_ids, store_ids, quantities):
+        """
+        (variant_id, store_id, 현재 수량) 목록을 반영합니다. 같은 칸이 여러 번 오면 마지막 값이 남습니다.
+        비활성/타 브랜드 매장과 매트릭스에 없는 옵션(타 브랜드 옵션 등)은 무시합니다.
+        (브랜드에 새로 추가된 옵션은 StockMatrixRegistry._needs_rebuild에서 전체 재구성)
+        """
+        rows = self.variant_positions(variant_ids)
+        cols = self.store_positions(store_ids)
+        valid = (cols >= 0) & (rows >= 0)
+        self.quantities[rows[valid], cols[valid]] = np.asarray(quantities, dtype=np.int32)[valid]
+
+    def catch_up(self, max_history_id):
+        """
+        마지막 반영 이후의 stock_history(판매/환불/이동/주문/업로드/수동 수정)를 읽어 현재 수량을 반영합니다.
+        이력의 current_quantity는 절대값이므로 여유 구간을 다시 읽어도 결과가 같습니다.
+        MAX(id)가 지난번과 같으면 SIGNATURE_CHECK_INTERVAL 동안은 여유 구간을 다시 읽지 않습니다.
+        (늦게 커밋된 앞 번호 이력은 늦어도 그 간격 뒤에 반영)
+        """
+        now = time.monotonic()
+        if max_history_id == self.seen_max_history_id and now - self.caught_up_at < SIGNATURE_CHECK_INTERVAL:
+            return
+        self.seen_max_history_id = max_history_id
+        self.caught_up_at = now
+
+        start_id = max(0, self.last_history_id - HISTORY_LAG_WINDOW)
+        rows = db.session.query(
+            StockHistory.id, StockHistory.variant_id, StockHistory.store_id, StockHistory.current_quantity
+        ).join(Store, Store.id == StockHistory.store_id).filter(
+            Store.brand_id == self.brand_id,
+            StockHistory.id > start_id
+        ).order_by(StockHistory.id).all()
+
+        if not rows:
+            return
+
+        history = np.array(rows, dtype=np.int64)
+        self.set_quantities(history[:, 1], history[:, 2], history[:, 3])
+        self.last_history_id = max(self.last_history_id, int(history[-1, 0]))
+
+    def rows(self, row_slice=slice(None)):
+        """템플릿/JSON 출력용 옵션 정보 dict 목록"""
+        indices = range(len(self.variant_ids))[row_slice]
+        return [{
+            'variant_id': int(self.variant_ids[i]),
+            'product_id': self.product_ids[i],
+            'product_number': self.product_numbers[i],
+            'product_name': self.product_names[i],
+            'item_category': self.item_categories[i],
+            'release_year': self.release_years[i],
+            'color': self.colors[i],
+            'size': self.sizes[i],
+        } for i in indices]
+
+    def filter_options(self):
+        categories = sorted({c for c in self.item_categories if c})
+        years = sorted({y for y in self.release_years if y}, reverse=True)
+        return categories, years
+
+    def select_rows(self, category=None, year=None, low_stock=None):
+        """필터(카테고리, 연도, 매장 합계 재고 low_stock 이하)에 맞는 행 위치 배열"""
+        mask = np.ones(len(self.variant_ids), dtype=bool)
+        if category:
+            mask &= self._category_arr == category
+        if year:
+            mask &= self._year_arr == int(year)
+        if low_stock is not None:
+            mask &= self.quantities.sum(axis=1, dtype=np.int64) <= int(low_stock)
+        return np.flatnonzero(mask)
+
+    def window(self, row_offset=0, row_limit=100, col_offset=0, col_limit=30,
+               category=None, year=None, low_stock=None):
+        """
+        필터 결과의 [row_offset, row_offset+row_limit) 행 x [col_offset, col_offset+col_limit) 매장 구간을
+        열 단위(columnar)로 인코딩해 반환합니다.
+        - 상품 정보는 구간 내 고유 상품만 products에 담고 rows.product는 그 인덱스
+        - quantities는 매장(열)별 수량 배열 목록
+        - layout_version이 바뀌면 행/열 위치가 달라진 것이고, last_history_id가 바뀌면 수량이 갱신된 것
+        """
+        row_offset, col_offset = max(0, int(row_offset)), max(0, int(col_offset))
+        row_limit = min(max(0, int(row_limit)), MAX_WINDOW_ROWS)
+        col_limit = min(max(0, int(col_limit)), MAX_WINDOW_COLS)
+
+        selected = self.select_rows(category, year, low_stock)
+        rows = selected[row_offset:row_offset + row_limit]
+        cols = np.arange(col_offset, min(col_offset + col_limit, len(self.store_ids)))
+
+        product_index = {}
+        products = {'id': [], 'product_number': [], 'product_name': [], 'item_category': [], 'release_year': []}
+        row_product = []
+        for r in rows.tolist():
+            pid = self.product_ids[r]
+            if pid not in product_index:
+                product_index[pid] = len(products['id'])
+                products['id'].append(pid)
+                products['product_number'].append(self.product_numbers[r])
+                products['product_name'].append(self.product_names[r])
+                products['item_category'].append(self.item_categories[r])
+                products['release_year'].append(self.release_years[r])
+            row_product.append(product_index[pid])
+
+        block = self.quantities[np.ix_(rows, cols)]
+        return {
+            'layout_version': self.layout_version,
+            'last_history_id': self.last_history_id,
+            'total_rows': int(len(selected)),
+            'total_cols': int(len(self.store_ids)),
+            'row_offset': row_offset,
+            'col_offset': col_offset,
+            'stores': {
+                'id': self.store_ids[cols].tolist(),
+                'name': [self.store_names[c] for c in cols.tolist()],
+            },
+            'products': products,
+            'rows': {
+                'variant_id': self.variant_ids[rows].tolist(),
+                'product': row_product,
+                'color': [self.colors[r] for r in rows.tolist()],
+                'size': [self.sizes[r] for r in rows.tolist()],
+                'total': self.quantities[rows].sum(axis=1, dtype=np.int64).tolist(),
+            },
+            'quantities': block.T.tolist(),
+        }
+
+    @staticmethod
+    def build(brand_id):
+        """좁은 컬럼 조회 3회로 매트릭스를 구성합니다. (ORM 객체 로드 없음)"""
+        # 이력 기준점을 먼저 잡아야 스냅샷 조회 도중 발생한 변동을 catch_up에서 다시 읽음
+        last_history_id = db.session.query(func.coalesce(func.max(StockHistory.id), 0)).scalar()
+
+        stores = db.session.query(Store.id, Store.store_name).filter(
+            Store.brand_id == brand_id,
+            Store.is_active == True
+        ).order_by(Store.store_name).all()
+
+        variant_rows = db.session.query(
+            Variant.id, Product.id, Product.product_number, Product.product_name,
+            Product.item_category, Product.release_year,
+            Variant.color, Variant.size
+        ).join(Product, Variant.product_id == Product.id).filter(
+            Product.brand_id == brand_id
+        ).order_by(Product.product_number, Variant.color, Variant.size).all()
+
+        stock_rows = db.session.query(
+            StoreStock.variant_id, StoreStock.store_id, StoreStock.quantity
+        ).join(Store, Store.id == StoreStock.store_id).filter(
+            Store.brand_id == brand_id,
+            Store.is_active == True
+        ).all()
+        stock_rows = [(v, s, q or 0) for v, s, q in stock_rows]
+
+        return StockOverviewMatrix(brand_id, stores, variant_rows, stock_rows, last_history_id)
+
+class StockMatrixRegistry:
+    """
+    워커 프로세스(앱) 단위 브랜드별 매트릭스 보관소.
+    잠금은 브랜드별로 두어 한 브랜드의 재구성(build) 중에도 다른 브랜드 요청은 기다리지 않습니다.
+    """
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    @staticmethod
+    def _brand_lock(brand_id):
+        with StockMatrixRegistry._locks_guard:
+            return StockMatrixRegistry._locks.setdefault(brand_id, threading.Lock())
+
+    @staticmethod
+    def get(brand_id):
+        with StockMatrixRegistry._brand_lock(brand_id):
+            matrices = current_app.extensions.setdefault('stock_overview_matrix', {})
+            matrix = matrices.get(brand_id)
+            max_history_id = db.session.query(func.coalesce(func.max(StockHistory.id), 0)).scalar()
+            if matrix is None or StockMatrixRegistry._needs_rebuild(matrix, max_history_id):
+                matrix = StockOverviewMatrix.build(brand_id)
+                matrices[brand_id] = matrix
+            matrix.catch_up(max_history_id)
+            return matrix
+
+    @staticmethod
+    def invalidate(brand_id):
+        with StockMatrixRegistry._brand_lock(brand_id):
+            current_app.extensions.get('stock_overview_matrix', {}).pop(brand_id, None)
+
+    @staticmethod
+    def _needs_rebuild(matrix, max_history_id):
+        # 이력이 삭제된 경우(초기화) 전체 재구성
+        if max_history_id < matrix.last_history_id:
+            return True
+
+        now = time.monotonic()
+        if now - matrix.built_at > FULL_REBUILD_INTERVAL:
+            return True
+        if now - matrix.checked_at < SIGNATURE_CHECK_INTERVAL:
+            return False
+        matrix.checked_at = now
+
+        # 상품/옵션/매장 구성이 바뀐 경우(추가/삭제, 초기화) 전체 재구성
+        variant_sig = db.session.query(func.count(Variant.id), func.coalesce(func.max(Variant.id), 0)).join(
+            Product, Variant.product_id == Product.id
+        ).filter(Product.brand_id == matrix.brand_id).one()
+        if tuple(variant_sig) != (len(matrix.variant_ids), int(matrix.variant_ids.max()) if len(matrix.variant_ids) else 0):
+            return True
+
+        store_ids = [s for (s,) in db.session.query(Store.id).filter(
+            Store.brand_id == matrix.brand_id, Store.is_active == True
+        ).order_by(Store.store_name)]
+        return store_ids != matrix.store_ids.tolist()
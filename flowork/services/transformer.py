@@ -14,13 +14,23 @@ def transform_horizontal_to_vertical(file_stream, size_mapping_config, category_
             file_stream.seek(0)
             df_stock = pd.read_csv(file_stream, encoding='cp949', dtype=str)
 
+    return transform_matrix_frame(df_stock, size_mapping_config, category_mapping_config, column_map_indices)
+
+def normalize_matrix_header(columns):
     new_columns = []
-    for col in df_stock.columns:
+    for col in columns:
         str_col = str(col).strip()
         if str_col.endswith('.0'):
             str_col = str_col[:-2]
         new_columns.append(str_col)
-    df_stock.columns = new_columns
+    return new_columns
+
+def transform_matrix_frame(df_stock, size_mapping_config, category_mapping_config, column_map_indices):
+    """
+    이미 읽어 둔 매트릭스(가로형) 시트 DataFrame을 세로형으로 변환합니다.
+    스트리밍 파서가 행 묶음 단위로 호출할 수 있도록 파일 읽기와 분리되어 있습니다.
+    """
+    df_stock.columns = normalize_matrix_header(df_stock.columns)
 
     extracted_data = pd.DataFrame()
     field_to_col_idx = {
@@ -52,8 +62,18 @@ def transform_horizontal_to_vertical(file_stream, size_mapping_config, category_
     logic_name = category_mapping_config.get('LOGIC', 'GENERIC')
     logic_module = get_brand_logic(logic_name)
 
-    df_merged['DB_Category'] = df_merged.apply(lambda r: logic_module.get_db_item_category(r, category_mapping_config), axis=1)
-    df_merged['Mapping_Key'] = df_merged.apply(logic_module.get_size_mapping_key, axis=1)
+    # 브랜드 로직이 열 단위(Series) 함수를 제공하면 행 단위 apply 대신 사용
+    category_series_fn = getattr(logic_module, 'get_db_item_category_series', None)
+    if category_series_fn:
+        df_merged['DB_Category'] = category_series_fn(df_merged, category_mapping_config)
+    else:
+        df_merged['DB_Category'] = df_merged.apply(lambda r: logic_module.get_db_item_category(r, category_mapping_config), axis=1)
+
+    mapping_key_series_fn = getattr(logic_module, 'get_size_mapping_key_series', None)
+    if mapping_key_series_fn:
+        df_merged['Mapping_Key'] = mapping_key_series_fn(df_merged)
+    else:
+        df_merged['Mapping_Key'] = df_merged.apply(logic_module.get_size_mapping_key, axis=1)
 
     id_vars = ['product_number', 'product_name', 'color', 'original_price', 'sale_price', 'release_year', 'DB_Category', 'Mapping_Key']
     
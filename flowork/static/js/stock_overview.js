@@ -0,0 +1,214 @@
+document.addEventListener('DOMContentLoaded', () => {
+    const apiUrl = document.body.dataset.stockOverviewUrl;
+    const viewport = document.getElementById('overview-viewport');
+    const canvas = document.getElementById('overview-canvas');
+    const table = document.getElementById('overview-table');
+    const thead = document.getElementById('overview-head');
+    const tbody = document.getElementById('overview-body');
+    const filterForm = document.getElementById('overview-filter-form');
+    const summary = document.getElementById('overview-summary');
+
+    // 고정 크기 셀 기준으로 보이는 구간을 계산 (가상 스크롤)
+    const ROW_HEIGHT = 30;
+    const COL_WIDTH = 72;
+    const INFO_WIDTHS = [150, 200, 70, 60, 70]; // 품번, 품명, 컬러, 사이즈, 합계
+    const INFO_WIDTH = INFO_WIDTHS.reduce((a, b) => a + b, 0);
+    const ROW_BLOCK = 100;
+    const COL_BLOCK = 20;
+    const BLOCK_TTL_MS = 30000; // 블록 캐시 유지 시간 (이후 다시 조회해 수량 갱신)
+
+    let filters = {};
+    let totalRows = 0;
+    let totalCols = 0;
+    let blockCache = new Map(); // "rowBlock:colBlock" -> { promise: Promise<응답 JSON>, fetchedAt }
+    let layoutVersion = null;   // 서버 매트릭스의 행/열 배치 식별값
+    let lastHistoryId = 0;      // 캐시된 블록 중 가장 최신 재고 이력 ID
+    let renderToken = 0;
+
+    function fetchBlock(rowBlock, colBlock) {
+        const key = `${rowBlock}:${colBlock}`;
+        const cached = blockCache.get(key);
+        if (!cached || Date.now() - cached.fetchedAt > BLOCK_TTL_MS) {
+            const params = new URLSearchParams({
+                ...filters,
+                row_offset: rowBlock * ROW_BLOCK,
+                row_limit: ROW_BLOCK,
+                col_offset: colBlock * COL_BLOCK,
+                col_limit: COL_BLOCK
+            });
+            const promise = fetch(`${apiUrl}?${params}`)
+                .then(res => res.json())
+                .then(data => {
+                    if (data.status !== 'success') throw new Error(data.message || '조회 실패');
+                    onBlockVersion(key, data);
+                    return data;
+                })
+                .catch(err => {
+                    blockCache.delete(key);
+                    throw err;
+                });
+            blockCache.set(key, { promise, fetchedAt: Date.now() });
+        }
+        return blockCache.get(key).promise;
+    }
+
+    // 서버 매트릭스가 재구성되어 행/열 위치가 바뀌었거나 재고가 변동되면 이전에 받은 다른 블록은 버림
+    function onBlockVersion(key, data) {
+        if (data.layout_version === layoutVersion && data.last_history_id <= lastHistoryId) return;
+        const entry = blockCache.get(key);
+        blockCache = new Map(entry ? [[key, entry]] : []);
+        layoutVersion = data.layout_version;
+        lastHistoryId = Math.max(lastHistoryId, data.last_history_id);
+    }
+
+    function visibleRange() {
+        const firstRow = Math.floor(viewport.scrollTop / ROW_HEIGHT);
+        const rowCount = Math.ceil(viewport.clientHeight / ROW_HEIGHT) + 1;
+        const firstCol = Math.floor(viewport.scrollLeft / COL_WIDTH);
+        const colCount = Math.ceil(Math.max(0, viewport.clientWidth - INFO_WIDTH) / COL_WIDTH) + 1;
+        return {
+            firstRow,
+            lastRow: Math.min(totalRows, firstRow + rowCount),
+            firstCol: Math.min(firstCol, Math.max(0, totalCols - 1)),
+            lastCol: Math.min(totalCols, firstCol + colCount)
+        };
+    }
+
+    // 블록 응답들에서 (행, 열) 구간을 꺼내기 위한 조회 함수 구성
+    function cellLookup(blocks) {
+        return {
+            row(r) {
+                // 옵션 정보는 모든 행 블록에 대해 항상 함께 요청하는 0번 열 블록에서 조회
+                const block = blocks.get(`${Math.floor(r / ROW_BLOCK)}:0`);
+                const i = r - block.row_offset;
+                const product = block.rows.product[i];
+                return {
+                    product_number: block.products.product_number[product],
+                    product_name: block.products.product_name[product],
+                    color: block.rows.color[i],
+                    size: block.rows.size[i],
+                    total: block.rows.total[i]
+                };
+            },
+            store(c) {
+                const block = [...blocks.values()].find(b => c >= b.col_offset && c < b.col_offset + b.stores.id.length);
+                return block ? block.stores.name[c - block.col_offset] : '';
+            },
+            qty(r, c) {
+                const block = blocks.get(`${Math.floor(r / ROW_BLOCK)}:${Math.floor(c / COL_BLOCK)}`);
+                if (!block) return '';
+                return block.quantities[c - block.col_offset][r - block.row_offset];
+            }
+        };
+    }
+
+    async function render(retry = 0) {
+        const token = ++renderToken;
+        const range = visibleRange();
+        const needed = [];
+        const rowBlocks = new Set();
+        for (let r = range.firstRow; r < Math.max(range.lastRow, range.firstRow + 1); r += 1) rowBlocks.add(Math.floor(r / ROW_BLOCK));
+        const colBlocks = new Set([0]);
+        for (let c = range.firstCol; c < range.lastCol; c += 1) colBlocks.add(Math.floor(c / COL_BLOCK));
+        rowBlocks.forEach(rb => colBlocks.forEach(cb => needed.push([rb, cb])));
+
+        let results;
+        try {
+            results = await Promise.all(needed.map(([rb, cb]) => fetchBlock(rb, cb)));
+        } catch (err) {
+            console.error(err);
+            summary.textContent = `조회 오류: ${err.message}`;
+            return;
+        }
+        if (token !== renderToken) return; // 스크롤이 더 진행된 경우 이전 렌더링은 버림
+        if (results.some(r => r.layout_version !== results[0].layout_version) && retry < 3) {
+            // 재구성 전후 블록이 섞이면 행이 중복/누락되므로 같은 배치로 다시 조회
+            render(retry + 1);
+            return;
+        }
+
+        const blocks = new Map();
+        needed.forEach(([rb, cb], i) => blocks.set(`${rb}:${cb}`, results[i]));
+        if (resize(results[0].total_rows, results[0].total_cols)) {
+            // 전체 크기를 처음 알게 된 경우 보이는 구간을 다시 계산해 렌더링
+            render();
+            return;
+        }
+        const finalRange = visibleRange();
+        const lookup = cellLookup(blocks);
+
+        table.style.top = `${finalRange.firstRow * ROW_HEIGHT}px`;
+        table.style.left = `${finalRange.firstCol * COL_WIDTH}px`;
+
+        const storeCols = [];
+        for (let c = finalRange.firstCol; c < finalRange.lastCol; c += 1) storeCols.push(c);
+
+        const headCells = ['품번', '품명', '컬러', '사이즈', '합계']
+            .map((label, i) => `<th style="width:${INFO_WIDTHS[i]}px">${label}</th>`)
+            .concat(storeCols.map(c => `<th style="width:${COL_WIDTH}px" class="text-truncate">${escapeHtml(lookup.store(c))}</th>`));
+        thead.innerHTML = `<tr style="height:${ROW_HEIGHT}px">${headCells.join('')}</tr>`;
+
+        const rowsHtml = [];
+        for (let r = finalRange.firstRow; r < finalRange.lastRow; r += 1) {
+            if (!blocks.has(`${Math.floor(r / ROW_BLOCK)}:0`)) break;
+            const info = lookup.row(r);
+            const cells = [
+                info.product_number, info.product_name, info.color, info.size, info.total
+            ].map(v => `<td class="text-truncate">${escapeHtml(v ?? '')}</td>`);
+            storeCols.forEach(c => {
+                const qty = lookup.qty(r, c);
+                cells.push(`<td class="text-end ${qty <= 0 ? 'text-muted' : ''}">${qty}</td>`);
+            });
+            rowsHtml.push(`<tr style="height:${ROW_HEIGHT}px">${cells.join('')}</tr>`);
+        }
+        tbody.innerHTML = rowsHtml.join('');
+    }
+
+    function resize(rows, cols) {
+        if (rows === totalRows && cols === totalCols) return false;
+        totalRows = rows;
+        totalCols = cols;
+        canvas.style.height = `${(totalRows + 1) * ROW_HEIGHT}px`;
+        canvas.style.width = `${INFO_WIDTH + totalCols * COL_WIDTH}px`;
+        summary.textContent = `옵션 ${totalRows.toLocaleString()}개 · 매장 ${totalCols}곳`;
+        return true;
+    }
+
+    function escapeHtml(value) {
+        return String(value).replace(/[&<>"']/g, ch => ({
+            '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+        }[ch]));
+    }
+
+    let scheduled = false;
+    viewport.addEventListener('scroll', () => {
+        if (scheduled) return;
+        scheduled = true;
+        requestAnimationFrame(() => {
+            scheduled = false;
+            render();
+        });
+    });
+    window.addEventListener('resize', () => render());
+    // 보이는 구간은 캐시 유지 시간마다 다시 조회해 판매/이동 등 재고 변동을 반영
+    setInterval(() => {
+        if (!document.hidden) render();
+    }, BLOCK_TTL_MS);
+
+    filterForm.addEventListener('submit', (e) => {
+        e.preventDefault();
+        const formData = new FormData(filterForm);
+        filters = {};
+        formData.forEach((value, key) => {
+            if (value !== '') filters[key] = value;
+        });
+        blockCache = new Map();
+        layoutVersion = null;
+        totalRows = -1;
+        viewport.scrollTop = 0;
+        viewport.scrollLeft = 0;
+        render();
+    });
+
+    render();
+});
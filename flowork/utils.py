@@ -1,4 +1,7 @@
 import json
+import string
+import numpy as np
+import pandas as pd
 
 CHOSUNG_LIST = ['ㄱ', 'ㄲ', 'ㄴ', 'ㄷ', 'ㄸ', 'ㄹ', 'ㅁ', 'ㅂ', 'ㅃ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅉ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
 
@@ -6,6 +9,26 @@ def clean_string_upper(s, default=''):
     if not (s is not None and s == s): return default
     return str(s).replace('-', '').replace(' ', '').strip().upper()
 
+# object 배열의 각 원소에 str()을 적용 (None -> 'None', NaN -> 'nan')
+_to_str = np.frompyfunc(str, 1, 1)
+
+def _map_unique(values, fn):
+    """values(object ndarray)의 고유값마다 fn을 한 번만 호출하고 원래 위치로 펼칩니다."""
+    codes, uniques = pd.factorize(values)
+    return np.array([fn(u) for u in uniques] + [None], dtype=object)[codes]
+
+def _clean_str_upper(text):
+    return text.replace('-', '').replace(' ', '').strip().upper()
+
+def clean_string_upper_series(series, default=''):
+    """clean_string_upper의 벡터화 버전 (pandas Series 입력/출력, 결과는 스칼라 함수와 동일)"""
+    values = series.to_numpy(dtype=object)
+    result = np.full(len(values), default, dtype=object)
+    mask = pd.notna(values)
+    if mask.any():
+        result[mask] = _map_unique(_to_str(values[mask]), _clean_str_upper)
+    return pd.Series(result, index=series.index, dtype=object)
+
 def get_choseong(text):
     if not (text is not None and text == text): return ''
     text_cleaned = str(text).replace('-', '').replace(' ', '').strip().upper()
@@ -69,6 +92,108 @@ def generate_barcode(row_data, brand_settings=None):
         print(f"Error generating barcode for {row_data}: {e}")
         return None
 
+_BARCODE_FORMAT_FIELDS = ('product_number', 'color', 'size', 'pn_cleaned', 'size_upper', 'pn_final', 'size_final')
+
+def _barcode_pn_parts(raw):
+    pn = raw.strip()
+    pn_cleaned = pn.replace('-', '')
+    pn_final = pn_cleaned + '00' if len(pn_cleaned) <= 10 else pn_cleaned
+    return {'product_number': pn, 'pn_cleaned': pn_cleaned, 'pn_final': pn_final}
+
+def _barcode_size_parts(raw):
+    size = raw.strip()
+    size_upper = size.upper()
+    if size_upper == 'FREE':
+        size_final = '00F'
+    elif size.isdigit():
+        size_final = size.zfill(3)
+    elif len(size_upper) <= 3:
+        size_final = size_upper.rjust(3, '0')
+    else:
+        size_final = size_upper[:3]
+    return {'size': size, 'size_upper': size_upper, 'size_final': size_final}
+
+def _barcode_color_parts(raw):
+    return {'color': raw.strip()}
+
+def generate_barcode_series(df, brand_settings=None):
+    """
+    generate_barcode의 벡터화 버전입니다. 결과는 행마다 generate_barcode를 호출한 것과 동일하며,
+    df와 같은 인덱스의 Series(바코드 또는 None)로 반환합니다.
+    품번/컬러/사이즈는 중복이 많으므로 열별 고유값 단위로 한 번씩만 가공한 뒤
+    인덱스 배열로 펼치고, 최종 조합은 object 배열 연산으로 처리합니다.
+    """
+    n = len(df)
+
+    def _factorize(name):
+        if name in df.columns:
+            return pd.factorize(_to_str(df[name].to_numpy(dtype=object)))
+        return np.zeros(n, dtype=np.intp), np.array([''], dtype=object)
+
+    pn_codes, pn_uniques = _factorize('product_number')
+    color_codes, color_uniques = _factorize('color')
+    size_codes, size_uniques = _factorize('size')
+
+    field_source = {}
+    for codes, uniques, parts_fn in (
+        (pn_codes, pn_uniques, _barcode_pn_parts),
+        (color_codes, color_uniques, _barcode_color_parts),
+        (size_codes, size_uniques, _barcode_size_parts),
+    ):
+        parts = [parts_fn(u) for u in uniques]
+        for field in (parts[0] if parts else parts_fn('')):
+            field_source[field] = (codes, np.array([p[field] for p in parts], dtype=object))
+
+    def _expand(field, transform=None):
+        codes, unique_values = field_source[field]
+        if transform:
+            unique_values = np.array([transform(v) for v in unique_values], dtype=object)
+        return unique_values[codes] if len(unique_values) else np.full(n, '', dtype=object)
+
+    format_rule = brand_settings.get('BARCODE_FORMAT') if brand_settings else None
+
+    if format_rule:
+        try:
+            parsed = list(string.Formatter().parse(format_rule))
+        except ValueError:
+            return pd.Series([None] * n, index=df.index, dtype=object)
+
+        is_simple = all(
+            field is None or (field in _BARCODE_FORMAT_FIELDS and not spec and not conv)
+            for _, field, spec, conv in parsed
+        )
+
+        if is_simple:
+            # 대문자 변환은 문자 단위이므로 조각별로 upper 후 이어붙여도 결과가 같음
+            result = np.full(n, '', dtype=object)
+            for literal, field, _, _ in parsed:
+                if literal:
+                    result = result + literal.upper()
+                if field is not None:
+                    result = result + _expand(field, str.upper)
+            return pd.Series(result, index=df.index, dtype=object)
+
+        # 서식 지정자/인덱싱 등이 포함된 규칙은 행 단위로 format 수행
+        columns = [_expand(field) for field in _BARCODE_FORMAT_FIELDS]
+        values = []
+        for row in zip(*columns):
+            try:
+                values.append(format_rule.format(**dict(zip(_BARCODE_FORMAT_FIELDS, row))).upper())
+            except Exception:
+                values.append(None)
+        return pd.Series(values, index=df.index, dtype=object)
+
+    pn_final = _expand('pn_final')
+    color = _expand('color')
+    size_final = _expand('size_final')
+
+    barcode = _expand('pn_final', str.upper) + _expand('color', str.upper) + _expand('size_final', str.upper)
+    missing = (pn_final == '') | (color == '') | (size_final == '')
+    if missing.any():
+        print(f"Barcode generation skipped (missing fields): {int(missing.sum())} rows")
+        barcode[missing] = None
+    return pd.Series(barcode, index=df.index, dtype=object)
+
 def get_sort_key(variant, brand_settings=None):
     product_number = ''
     if variant.product:
@@ -77,8 +202,8 @@ def get_sort_key(variant, brand_settings=None):
     color = variant.color or ''
     size_str = str(variant.size).upper().strip()
     
-    custom_order_map = None
-    if brand_settings:
+    custom_order_map = getattr(brand_settings, 'size_sort_map', None)
+    if custom_order_map is None and brand_settings:
         size_order_json = brand_settings.get('SIZE_SORT_ORDER')
         if size_order_json:
             try:
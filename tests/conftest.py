@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import event
 from flowork import create_app
 from flowork.extensions import db
 from flowork.models import Store, Brand, Product, Variant, StoreStock, User
@@ -8,6 +9,8 @@ class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    CACHE_TYPE = 'SimpleCache'
 
 @pytest.fixture
 def app():
@@ -23,6 +26,96 @@ def app():
 def client(app):
     return app.test_client()
 
+class StatementLog:
+    """with 블록 안에서 db.engine이 실행한 SQL 문 목록을 기록합니다."""
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        return self.statements
+
+    def __exit__(self, *exc_info):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+
+@pytest.fixture
+def login(client):
+    """테스트 클라이언트를 사용자 세션으로 로그인: login(user)"""
+    def _login(user):
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+            sess['_fresh'] = True
+    return _login
+
+@pytest.fixture
+def sql_statements(app):
+    """쿼리 수 측정용: with sql_statements() as statements: ..."""
+    return StatementLog
+
+@pytest.fixture
+def count_statements(sql_statements):
+    """func 실행 중의 SQL 문 수 측정: result, count = count_statements(func, *args, **kwargs)"""
+    def _count(func, *args, **kwargs):
+        # 호출마다 같은 조회(사용자/객체 로드)가 발생하도록 세션 상태를 맞춤
+        db.session.expire_all()
+        with sql_statements() as statements:
+            result = func(*args, **kwargs)
+        return result, len(statements)
+    return _count
+
+@pytest.fixture
+def add_variants(setup_data):
+    """
+    setup_data 브랜드에 상품 1개와 옵션 count개를 추가하고 옵션 ID 목록을 반환: add_variants(count, ...)
+    옵션마다 setup_data 매장에 stock개 재고 행을 만들며, sparse_stock이면 짝수 번째 옵션만 재고 행이 있음
+    """
+    def _add(count, product_number='ITEM01', product_name='테스트 상품', sale_price=15000, stock=5, sparse_stock=False):
+        product = Product(product_number=product_number, product_name=product_name, brand_id=setup_data['brand'].id)
+        db.session.add(product)
+        db.session.flush()
+        ids = []
+        for i in range(count):
+            v = Variant(product_id=product.id, barcode=f"{product_number}{i:03d}", color='BLK', size=str(90 + i),
+                        original_price=20000, sale_price=sale_price)
+            db.session.add(v)
+            db.session.flush()
+            if not sparse_stock or i % 2 == 0:
+                db.session.add(StoreStock(store_id=setup_data['store'].id, variant_id=v.id, quantity=stock))
+            ids.append(v.id)
+        db.session.commit()
+        return ids
+    return _add
+
+@pytest.fixture
+def add_catalogue(setup_data):
+    """
+    검색용 상품 count개(SRCH000...)를 추가: 상품마다 BLK/NVY x 90/95/100 옵션,
+    정상가는 컬러별 1000/2000, 판매가는 정상가-100, setup_data 매장 재고는 사이즈 // 10
+    """
+    def _add(count):
+        for i in range(count):
+            pn = f"SRCH{i:03d}"
+            product = Product(
+                product_number=pn, product_name=f"검색상품{i}", brand_id=setup_data['brand'].id,
+                product_number_cleaned=pn, product_name_cleaned=f"검색상품{i}", release_year=2025
+            )
+            db.session.add(product)
+            db.session.flush()
+            for color, price in [('BLK', 1000), ('NVY', 2000)]:
+                for size in ['90', '95', '100']:
+                    v = Variant(
+                        product_id=product.id, barcode=f"{pn}{color}{size}", color=color, size=size,
+                        original_price=price, sale_price=price - 100
+                    )
+                    db.session.add(v)
+                    db.session.flush()
+                    db.session.add(StoreStock(store_id=setup_data['store'].id, variant_id=v.id, quantity=int(size) // 10))
+        db.session.commit()
+    return _add
+
 @pytest.fixture
 def setup_data(app):
     brand = Brand(brand_name="TestBrand")
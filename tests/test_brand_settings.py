@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+from flowork.extensions import db, cache
+from flowork.models import Setting
+from flowork.services.brand_settings import BrandSettings, BrandConfig
+from flowork.utils import get_sort_key
+
+def _add_settings(brand_id, **values):
+    for key, value in values.items():
+        db.session.add(Setting(brand_id=brand_id, key=key, value=value))
+    db.session.commit()
+
+def test_brand_config_pre_parses_json(app, setup_data):
+    brand_id = setup_data['brand'].id
+    _add_settings(
+        brand_id,
+        SIZE_MAPPING=json.dumps({'상의': {'0': '95'}}),
+        CATEGORY_MAPPING_RULE=json.dumps({'LOGIC': 'EIDER'}),
+        SIZE_SORT_ORDER=json.dumps(['s', 'M', 'L']),
+        BARCODE_FORMAT='{pn_final}{color}{size_final}',
+        BROKEN='{not json',
+    )
+
+    config = BrandSettings.get(brand_id)
+
+    assert config.size_mapping == {'상의': {'0': '95'}}
+    assert config.category_mapping_rule == {'LOGIC': 'EIDER'}
+    assert config.size_sort_map == {'S': 0, 'M': 1, 'L': 2}
+    assert config.barcode_format == '{pn_final}{color}{size_final}'
+    # 기존 dict 기반 호출부와 호환
+    assert config.get('BARCODE_FORMAT') == '{pn_final}{color}{size_final}'
+    assert config['BROKEN'] == '{not json'
+
+def test_brand_config_records_mapping_parse_errors():
+    config = BrandConfig({'SIZE_MAPPING': '{not json', 'CATEGORY_MAPPING_RULE': '["EIDER"]'})
+
+    assert config.size_mapping == {} and config.category_mapping_rule == {}
+    assert set(config.errors) == {'SIZE_MAPPING', 'CATEGORY_MAPPING_RULE'}
+    assert 'SIZE_MAPPING' in config.mapping_error
+    assert BrandConfig({'SIZE_MAPPING': '{}'}).mapping_error is None
+
+def test_brand_settings_cached_until_invalidated(app, setup_data, sql_statements):
+    brand_id = setup_data['brand'].id
+    _add_settings(brand_id, BRAND_NAME='A')
+
+    first = BrandSettings.get(brand_id)
+
+    with sql_statements() as statements:
+        assert BrandSettings.get(brand_id) is first
+    assert statements == []
+
+    Setting.query.filter_by(brand_id=brand_id, key='BRAND_NAME').first().value = 'B'
+    db.session.commit()
+    assert BrandSettings.get(brand_id)['BRAND_NAME'] == 'A'
+
+    # 다른 워커의 무효화를 흉내: 로컬 사본은 그대로 두고 Redis 버전만 바뀐 경우
+    cache.set(f'brand_settings_version_{brand_id}', 'bumped-by-other-worker', timeout=0)
+    assert BrandSettings.get(brand_id)['BRAND_NAME'] == 'B'
+
+def test_update_setting_bumps_version(app, client, setup_data, login):
+    brand_id = setup_data['brand'].id
+    admin = setup_data['user']
+    admin.store_id = None
+    admin.is_admin = True
+    db.session.commit()
+
+    assert BrandSettings.get(brand_id).size_sort_map == {}
+
+    login(admin)
+    res = client.post('/api/setting', json={'key': 'SIZE_SORT_ORDER', 'value': ['XL', 'S']})
+    assert res.get_json()['status'] == 'success'
+
+    assert BrandSettings.get(brand_id).size_sort_map == {'XL': 0, 'S': 1}
+
+def test_get_sort_key_same_for_dict_and_config():
+    raw = {'SIZE_SORT_ORDER': json.dumps(['FREE', 'XL', 'S'])}
+    config = BrandConfig(raw)
+    product = SimpleNamespace(product_number='PN1')
+    for size in ['S', 'xl', 'free', '95', 'M', '2XL', 'ZZ']:
+        variant = SimpleNamespace(product=product, color='BK', size=size)
+        assert get_sort_key(variant, config) == get_sort_key(variant, raw)
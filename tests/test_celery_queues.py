@@ -0,0 +1,63 @@
+import io
+import os
+from flowork.extensions import db, celery
+from flowork.models import User
+from flowork.constants import TaskPriority
+from flowork.celery_tasks import task_process_images, task_upsert_inventory, task_import_db, task_refresh_sales_analytics
+
+def test_tasks_are_routed_to_their_queues(app):
+    router = celery.amqp.router
+    assert router.route({}, task_process_images.name)['queue'].name == app.config['CELERY_IMAGE_QUEUE']
+    assert router.route({}, task_upsert_inventory.name)['queue'].name == app.config['CELERY_INVENTORY_QUEUE']
+    assert router.route({}, task_import_db.name)['queue'].name == app.config['CELERY_INVENTORY_QUEUE']
+    assert router.route({}, 'flowork.other_task')['queue'].name == app.config['CELERY_DEFAULT_QUEUE']
+    assert celery.conf.worker_prefetch_multiplier == 1
+
+def test_inventory_tasks_finish_before_broker_redelivery(app):
+    time_limit = app.config['CELERY_INVENTORY_TIME_LIMIT']
+    for task in (task_upsert_inventory, task_import_db):
+        assert celery.conf.task_annotations[task.name]['time_limit'] == time_limit
+    assert celery.conf.broker_transport_options['visibility_timeout'] > time_limit
+
+def test_sales_analytics_refresh_is_scheduled_off_hours(app):
+    entry = celery.conf.beat_schedule['refresh-sales-analytics']
+    assert entry['task'] == task_refresh_sales_analytics.name
+    assert entry['schedule'].hour == {app.config['SALES_ANALYTICS_REFRESH_HOUR']}
+    assert entry['options'] == {'queue': app.config['CELERY_DEFAULT_QUEUE'], 'priority': TaskPriority.HQ_BULK}
+
+def _capture_uploads(client, monkeypatch):
+    sent = []
+    class _Result:
+        id = 'task-id'
+    def capture(name):
+        def apply_async(args=None, priority=None, **kwargs):
+            os.remove(args[0])  # 작업이 지울 임시 업로드 파일
+            sent.append((name, priority))
+            return _Result()
+        return apply_async
+    monkeypatch.setattr(task_upsert_inventory, 'apply_async', capture('upsert'))
+    monkeypatch.setattr(task_import_db, 'apply_async', capture('import'))
+
+    def upload(form):
+        data = dict(form, excel_file=(io.BytesIO(b'x'), 'stock.xlsx'))
+        res = client.post('/api/inventory/upsert', data=data, content_type='multipart/form-data')
+        assert res.status_code == 200, res.get_data(as_text=True)
+    return sent, upload
+
+def test_store_uploads_are_sent_with_high_priority(app, client, setup_data, monkeypatch, login):
+    sent, upload = _capture_uploads(client, monkeypatch)
+    login(setup_data['user'])
+    upload({'upload_mode': 'store'})
+    assert sent == [('upsert', TaskPriority.STORE_UPLOAD)]
+
+def test_hq_bulk_uploads_are_sent_with_low_priority(app, client, setup_data, monkeypatch, login):
+    sent, upload = _capture_uploads(client, monkeypatch)
+    hq_user = User(username='hq', password_hash='hash', brand_id=setup_data['brand'].id, is_admin=True)
+    db.session.add(hq_user)
+    db.session.commit()
+    login(hq_user)
+    upload({'upload_mode': 'hq'})
+    upload({'upload_mode': 'db', 'is_full_import': 'true'})
+    assert sent == [('upsert', TaskPriority.HQ_BULK), ('import', TaskPriority.HQ_BULK)]
+    # 숫자가 작을수록 먼저 처리 (Redis 브로커)
+    assert TaskPriority.STORE_UPLOAD < TaskPriority.HQ_BULK
@@ -0,0 +1,87 @@
+import openpyxl
+from flowork.extensions import db
+from flowork.services.excel import open_stock_excel_stream, parse_stock_excel
+from flowork.services.inventory_service import InventoryService
+from flowork.services.inventory_jobs import InventoryJob
+from flowork.models import Setting, Variant, StoreStock, StockHistory
+
+def _write_sheet(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["품번", "품명", "컬러", "사이즈", "재고"])
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+STORE_FORM = {
+    'col_pn': 'A', 'col_pname': 'B', 'col_color': 'C',
+    'col_size': 'D', 'col_store_stock': 'E'
+}
+
+def test_stream_yields_fixed_size_batches(app, setup_data, tmp_path):
+    path = str(tmp_path / 'stock.xlsx')
+    _write_sheet(path, [[f"PN-{i:03d}", f"상품{i}", "BLK", "95", i] for i in range(25)])
+
+    batches, total_rows, error = open_stock_excel_stream(
+        path, STORE_FORM, 'store', setup_data['brand'].id, batch_size=10
+    )
+    assert error is None
+    assert total_rows == 25
+
+    sizes = [len(b) for b in batches]
+    assert sizes == [10, 10, 5]
+
+def test_stream_applies_cleaning_and_excluded_rows(app, setup_data, tmp_path):
+    path = str(tmp_path / 'stock.xlsx')
+    _write_sheet(path, [
+        ["ab-12 3", "자켓", "blk", "95", 3],
+        ["XY999", "바지", "NVY", "100", 1],
+    ])
+
+    # 엑셀 3행(두 번째 데이터 행)은 제외
+    batches, _, error = open_stock_excel_stream(
+        path, STORE_FORM, 'store', setup_data['brand'].id, excluded_row_indices=[3]
+    )
+    records = [r for b in batches for r in b]
+
+    assert len(records) == 1
+    rec = records[0]
+    assert rec['product_number_cleaned'] == 'AB123'
+    assert rec['barcode_cleaned'] == 'AB12300BLK095'
+    assert rec['product_name_choseong'] == 'ㅈㅋ'
+    assert '_row_index' not in rec
+
+def test_matrix_upload_rejected_on_broken_mapping_setting(app, setup_data, tmp_path):
+    path = str(tmp_path / 'stock.xlsx')
+    _write_sheet(path, [["PN-001", "상품", "BLK", "95", 1]])
+    db.session.add(Setting(brand_id=setup_data['brand'].id, key='SIZE_MAPPING', value='{not json'))
+    db.session.commit()
+    form = {**STORE_FORM, 'is_horizontal': 'on'}
+
+    batches, _, error = open_stock_excel_stream(path, form, 'store', setup_data['brand'].id)
+    assert batches is None and 'SIZE_MAPPING' in error
+    records, error = parse_stock_excel(path, form, 'store', setup_data['brand'].id)
+    assert records is None and 'SIZE_MAPPING' in error
+
+def test_stock_job_applies_streamed_batches(app, setup_data, tmp_path):
+    store_id = setup_data['store'].id
+    path = str(tmp_path / 'stock.xlsx')
+    _write_sheet(path, [[f"NEW{i:03d}", f"상품{i}", "BLK", "95", 2] for i in range(7)] + [
+        ["TEST001", "Test Product", "BLK", "L", 4],
+    ])
+
+    batches, total_rows, _ = open_stock_excel_stream(
+        path, STORE_FORM, 'store', setup_data['brand'].id, batch_size=3
+    )
+    job = InventoryJob('job-1', str(tmp_path))
+    job.write_chunks(batches)
+    progress = []
+    InventoryService.apply_stock_job(
+        job, 'store', setup_data['brand'].id, store_id,
+        progress_callback=lambda cur, tot: progress.append((cur, tot))
+    )
+
+    assert progress == [(3, total_rows), (6, total_rows), (8, total_rows)]
+    assert Variant.query.count() == 9
+    assert StoreStock.query.filter_by(store_id=store_id).count() == 9
+    assert StockHistory.query.count() == 8
@@ -0,0 +1,401 @@
+import os
+import socket
+import asyncio
+import threading
+import json
+import io
+import hashlib
+import sys
+import subprocess
+import pytest
+import numpy as np
+import aiohttp
+from aiohttp import web
+from PIL import Image, ImageStat
+from flowork.extensions import db
+from flowork.models import Product, Variant, Setting
+from flowork.constants import ImageProcessStatus
+from flowork.services.image_cache import NobgCache
+from flowork.services.image_manifest import StyleManifest
+from flowork.services import image_process
+from flowork.services.download_planner import DownloadPlanner
+from flowork.services.rembg_batch import preprocess_batch, masks_from_predictions, cutout
+from flowork.services.image_process import (
+    process_style_codes, process_style_code_group, _create_thumbnail, _create_detail_image, _remove_background, _remove_backgrounds,
+    _download_sequence, _blend_into, _load_trimmed, _calculate_brightness,
+    REMBG_MODEL_NAME, REMBG_MAX_SIZE
+)
+
+def _jpeg_bytes(color):
+    buf = io.BytesIO()
+    Image.new('RGB', (60, 80), color).save(buf, format='JPEG')
+    return buf.getvalue()
+
+@pytest.fixture
+def image_server():
+    """{code}_{num}.jpg 형태의 이미지를 제공하는 로컬 HTTP 서버 (요청 메서드/경로를 기록)"""
+    images = {}
+    requested = []
+    peers = set()
+    state = {'reject_head': False, 'delay': {}}
+    conditional = []
+
+    async def handler(request):
+        name = request.match_info['name']
+        requested.append((request.method, name))
+        peers.add(request.transport.get_extra_info('peername'))
+        if name in state['delay']:
+            await asyncio.sleep(state['delay'][name])
+        if request.method == 'HEAD' and state['reject_head']:
+            return web.Response(status=405)
+        if name not in images:
+            return web.Response(status=404)
+        if request.method == 'HEAD':
+            return web.Response(status=200, content_type='image/jpeg')
+        if request.headers.get('Range') == 'bytes=0-0':
+            return web.Response(status=206, body=images[name][:1], content_type='image/jpeg')
+        etag = f'"{hashlib.md5(images[name]).hexdigest()}"'
+        if request.headers.get('If-None-Match'):
+            not_modified = request.headers['If-None-Match'] == etag
+            conditional.append((name, 304 if not_modified else 200))
+            if not_modified:
+                return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=images[name], content_type='image/jpeg', headers={'ETag': etag})
+
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(web.Application())
+    runner.app.router.add_route('*', '/{name}', handler)
+
+    async def start():
+        await runner.setup()
+        await web.SockSite(runner, sock).start()
+
+    loop.run_until_complete(start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield {'base': f"http://127.0.0.1:{port}", 'images': images, 'requested': requested, 'peers': peers, 'state': state,
+           'conditional': conditional}
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def _add_style(brand_id, style_code, colors):
+    product = Product(product_number=style_code, product_name=style_code, brand_id=brand_id, image_status=ImageProcessStatus.PROCESSING)
+    db.session.add(product)
+    db.session.flush()
+    for color in colors:
+        db.session.add(Variant(product_id=product.id, barcode=f"{style_code}{color}", color=color, size='95'))
+    db.session.commit()
+    return product
+
+def test_pipeline_processes_styles_with_progress(app, setup_data, image_server, tmp_path, monkeypatch):
+    brand_id = setup_data['brand'].id
+    monkeypatch.setattr(app, 'root_path', str(tmp_path))
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'upload')
+    app.config['IMAGE_PROCESS_WORKERS'] = 2
+
+    db.session.add(Setting(brand_id=brand_id, key='IMAGE_DOWNLOAD_PATTERNS',
+                           value=json.dumps({'DM': [image_server['base'] + '/{code}_{num}.jpg']})))
+    codes = ['STY0001', 'STY0002', 'STY0003']
+    for code in codes:
+        _add_style(brand_id, code, ['BLK', 'WHT'])
+    image_server['images'].update({f"{c}{color}_01.jpg": _jpeg_bytes('red') for c in codes[:2] for color in ['BLK', 'WHT']})
+
+    progress = []
+    outcomes = process_style_codes(brand_id, codes, options={}, progress_callback=lambda cur, total: progress.append((cur, total)))
+
+    assert [o[0] for o in outcomes] == codes
+    assert [o[1] for o in outcomes] == [True, True, False]
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+    db.session.expire_all()
+    statuses = {p.product_number: p.image_status for p in Product.query.filter(Product.product_number.like('STY%'))}
+    assert statuses == {'STY0001': ImageProcessStatus.COMPLETED, 'STY0002': ImageProcessStatus.COMPLETED,
+                        'STY0003': ImageProcessStatus.FAILED}
+    assert (tmp_path / 'static' / 'product_images' / 'TestBrand' / 'STY0001' / 'BLK' / 'MODEL' / 'STY0001BLK_DM_01.jpg').exists()
+
+def test_batches_share_session_and_connections(app, setup_data, image_server, tmp_path, monkeypatch):
+    brand_id = setup_data['brand'].id
+    monkeypatch.setattr(app, 'root_path', str(tmp_path))
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'upload')
+    app.config['IMAGE_DOWNLOAD_PER_HOST'] = 2
+    image_process._close_image_io()  # 이전 테스트에서 만든 세션 대신 새 연결 제한으로 시작
+
+    db.session.add(Setting(brand_id=brand_id, key='IMAGE_DOWNLOAD_PATTERNS',
+                           value=json.dumps({'DM': [image_server['base'] + '/{code}_{num}.jpg']})))
+    for code in ['STY0001', 'STY0002']:
+        _add_style(brand_id, code, ['BLK', 'WHT', 'NVY'])
+        image_server['images'].update({f"{code}{color}_01.jpg": _jpeg_bytes('red') for color in ['BLK', 'WHT', 'NVY']})
+
+    process_style_codes(brand_id, ['STY0001'])
+    session = image_process._IMAGE_IO.session
+    process_style_codes(brand_id, ['STY0002'])
+
+    # 배치가 바뀌어도 같은 세션/이벤트 루프를 사용하며, 연결은 호스트당 제한 안에서 재사용됨
+    assert image_process._IMAGE_IO.session is session and not session.closed
+    assert len(image_server['requested']) > 10
+    assert len(image_server['peers']) <= 2
+
+def test_reprocessing_only_redoes_changed_parts(app, setup_data, image_server, tmp_path, monkeypatch):
+    brand_id = setup_data['brand'].id
+    monkeypatch.setattr(app, 'root_path', str(tmp_path))
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'upload')
+    app.config['NOBG_CACHE_DIR'] = str(tmp_path / 'nobg_cache')
+    db.session.add(Setting(brand_id=brand_id, key='IMAGE_DOWNLOAD_PATTERNS',
+                           value=json.dumps({'DF': [image_server['base'] + '/{code}_{num}.jpg']})))
+    product = _add_style(brand_id, 'STY0001', ['BLK', 'WHT'])
+
+    # 배경 제거 결과는 캐시에 미리 넣어 모델 없이 실행
+    cache = NobgCache(app.config['NOBG_CACHE_DIR'], 10 ** 8)
+    nobg = tmp_path / 'nobg.png'
+    Image.new('RGBA', (60, 80), (200, 0, 0, 255)).save(nobg)
+    def add_image(color, fill):
+        body = _jpeg_bytes(fill)
+        image_server['images'][f"STY0001{color}_01.jpg"] = body
+        cache.store(NobgCache.make_key(body, REMBG_MODEL_NAME, REMBG_MAX_SIZE), str(nobg))
+    add_image('BLK', 'black')
+    add_image('WHT', 'white')
+
+    removed, renders = [], []
+    original_remove, original_thumb = image_process._remove_backgrounds, image_process._create_thumbnail
+    monkeypatch.setattr(image_process, '_remove_backgrounds',
+                        lambda paths, *a, **kw: removed.extend(os.path.basename(p) for p in paths) or original_remove(paths, *a, **kw))
+    monkeypatch.setattr(image_process, '_create_thumbnail',
+                        lambda *a, **kw: renders.append(1) or original_thumb(*a, **kw))
+
+    assert process_style_code_group(brand_id, 'STY0001')[0]
+    base_dir = tmp_path / 'static' / 'product_images' / 'TestBrand' / 'STY0001'
+    manifest = StyleManifest.load(str(base_dir))
+    assert set(manifest.data['colors']) == {'BLK', 'WHT'}
+    assert len(removed) == 2 and len(renders) == 1
+
+    # 컬러 추가: 기존 원본은 304로 확인만 하고, 새 컬러만 배경 제거
+    db.session.add(Variant(product_id=product.id, barcode='STY0001NVY', color='NVY', size='95'))
+    db.session.commit()
+    add_image('NVY', 'navy')
+    removed.clear(); renders.clear(); image_server['conditional'].clear()
+    assert process_style_code_group(brand_id, 'STY0001')[0]
+    assert removed == ['STY0001NVY_DF_01.jpg'] and len(renders) == 1
+    assert sorted(image_server['conditional']) == [('STY0001BLK_01.jpg', 304), ('STY0001WHT_01.jpg', 304)]
+
+    # 변경 없음: 배경 제거/합성 모두 생략하고 기존 링크 유지
+    thumb = base_dir / 'THUMBNAIL' / 'STY0001_thumb.jpg'
+    mtime = thumb.stat().st_mtime_ns
+    removed.clear(); renders.clear()
+    assert process_style_code_group(brand_id, 'STY0001')[0]
+    assert removed == [] and renders == []
+    assert thumb.stat().st_mtime_ns == mtime
+    db.session.expire_all()
+    assert db.session.get(Product, product.id).thumbnail_url.endswith('STY0001_thumb.jpg')
+
+    # 옵션 변경: 배경 제거 결과는 재사용하고 합성만 다시 수행
+    assert process_style_code_group(brand_id, 'STY0001', {'bg_color': '#000000'})[0]
+    assert removed == [] and len(renders) == 1
+
+def test_web_app_does_not_import_imaging_modules():
+    # 새 인터프리터에서 앱을 만들어도 이미지 처리 모듈은 로드되지 않아야 함 (이미지 작업 시에만 로드)
+    code = ("import sys\nfrom tests.conftest import TestConfig\nfrom flowork import create_app\ncreate_app(TestConfig)\n"
+            "print(','.join(m for m in ['flowork.services.image_process', 'aiohttp', 'rembg', 'onnxruntime'] if m in sys.modules))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
+
+def _nobg_variant(tmp_path, color, size, fill):
+    img = Image.new('RGBA', (200, 200), (0, 0, 0, 0))
+    img.paste(Image.new('RGBA', size, fill), (50, 30))
+    path = tmp_path / f"{color}_nobg.png"
+    img.save(path)
+    return {'color_code': color, 'files': {'DF': [], 'DM': [], 'NOBG': str(path)}}
+
+def test_thumbnail_and_detail_layout(tmp_path):
+    variants = [
+        _nobg_variant(tmp_path, 'BLK', (60, 120), (10, 10, 10, 255)),
+        _nobg_variant(tmp_path, 'WHT', (60, 120), (250, 250, 250, 255)),
+        _nobg_variant(tmp_path, 'RED', (100, 50), (200, 0, 0, 255)),
+    ]
+    thumb = _create_thumbnail(variants, str(tmp_path), 'STY', options={'direction': 'E', 'bg_color': '#000000'})
+    detail = _create_detail_image(variants, str(tmp_path), 'STY', options={}, font_paths=[])
+
+    with Image.open(thumb) as img:
+        assert img.size == (800, 800)
+        # 가장 밝은 컬러가 맨 앞(왼쪽)에 배치됨
+        assert img.getpixel((60, 400))[0] > 200
+    with Image.open(detail) as img:
+        assert img.width == 800
+        # 첫 이미지 비율 기준 셀 높이 x 2행
+        assert img.height == 2 * (int(120 * 360 / 60) + 80 + 40)
+
+def test_remove_background_uses_cache(tmp_path):
+    source = tmp_path / 'STY_DF_01.jpg'
+    source.write_bytes(_jpeg_bytes('blue'))
+    cache_config = {'dir': str(tmp_path / 'cache'), 'max_bytes': 10 ** 6}
+    cache = NobgCache(cache_config['dir'], cache_config['max_bytes'])
+
+    key = NobgCache.make_key(source.read_bytes(), REMBG_MODEL_NAME, REMBG_MAX_SIZE)
+    assert key != NobgCache.make_key(source.read_bytes(), REMBG_MODEL_NAME, 1000)
+    assert key != NobgCache.make_key(source.read_bytes(), 'u2netp', REMBG_MAX_SIZE)
+
+    cached = tmp_path / 'cached.png'
+    Image.new('RGBA', (10, 10), (1, 2, 3, 255)).save(cached)
+    cache.store(key, str(cached))
+
+    # 캐시 적중 시 모델을 로드하지 않고 저장된 결과를 그대로 사용
+    output = _remove_background(str(source), cache_config=cache_config)
+    assert output == str(tmp_path / 'STY_DF_01_nobg.png')
+    assert open(output, 'rb').read() == cached.read_bytes()
+
+def test_nobg_cache_evicts_least_recently_used(tmp_path):
+    src = tmp_path / 'src.png'
+    src.write_bytes(b'x' * 100)
+    cache = NobgCache(str(tmp_path / 'cache'), max_bytes=10 ** 6)
+    for i, key in enumerate(['a1', 'b2', 'c3']):
+        cache.store(key, str(src))
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+
+    cache.max_bytes = 250
+
+    assert cache.fetch('a1', str(tmp_path / 'out.png'))  # 가장 오래된 항목을 최근 사용으로 갱신
+    assert cache.evict() == 1
+    assert not os.path.exists(cache._path('b2'))
+    assert os.path.exists(cache._path('a1')) and os.path.exists(cache._path('c3'))
+
+def test_batch_preprocess_and_masks_match_single_image(tmp_path):
+    rng = np.random.default_rng(0)
+    images = [Image.fromarray(rng.integers(0, 200 + 20 * i, (90 + 10 * i, 70, 3), dtype=np.uint8)) for i in range(3)]
+
+    batch = preprocess_batch(images)
+    assert batch.shape == (3, 3, 320, 320) and batch.dtype == np.float32
+    for i, img in enumerate(images):
+        # rembg U2netSession.normalize 와 같은 계산 (이미지별 최대값 기준)
+        arr = np.asarray(img.resize((320, 320), Image.Resampling.LANCZOS)).astype(np.float64)
+        arr = arr / arr.max()
+        expected = ((arr - [0.485, 0.456, 0.406]) / [0.229, 0.224, 0.225]).transpose(2, 0, 1)
+        assert np.allclose(batch[i], expected, atol=1e-4)
+        assert np.array_equal(batch[i:i + 1], preprocess_batch([img]))
+
+    # 출력 범위가 서로 달라도 이미지별로 정규화되므로 배치로 묶어도 결과가 같음
+    pred = rng.random((3, 1, 320, 320)).astype(np.float32) * np.array([1, 5, 20], dtype=np.float32)[:, None, None, None]
+    sizes = [img.size for img in images]
+    masks = masks_from_predictions(pred, sizes)
+    for i in range(3):
+        single = masks_from_predictions(pred[i:i + 1], sizes[i:i + 1])[0]
+        assert masks[i].size == sizes[i]
+        assert np.array_equal(np.asarray(masks[i]), np.asarray(single))
+
+    out = cutout(images[0], masks[0])
+    rgba = np.asarray(out)
+    assert out.mode == 'RGBA'
+    assert np.array_equal(rgba[..., 3], np.asarray(masks[0]))
+    full = np.asarray(masks[0]) == 255
+    assert np.array_equal(rgba[full][:, :3], np.asarray(images[0])[full])
+
+def test_remove_backgrounds_keeps_input_order(tmp_path):
+    cache_config = {'dir': str(tmp_path / 'cache'), 'max_bytes': 10 ** 6}
+    cache = NobgCache(cache_config['dir'], cache_config['max_bytes'])
+    paths = []
+    for i, color in enumerate(['red', 'green', 'blue']):
+        source = tmp_path / f"C{i}_DF_01.jpg"
+        source.write_bytes(_jpeg_bytes(color))
+        cached = tmp_path / f"cached{i}.png"
+        Image.new('RGBA', (5, 5), (i, 0, 0, 255)).save(cached)
+        cache.store(NobgCache.make_key(source.read_bytes(), REMBG_MODEL_NAME, REMBG_MAX_SIZE), str(cached))
+        paths.append(str(source))
+
+    outputs = _remove_backgrounds(paths + [str(tmp_path / 'missing.jpg')], cache_config=cache_config, rembg_config=None)
+    assert outputs[3] is None
+    for i, output in enumerate(outputs[:3]):
+        with Image.open(output) as img:
+            assert img.getpixel((0, 0))[0] == i
+
+def _download(base, planner, save_dir):
+    async def run():
+        data = {'files': {'DF': [], 'DM': [], 'NOBG': None}}
+        async with aiohttp.ClientSession() as session:
+            await _download_sequence(session, 'STY0001BLK', '', [base + '/A_{code}_{num}.jpg', base + '/B_{code}_{num}.jpg'],
+                                     str(save_dir), 'DF', data, planner)
+        return data['files']['DF']
+    return asyncio.run(run())
+
+def test_download_planner_learns_and_probes_learned_format_first(app, setup_data, image_server, tmp_path):
+    brand_id = setup_data['brand'].id
+    image_server['images'].update({f"B_STY0001BLK_{n:03d}.jpg": _jpeg_bytes('red') for n in range(1, 4)})
+
+    planner = DownloadPlanner.load(brand_id)
+    files = _download(image_server['base'], planner, tmp_path)
+    assert [os.path.basename(f) for f in files] == [f"STY0001BLK_DF_{n:03d}.jpg" for n in range(1, 4)]
+    assert planner.plan['DF'] == {'pattern': image_server['base'] + '/B_{code}_{num}.jpg', 'num_format': '03d'}
+
+    # 한 번 찾은 조합 이후로는 그 조합만 확인하므로 빈 번호 확정에 5회 요청만 사용
+    requested = image_server['requested']
+    last_hit = requested.index(('GET', 'B_STY0001BLK_003.jpg'))
+    assert requested[last_hit + 1:] == [('GET', f"B_STY0001BLK_{n:03d}.jpg") for n in range(4, 9)]
+
+    planner.save()
+    assert Setting.query.filter_by(brand_id=brand_id, key='IMAGE_DOWNLOAD_PLAN').first() is not None
+
+    # 저장된 학습 결과로 다시 받으면 처음부터 학습된 조합만 GET (3개 + 빈 번호 5개)
+    image_server['requested'].clear()
+    planner = DownloadPlanner.load(brand_id)
+    assert len(_download(image_server['base'], planner, tmp_path)) == 3
+    assert image_server['requested'] == [('GET', f"B_STY0001BLK_{n:03d}.jpg") for n in range(1, 9)]
+
+def test_probe_falls_back_to_ranged_get_without_head(app, image_server, tmp_path):
+    image_server['state']['reject_head'] = True
+    image_server['images']['B_STY0001BLK_1.jpg'] = _jpeg_bytes('red')
+
+    planner = DownloadPlanner(None)
+    files = _download(image_server['base'], planner, tmp_path)
+
+    assert [os.path.basename(f) for f in files] == ['STY0001BLK_DF_1.jpg']
+    assert ('GET', 'B_STY0001BLK_1.jpg') in image_server['requested']
+    assert planner.learned('DF', [image_server['base'] + '/B_{code}_{num}.jpg']) == (image_server['base'] + '/B_{code}_{num}.jpg', 'd')
+
+def test_probe_prefers_candidate_order_over_response_time(app, image_server, tmp_path):
+    # 후보 순서가 앞선 '_1' 표기가 '_001' 표기보다 늦게 응답
+    for n in (1, 2):
+        image_server['images'][f"B_STY0001BLK_{n}.jpg"] = _jpeg_bytes('red')
+        image_server['images'][f"B_STY0001BLK_{n:03d}.jpg"] = _jpeg_bytes('red')
+    image_server['state']['delay']['B_STY0001BLK_1.jpg'] = 0.3
+
+    planner = DownloadPlanner(None)
+    files = _download(image_server['base'], planner, tmp_path)
+
+    assert [os.path.basename(f) for f in files] == ['STY0001BLK_DF_1.jpg', 'STY0001BLK_DF_2.jpg']
+    assert planner.plan['DF']['num_format'] == 'd'
+
+def test_numpy_compositing_matches_pil(tmp_path):
+    rng = np.random.default_rng(1)
+    layers = []
+    for _ in range(2):
+        rgba = rng.integers(0, 256, (50, 40, 4), dtype=np.uint8)
+        rgba[:5] = 0  # 위쪽 투명 여백
+        layers.append(rgba)
+
+    # 기존 방식: 투명 레이어에 alpha_composite 후 배경 위에 paste
+    layout = Image.new('RGBA', (100, 80), (255, 255, 255, 0))
+    for rgba, pos in zip(layers, [(10, 10), (30, 25)]):
+        layout.alpha_composite(Image.fromarray(rgba), pos)
+    expected = Image.new('RGB', (100, 80), (20, 40, 60))
+    expected.paste(layout, (0, 0), layout)
+
+    canvas = np.empty((80, 100, 3), dtype=np.uint8)
+    canvas[...] = (20, 40, 60)
+    for rgba, (x, y) in zip(layers, [(10, 10), (30, 25)]):
+        _blend_into(canvas, rgba, x, y)
+    assert np.abs(canvas.astype(int) - np.asarray(expected).astype(int)).max() <= 1
+
+    # 캔버스 밖으로 나가는 부분은 잘라내고 겹치는 영역만 갱신
+    before = canvas.copy()
+    _blend_into(canvas, layers[0], 90, -20)
+    assert np.array_equal(canvas[:, :90], before[:, :90]) and np.array_equal(canvas[30:], before[30:])
+
+    img = Image.fromarray(layers[0])
+    path = tmp_path / 'layer.png'
+    img.save(path)
+    trimmed = _load_trimmed(str(path))
+    assert np.array_equal(trimmed, np.asarray(img.crop(img.getbbox())))
+    assert abs(_calculate_brightness(trimmed) - ImageStat.Stat(img.crop(img.getbbox()).convert('L')).mean[0]) < 1e-6
@@ -0,0 +1,139 @@
+import os
+import pytest
+from sqlalchemy.exc import OperationalError
+from flowork.models import Product, Variant, StoreStock, StockHistory
+from flowork.services.excel import open_stock_excel_stream
+from flowork.services.inventory_service import InventoryService
+from flowork.services.inventory_jobs import InventoryJob, iter_chunks
+from tests.test_excel_stream import _write_sheet, STORE_FORM
+
+def _fail_once_on_call(monkeypatch, name, fail_at):
+    """fail_at번째 호출에서 한 번만 DB 연결 오류를 내는 스파이 (호출 횟수 기록)"""
+    original = getattr(InventoryService, name)
+    calls = []
+    def spy(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == fail_at:
+            raise OperationalError('apply', {}, Exception('connection lost'))
+        return original(*args, **kwargs)
+    monkeypatch.setattr(InventoryService, name, staticmethod(spy))
+    return calls
+
+def test_job_chunks_round_trip(tmp_path):
+    job = InventoryJob('job-1', str(tmp_path))
+    assert not job.parsed
+    job.write_chunks(iter_chunks([{'n': i, 'store_stock': None} for i in range(5)], size=2))
+    job.checkpoint(2, processed=4)
+
+    # 다른 프로세스(재시도)에서 같은 작업 ID로 열면 중간 파일과 체크포인트를 그대로 사용
+    resumed = InventoryJob('job-1', str(tmp_path))
+    assert (resumed.chunks, resumed.rows, resumed.next_chunk) == (3, 5, 2)
+    assert resumed.state == {'processed': 4}
+    assert resumed.read_chunk(2) == [{'n': 4, 'store_stock': None}]
+
+    resumed.remove()
+    assert not InventoryJob('job-1', str(tmp_path)).parsed
+
+def test_job_lock_rejects_concurrent_delivery(tmp_path):
+    first = InventoryJob('job-1', str(tmp_path))
+    assert first.acquire_lock()
+    first.write_chunks(iter_chunks([{'n': 1, 'store_stock': None}], size=1))
+    first.checkpoint(1, processed=1)
+
+    # 브로커가 다시 전달한 사본은 처리 중인 작업의 잠금을 얻지 못함
+    redelivered = InventoryJob('job-1', str(tmp_path))
+    assert not redelivered.acquire_lock()
+
+    # 앞선 사본이 잠금을 풀면 최신 체크포인트부터 이어서 처리
+    first.release_lock()
+    assert redelivered.acquire_lock()
+    assert redelivered.next_chunk == 1
+    redelivered.remove()
+    redelivered.release_lock()
+    assert not os.path.exists(redelivered.lock_path)
+
+def test_stock_job_resumes_after_last_committed_chunk(app, setup_data, tmp_path, monkeypatch):
+    store_id = setup_data['store'].id
+    path = str(tmp_path / 'stock.xlsx')
+    _write_sheet(path, [[f"NEW{i:03d}", f"상품{i}", "BLK", "95", 2] for i in range(7)] + [
+        ["TEST001", "Test Product", "BLK", "L", 4],
+    ])
+    batches, _, _ = open_stock_excel_stream(path, STORE_FORM, 'store', setup_data['brand'].id, batch_size=3)
+    InventoryJob('job-1', str(tmp_path)).write_chunks(batches)
+
+    calls = _fail_once_on_call(monkeypatch, '_apply_stock_batch', fail_at=2)
+    with pytest.raises(OperationalError):
+        InventoryService.apply_stock_job(InventoryJob('job-1', str(tmp_path)), 'store', setup_data['brand'].id, store_id)
+
+    job = InventoryJob('job-1', str(tmp_path))
+    assert job.next_chunk == 1
+    assert StoreStock.query.filter_by(store_id=store_id).count() == 4  # 첫 묶음(3행)만 커밋됨
+
+    progress = []
+    _, new_variants, message = InventoryService.apply_stock_job(
+        job, 'store', setup_data['brand'].id, store_id, progress_callback=lambda cur, tot: progress.append((cur, tot))
+    )
+
+    # 재개 시 첫 묶음은 다시 반영하지 않음 (실패 1회 + 나머지 2묶음)
+    assert len(calls) == 4
+    assert progress == [(6, 8), (8, 8)]
+    assert new_variants == 8 and '옵션 8건' in message
+    assert Variant.query.count() == 9
+    assert StoreStock.query.filter_by(store_id=store_id).count() == 9
+    assert StockHistory.query.count() == 8
+
+def test_stock_job_keeps_last_row_of_barcode_repeated_across_batches(app, setup_data, tmp_path):
+    store_id = setup_data['store'].id
+    path = str(tmp_path / 'stock.xlsx')
+    _write_sheet(path, [
+        ["TEST001", "Test Product", "BLK", "L", 1],
+        ["NEW001", "상품1", "BLK", "95", 2],
+        ["TEST001", "Test Product", "BLK", "L", 3],
+        ["NEW002", "상품2", "BLK", "95", 2],
+        ["TEST001", "Test Product", "BLK", "L", 5],
+    ])
+    batches, _, _ = open_stock_excel_stream(path, STORE_FORM, 'store', setup_data['brand'].id, batch_size=2)
+    job = InventoryJob('job-1', str(tmp_path))
+    job.write_chunks(batches, dedupe_key='barcode_cleaned')
+    assert (job.chunks, job.rows) == (3, 3)
+    assert [[r['product_number'] for r in job.read_chunk(i)] for i in range(3)] == [['NEW001'], ['NEW002'], ['TEST001']]
+
+    InventoryService.apply_stock_job(job, 'store', setup_data['brand'].id, store_id)
+
+    variant = Variant.query.filter_by(barcode_cleaned=job.read_chunk(2)[0]['barcode_cleaned']).one()
+    assert StoreStock.query.filter_by(store_id=store_id, variant_id=variant.id).one().quantity == 5
+    assert StockHistory.query.count() == 3  # 바코드당 한 번만 반영
+
+def test_import_job_resumes_without_deleting_again(app, setup_data, tmp_path, monkeypatch):
+    brand_id = setup_data['brand'].id
+    records = [{
+        'product_number': f"IMP{i // 2:03d}", 'product_number_cleaned': f"IMP{i // 2:03d}",
+        'product_name': f"상품{i // 2}", 'barcode': f"IMP{i:05d}", 'barcode_cleaned': f"IMP{i:05d}",
+        'color': 'BLK', 'size': str(90 + i), 'hq_stock': i,
+    } for i in range(6)]
+    # 중복 바코드는 첫 행 기준
+    records.append(dict(records[0], color='WHT'))
+    job = InventoryJob('job-2', str(tmp_path))
+    job.write_chunks(iter_chunks(records, size=2))
+
+    calls = _fail_once_on_call(monkeypatch, '_apply_import_chunk_orm', fail_at=3)
+    with pytest.raises(OperationalError):
+        InventoryService.apply_import_job(job, brand_id)
+
+    # 기존 카탈로그는 삭제되고 앞의 두 묶음까지 커밋됨
+    assert Product.query.filter_by(brand_id=brand_id).count() == 2
+    delete_calls = []
+    original_delete = InventoryService._delete_brand_catalogue
+    monkeypatch.setattr(InventoryService, '_delete_brand_catalogue',
+                        staticmethod(lambda b: delete_calls.append(b) or original_delete(b)))
+
+    success, message = InventoryService.apply_import_job(InventoryJob('job-2', str(tmp_path)), brand_id)
+
+    assert success and message == "초기화 완료: 상품 3개, 옵션 6개 등록"
+    assert delete_calls == []
+    assert len(calls) == 5
+    assert Product.query.filter_by(brand_id=brand_id).count() == 3
+    variants = Variant.query.join(Product).filter(Product.brand_id == brand_id).all()
+    assert sorted(v.barcode for v in variants) == [f"IMP{i:05d}" for i in range(6)]
+    assert {v.barcode: v.color for v in variants}['IMP00000'] == 'BLK'
+    assert {v.barcode: v.hq_quantity for v in variants}['IMP00005'] == 5
@@ -0,0 +1,73 @@
+import random
+from flowork.extensions import db
+from flowork.models import Product
+from flowork.utils import clean_string_upper, get_choseong
+from flowork.services.product_search import ProductSearch, ALL_FIELDS, SEARCH_FIELDS
+
+NAMES = ['경량 다운 자켓', '고어텍스 등산화', '플리스 후드', '트레킹 팬츠', '100% 울 양말', 'KIDS_자켓']
+
+def _add_products(brand_id, count=120, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        pn = f"{rng.choice(['DMU', 'DWP', 'JUW'])}{rng.randint(10, 99)}-{i:03d}"
+        name = f"{rng.choice(NAMES)} {i}"
+        db.session.add(Product(
+            product_number=pn, product_name=name, brand_id=brand_id,
+            product_number_cleaned=clean_string_upper(pn),
+            product_name_cleaned=clean_string_upper(name),
+            product_name_choseong=get_choseong(name)
+        ))
+    db.session.commit()
+
+def _search_ids(brand_id, query, fields=ALL_FIELDS):
+    return {p.id for p in Product.query.filter(
+        Product.brand_id == brand_id, ProductSearch.criterion(brand_id, query, fields)
+    )}
+
+def _naive_ids(brand_id, query, fields=ALL_FIELDS):
+    term = clean_string_upper(query)
+    ids = set()
+    for p in Product.query.filter_by(brand_id=brand_id):
+        for f in fields:
+            value = getattr(p, SEARCH_FIELDS[f].key)
+            if value and term in value:
+                ids.add(p.id)
+    return ids
+
+def test_memory_index_matches_substring_search(app, setup_data):
+    brand_id = setup_data['brand'].id
+    _add_products(brand_id)
+
+    queries = ['D', 'MU', 'dmu1', 'DWP-2', '자켓', '다운자', 'ㄱㄹ', 'ㄷㅅㅎ', '100%', 'S_자', '%', '_', 'XYZ', '0']
+    for q in queries:
+        for fields in [ALL_FIELDS, ('number',), ('name',), ('number', 'name')]:
+            assert _search_ids(brand_id, q, fields) == _naive_ids(brand_id, q, fields), (q, fields)
+
+def test_memory_index_refreshes_after_product_changes(app, setup_data):
+    brand_id = setup_data['brand'].id
+    assert _search_ids(brand_id, 'NEWPN') == set()
+
+    _add_products(brand_id, count=3, seed=1)
+    p = Product.query.filter_by(brand_id=brand_id).order_by(Product.id.desc()).first()
+    p.product_number_cleaned = 'NEWPN999'
+    db.session.commit()
+    ProductSearch.invalidate(brand_id)
+
+    assert _search_ids(brand_id, 'newpn') == {p.id}
+
+def test_order_product_search_ranks_prefix_first(app, client, setup_data, login):
+    brand_id = setup_data['brand'].id
+    for pn in ['XAB100', 'AB100X', 'ZZAB100']:
+        db.session.add(Product(
+            product_number=pn, product_name='상품', brand_id=brand_id,
+            product_number_cleaned=pn, product_name_cleaned='상품', product_name_choseong='ㅅㅍ'
+        ))
+    db.session.commit()
+
+    login(setup_data['user'])
+    res = client.post('/api/order_product_search', json={'query': 'ab100'})
+    data = res.get_json()
+
+    assert data['status'] == 'success'
+    assert [p['product_number'] for p in data['products']][0] == 'AB100X'
+    assert {p['product_number'] for p in data['products']} == {'XAB100', 'AB100X', 'ZZAB100'}
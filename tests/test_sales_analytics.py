@@ -0,0 +1,115 @@
+import os
+from datetime import date
+import numpy as np
+from flowork.extensions import db
+from flowork.models import Store, User, Product, Variant, StoreStock
+from flowork.constants import PaymentMethod
+from flowork.services.sales_service import SalesService
+from flowork.services.sales_analytics import SalesAnalytics, months_between
+
+def _setup_sales(setup_data):
+    brand_id, store_id, user_id = setup_data['brand'].id, setup_data['store'].id, setup_data['user'].id
+    store2 = Store(store_name='Store2', brand_id=brand_id)
+    db.session.add(store2)
+    db.session.flush()
+
+    variants = {}
+    for pn, category, price, stock in [('JK01', '자켓', 10000, 10), ('PT01', '팬츠', 20000, 4), ('AC01', None, 5000, 0)]:
+        product = Product(product_number=pn, product_name=f"{pn} 상품", brand_id=brand_id, item_category=category)
+        db.session.add(product)
+        db.session.flush()
+        v = Variant(product_id=product.id, barcode=f"{pn}-F", color='BLK', size='F', original_price=price, sale_price=price)
+        db.session.add(v)
+        db.session.flush()
+        if stock:
+            db.session.add(StoreStock(store_id=store_id, variant_id=v.id, quantity=stock))
+        variants[pn] = v.id
+    db.session.commit()
+
+    def sell(store, day, pn, qty):
+        result = SalesService.create_sale(store, user_id, day, [{'variant_id': variants[pn], 'quantity': qty}],
+                                          PaymentMethod.CARD, False)
+        assert result['status'] == 'success', result
+        return result['sale_id']
+
+    sell(store_id, '2024-05-06', 'JK01', 2)
+    sell(store_id, '2024-05-06', 'PT01', 1)
+    sell(store_id, '2024-05-14', 'JK01', 1)
+    sell(store2.id, '2024-05-07', 'AC01', 3)
+    refunded = sell(store2.id, '2024-05-08', 'PT01', 1)
+    SalesService.refund_sale_full(refunded, store2.id, user_id)
+    sell(store_id, '2024-04-30', 'JK01', 5)
+    return store_id, store2.id
+
+def test_extract_and_group_by_reports(app, setup_data, tmp_path):
+    store_id, store2_id = _setup_sales(setup_data)
+    analytics = SalesAnalytics(setup_data['brand'].id, str(tmp_path))
+    assert analytics.refresh(months_between(date(2024, 4, 1), date(2024, 5, 31))) == {'2024-04': 1, '2024-05': 4}
+
+    weekly = analytics.store_category_week(date(2024, 5, 1), date(2024, 5, 31))
+    assert [tuple(r) for r in weekly[['week', 'store_name', 'category', 'quantity', 'amount']].itertuples(index=False)] == [
+        ('2024-05-06', 'TestStore', '자켓', 2, 20000),
+        ('2024-05-06', 'TestStore', '팬츠', 1, 20000),
+        ('2024-05-06', 'Store2', '미분류', 3, 15000),
+        ('2024-05-13', 'TestStore', '자켓', 1, 10000),
+    ]
+
+    # 월 경계에 걸친 기간은 날짜로 잘라서 집계
+    top = analytics.top_styles(date(2024, 4, 30), date(2024, 5, 6), n=2)
+    assert [(r.product_number, r.quantity, r.amount) for r in top.itertuples()] == [('JK01', 7, 70000), ('PT01', 1, 20000)]
+
+    sell_through = analytics.sell_through(date(2024, 5, 1), date(2024, 5, 31))
+    assert [(r.product_number, r.sold, r.stock, r.sell_through) for r in sell_through.itertuples()] == [
+        ('AC01', 3, 0, 1.0), ('JK01', 3, 2, 0.6), ('PT01', 1, 3, 0.25)
+    ]
+
+def test_reports_without_product_snapshot(app, tmp_path):
+    # 월 파일은 저장됐지만 스냅숏 추출이 실패한 경우
+    analytics = SalesAnalytics(1, str(tmp_path))
+    analytics.write_month('2024-05', {
+        'sale_date': np.array(['2024-05-06', '2024-05-14'], dtype='datetime64[D]'),
+        'store_id': [1, 2], 'product_id': [10, 11], 'variant_id': [100, 110],
+        'quantity': [2, 1], 'amount': [20000, 5000], 'discount': [0, 0], 'is_online': [False, True],
+    })
+
+    weekly = analytics.store_category_week(date(2024, 5, 1), date(2024, 5, 31))
+    assert weekly['category'].tolist() == ['미분류', '미분류']
+    assert weekly['quantity'].tolist() == [2, 1]
+
+def test_reextracting_month_replaces_files(app, setup_data, tmp_path):
+    _setup_sales(setup_data)
+    analytics = SalesAnalytics(setup_data['brand'].id, str(tmp_path))
+    analytics.refresh(['2024-05'])
+    first_dir = analytics.manifest['months']['2024-05']['dir']
+
+    # 새 인스턴스(다른 프로세스)에서도 같은 manifest를 읽고, 다시 추출하면 이전 디렉터리는 삭제
+    again = SalesAnalytics(setup_data['brand'].id, str(tmp_path))
+    assert again.months == ['2024-05']
+    again.refresh(['2024-05'])
+    brand_dir = os.path.join(str(tmp_path), str(setup_data['brand'].id))
+    assert not os.path.exists(os.path.join(brand_dir, first_dir))
+    assert sorted(d for d in os.listdir(brand_dir) if d.startswith('2024-05')) == [again.manifest['months']['2024-05']['dir']]
+    assert int(again.lines(date(2024, 5, 1), date(2024, 5, 31))['quantity'].sum()) == 7
+
+def test_analytics_api_is_hq_only(app, client, setup_data, tmp_path, login):
+    _setup_sales(setup_data)
+    app.config['SALES_ANALYTICS_DIR'] = str(tmp_path)
+    SalesAnalytics.for_brand(setup_data['brand'].id).refresh(['2024-05'])
+
+    hq = User(username='hq', password_hash='x', brand_id=setup_data['brand'].id)
+    db.session.add(hq)
+    db.session.commit()
+    login(hq)
+
+    res = client.get('/api/analytics/sales?report=sell_through&start_date=2024-05-01&end_date=2024-05-31&n=1')
+    data = res.get_json()
+    assert res.status_code == 200
+    assert data['rows'] == [{
+        'product_id': data['rows'][0]['product_id'], 'sold': 3, 'stock': 0, 'sell_through': 1.0,
+        'product_number': 'AC01', 'product_name': 'AC01 상품', 'category': '미분류'
+    }]
+    assert client.get('/api/analytics/sales?report=unknown').status_code == 400
+
+def test_analytics_api_rejects_store_accounts(app, client, setup_data, login):
+    login(setup_data['user'])
+    assert client.get('/api/analytics/sales?report=top_styles').status_code == 403
@@ -0,0 +1,66 @@
+from datetime import date
+from flowork.extensions import db
+from flowork.models import Product, Variant, Sale, SaleItem
+
+def _search(client, count_statements, payload):
+    res, count = count_statements(client.post, '/api/sales/search_products', json=payload)
+    return res.get_json(), count
+
+def test_search_products_sales_mode(app, client, setup_data, add_catalogue, count_statements, login):
+    add_catalogue(2)
+    login(setup_data['user'])
+
+    data, _ = _search(client, count_statements, {'query': 'srch001', 'mode': 'sales'})
+
+    assert data['status'] == 'success'
+    assert [(r['product_number'], r['color'], r['original_price'], r['sale_price'], r['stat_qty']) for r in data['results']] == [
+        ('SRCH001', 'BLK', 1000, 900, 9 + 9 + 10),
+        ('SRCH001', 'NVY', 2000, 1900, 9 + 9 + 10),
+    ]
+    assert data['results'][0]['year'] == 2025
+
+def test_search_products_refund_mode(app, client, setup_data, add_catalogue, count_statements, login):
+    store_id = setup_data['store'].id
+    add_catalogue(1)
+    login(setup_data['user'])
+
+    blk = Variant.query.filter_by(color='BLK').all()
+    sale = Sale(store_id=store_id, sale_date=date(2025, 3, 2), daily_number=1, status='valid')
+    cancelled = Sale(store_id=store_id, sale_date=date(2025, 3, 2), daily_number=2, status='cancelled')
+    db.session.add_all([sale, cancelled])
+    db.session.flush()
+    for target, qty in [(sale, 2), (sale, 1), (cancelled, 5)]:
+        v = blk[qty % len(blk)]
+        db.session.add(SaleItem(sale_id=target.id, variant_id=v.id, quantity=qty, unit_price=900, subtotal=900 * qty))
+    db.session.commit()
+
+    data, _ = _search(client, count_statements, {
+        'query': 'SRCH000', 'mode': 'refund', 'start_date': '2025-03-01', 'end_date': '2025-03-31'
+    })
+    assert [(r['color'], r['stat_qty']) for r in data['results']] == [('BLK', 3), ('NVY', 0)]
+
+    data, _ = _search(client, count_statements, {'query': 'SRCH000', 'mode': 'refund'})
+    assert [(r['color'], r['stat_qty']) for r in data['results']] == [('BLK', 0), ('NVY', 0)]
+
+def test_search_products_query_count_is_constant(app, client, setup_data, add_catalogue, count_statements, login):
+    brand_id, store_id = setup_data['brand'].id, setup_data['store'].id
+    add_catalogue(2)
+    login(setup_data['user'])
+    # 확장 모듈 확인, 검색 인덱스 (재)구성 등 1회성 조회를 제외하기 위해 매 측정 전 예열
+    _search(client, count_statements, {'query': 'SRCH', 'mode': 'sales'})
+    small, small_count = _search(client, count_statements, {'query': 'SRCH', 'mode': 'sales'})
+
+    for pn in [f"SRCH{i:03d}" for i in range(2, 30)]:
+        product = Product(product_number=pn, product_name=pn, brand_id=brand_id, product_number_cleaned=pn, product_name_cleaned=pn)
+        db.session.add(product)
+        db.session.flush()
+        for color in ['BLK', 'NVY', 'WHT']:
+            db.session.add(Variant(product_id=product.id, barcode=f"{pn}{color}", color=color, size='95'))
+    db.session.commit()
+
+    _search(client, count_statements, {'query': 'SRCH', 'mode': 'sales'})
+    large, large_count = _search(client, count_statements, {'query': 'SRCH', 'mode': 'sales'})
+
+    assert len(small['results']) == 4
+    assert len(large['results']) == 4 + 28 * 3
+    assert large_count == small_count
@@ -1,6 +1,8 @@
+from datetime import date
 from flowork.services.sales_service import SalesService
 from flowork.constants import SaleStatus, PaymentMethod
-from flowork.models import Sale, StoreStock, StockHistory
+from flowork.extensions import db
+from flowork.models import Sale, SaleItem, SaleDailyCounter, StoreStock, StockHistory
 
 def test_create_sale(app, setup_data):
     store_id = setup_data['store'].id
@@ -55,4 +57,182 @@ def test_refund_sale_full(app, setup_data):
     
     # 상태 변경 확인
     sale = Sale.query.get(sale_id)
-    assert sale.status == SaleStatus.REFUNDED
\ No newline at end of file
+    assert sale.status == SaleStatus.REFUNDED
+
+# 홀수 번째 옵션은 매장 재고 행이 없음 (판매 시 생성)
+BASKET = {'product_number': 'BASKET01', 'product_name': '장바구니 상품', 'sparse_stock': True}
+
+def test_create_sale_statement_count_does_not_grow_with_basket(app, setup_data, count_statements, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    ids = add_variants(16, **BASKET)
+
+    def sell(items):
+        result, count = count_statements(SalesService.create_sale,
+                                         store_id, user_id, '2023-01-01', items, PaymentMethod.CARD, False)
+        assert result['status'] == 'success', result
+        return count
+
+    one_item = sell([{'variant_id': ids[0], 'quantity': 1}])
+    basket = sell([{'variant_id': v, 'quantity': 1} for v in ids[1:]])
+
+    # 재고 행 생성/재잠금 2개를 제외하면 품목 수와 무관
+    assert basket <= one_item + 2
+
+def test_create_sale_bulk_rows_match_line_items(app, setup_data, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    ids = add_variants(3, **BASKET)
+
+    items = [
+        {'variant_id': ids[0], 'quantity': 2, 'discount_amount': 1000},
+        {'variant_id': ids[1], 'quantity': 1},
+        {'variant_id': ids[0], 'quantity': 1},
+    ]
+    result = SalesService.create_sale(store_id, user_id, '2023-01-01', items, PaymentMethod.CARD, False)
+    assert result['status'] == 'success'
+
+    sale = db.session.get(Sale, result['sale_id'])
+    assert sale.total_amount == 14000 * 2 + 15000 + 15000
+    assert [(i.variant_id, i.quantity, i.subtotal, i.product_name) for i in sale.items.order_by(SaleItem.id)] == [
+        (ids[0], 2, 28000, '장바구니 상품'), (ids[1], 1, 15000, '장바구니 상품'), (ids[0], 1, 15000, '장바구니 상품')
+    ]
+
+    stocks = {s.variant_id: s.quantity for s in StoreStock.query.filter(StoreStock.variant_id.in_(ids))}
+    assert stocks == {ids[0]: 2, ids[1]: -1, ids[2]: 5}
+    # 같은 옵션의 이력은 줄 순서대로 누적 수량을 기록
+    history = [(h.variant_id, h.quantity_change, h.current_quantity)
+               for h in StockHistory.query.filter_by(store_id=store_id).order_by(StockHistory.id)]
+    assert history == [(ids[0], -2, 3), (ids[1], -1, -1), (ids[0], -1, 2)]
+
+def test_create_sale_rejects_invalid_lines_without_side_effects(app, setup_data, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    ids = add_variants(2, **BASKET)
+
+    missing = SalesService.create_sale(store_id, user_id, '2023-01-01',
+                                       [{'variant_id': ids[0], 'quantity': 1}, {'variant_id': 999999, 'quantity': 1}],
+                                       PaymentMethod.CARD, False)
+    too_much_discount = SalesService.create_sale(store_id, user_id, '2023-01-01',
+                                                 [{'variant_id': ids[0], 'quantity': 1, 'discount_amount': 20000}],
+                                                 PaymentMethod.CARD, False)
+
+    assert missing['status'] == 'error' and '999999' in missing['message']
+    assert too_much_discount['status'] == 'error' and '장바구니 상품' in too_much_discount['message']
+    assert Sale.query.count() == 0
+    assert StoreStock.query.filter_by(variant_id=ids[0]).one().quantity == 5
+    assert StockHistory.query.count() == 0
+
+def test_create_sale_rejects_empty_items_before_locking(app, setup_data, sql_statements):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+
+    with sql_statements() as statements:
+        result = SalesService.create_sale(store_id, user_id, '2023-01-01', [], PaymentMethod.CARD, False)
+
+    assert result['status'] == 'error' and '판매할 상품이 없습니다' in result['message']
+    assert statements == []
+    assert Sale.query.count() == 0 and StockHistory.query.count() == 0
+
+def test_daily_numbers_come_from_store_day_counter(app, setup_data):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    items = [{'variant_id': setup_data['variant'].id, 'quantity': 1}]
+
+    # 카운터 도입 전에 등록된 판매가 있으면 그 다음 번호부터 발급
+    db.session.add(Sale(store_id=store_id, user_id=user_id, sale_date=date(2023, 1, 1), daily_number=7, total_amount=0))
+    db.session.commit()
+
+    numbers = []
+    for day in ['2023-01-01', '2023-01-01', '2023-01-02', '2023-01-01']:
+        result = SalesService.create_sale(store_id, user_id, day, items, PaymentMethod.CARD, False)
+        numbers.append(db.session.get(Sale, result['sale_id']).daily_number)
+
+    assert numbers == [8, 9, 1, 10]
+    counters = {(c.sale_date.isoformat(), c.last_number) for c in SaleDailyCounter.query.filter_by(store_id=store_id)}
+    assert counters == {('2023-01-01', 10), ('2023-01-02', 1)}
+
+    # 실패한 판매는 번호를 소비하지 않음 (카운터 증가도 롤백)
+    failed = SalesService.create_sale(store_id, user_id, '2023-01-01', [{'variant_id': 999999}], PaymentMethod.CARD, False)
+    assert failed['status'] == 'error'
+    result = SalesService.create_sale(store_id, user_id, '2023-01-01', items, PaymentMethod.CARD, False)
+    assert db.session.get(Sale, result['sale_id']).daily_number == 11
+
+def test_refund_statement_count_does_not_grow_with_items(app, setup_data, count_statements, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    ids = add_variants(12, **BASKET)
+    def sell(variant_ids):
+        items = [{'variant_id': v, 'quantity': 2} for v in variant_ids]
+        return SalesService.create_sale(store_id, user_id, '2023-01-01', items, PaymentMethod.CARD, False)['sale_id']
+
+    def refund(func, *args):
+        result, count = count_statements(func, *args)
+        assert result['status'] == 'success', result
+        return count
+
+    small, large = sell(ids[:1]), sell(ids)
+    partial_one = refund(SalesService.refund_sale_partial, small, store_id, user_id,
+                         [{'variant_id': ids[0], 'quantity': 1}])
+    partial_many = refund(SalesService.refund_sale_partial, large, store_id, user_id,
+                          [{'variant_id': v, 'quantity': 1} for v in ids])
+    assert partial_many == partial_one
+
+    full_one = refund(SalesService.refund_sale_full, small, store_id, user_id)
+    full_many = refund(SalesService.refund_sale_full, large, store_id, user_id)
+    assert full_many == full_one
+
+    stocks = {s.variant_id: s.quantity for s in StoreStock.query.filter(StoreStock.variant_id.in_(ids))}
+    assert stocks == {v: (5 if i % 2 == 0 else 0) for i, v in enumerate(ids)}
+    assert db.session.get(Sale, large).status == SaleStatus.REFUNDED
+
+def test_refund_partial_updates_items_history_and_status(app, setup_data, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    ids = add_variants(2, **BASKET)
+    items = [
+        {'variant_id': ids[0], 'quantity': 2, 'discount_amount': 1000},
+        {'variant_id': ids[1], 'quantity': 1},
+    ]
+    sale_id = SalesService.create_sale(store_id, user_id, '2023-01-01', items, PaymentMethod.CARD, False)['sale_id']
+
+    # 같은 옵션 요청은 합산, 판매 수량보다 많이 요청한 옵션은 건너뜀
+    result = SalesService.refund_sale_partial(sale_id, store_id, user_id, [
+        {'variant_id': ids[0], 'quantity': 1}, {'variant_id': str(ids[0]), 'quantity': '1'},
+        {'variant_id': ids[1], 'quantity': 5},
+    ])
+    assert result['status'] == 'success'
+
+    db.session.expire_all()
+    sale = db.session.get(Sale, sale_id)
+    assert sale.status == SaleStatus.VALID
+    assert sale.total_amount == 15000
+    assert [(i.variant_id, i.quantity, i.subtotal) for i in sale.items.order_by(SaleItem.id)] == [
+        (ids[0], 0, 0), (ids[1], 1, 15000)
+    ]
+    history = [(h.variant_id, h.change_type, h.quantity_change, h.current_quantity)
+               for h in StockHistory.query.filter_by(store_id=store_id).order_by(StockHistory.id)][2:]
+    assert history == [(ids[0], 'REFUND_PARTIAL', 2, 5)]
+
+    # 남은 품목을 모두 환불하면 전체 환불 상태로 변경
+    SalesService.refund_sale_partial(sale_id, store_id, user_id, [{'variant_id': ids[1], 'quantity': 1}])
+    db.session.expire_all()
+    sale = db.session.get(Sale, sale_id)
+    assert sale.status == SaleStatus.REFUNDED
+    assert sale.total_amount == 0
+    assert StoreStock.query.filter_by(store_id=store_id, variant_id=ids[1]).one().quantity == 0
+
+def test_refund_partial_spreads_quantity_across_split_lines(app, setup_data, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    a, b = add_variants(2, **BASKET)
+    # 같은 옵션이 두 줄로 나뉜 판매
+    items = [{'variant_id': a, 'quantity': 1}, {'variant_id': b, 'quantity': 1}, {'variant_id': a, 'quantity': 1}]
+    sale_id = SalesService.create_sale(store_id, user_id, '2023-01-01', items, PaymentMethod.CARD, False)['sale_id']
+
+    over = SalesService.refund_sale_partial(sale_id, store_id, user_id, [{'variant_id': a, 'quantity': 3}])
+    assert over['status'] == 'error'
+
+    result = SalesService.refund_sale_partial(sale_id, store_id, user_id, [
+        {'variant_id': a, 'quantity': 1}, {'variant_id': a, 'quantity': 1}
+    ])
+    assert result['status'] == 'success'
+
+    db.session.expire_all()
+    sale = db.session.get(Sale, sale_id)
+    assert [(i.variant_id, i.quantity) for i in sale.items.order_by(SaleItem.id)] == [(a, 0), (b, 1), (a, 0)]
+    assert sale.total_amount == 15000
+    assert StoreStock.query.filter_by(store_id=store_id, variant_id=a).one().quantity == 5
+    assert [h.quantity_change for h in StockHistory.query.filter_by(change_type='REFUND_PARTIAL')] == [2]
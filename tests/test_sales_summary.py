@@ -0,0 +1,144 @@
+import io
+from datetime import date
+import openpyxl
+from flowork.extensions import db
+from flowork.models import Sale, DailySalesSummary
+from flowork.constants import PaymentMethod
+from flowork.services.sales_service import SalesService, SUMMARY_FIELDS
+
+SUMMARY_ITEM = {'product_number': 'SUM01', 'product_name': '집계 상품', 'sale_price': 10000, 'stock': 50}
+
+def _sell(store_id, user_id, day, lines, is_online=False):
+    items = [{'variant_id': v, 'quantity': qty, 'discount_amount': discount} for v, qty, discount in lines]
+    result = SalesService.create_sale(store_id, user_id, day, items, PaymentMethod.CARD, is_online)
+    assert result['status'] == 'success', result
+    return result['sale_id']
+
+def _summaries(store_id):
+    db.session.expire_all()
+    return {
+        s.sale_date.isoformat(): {f: getattr(s, f) for f in SUMMARY_FIELDS}
+        for s in DailySalesSummary.query.filter_by(store_id=store_id)
+    }
+
+def test_summary_follows_sales_and_refunds_and_matches_rebuild(app, setup_data, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    a, b = add_variants(2, **SUMMARY_ITEM)
+
+    _sell(store_id, user_id, '2024-05-01', [(a, 2, 1000), (b, 1, 0)])
+    online = _sell(store_id, user_id, '2024-05-01', [(a, 1, 0)], is_online=True)
+    partial = _sell(store_id, user_id, '2024-05-02', [(a, 3, 500)])
+    full = _sell(store_id, user_id, '2024-05-02', [(b, 2, 0)])
+
+    SalesService.refund_sale_partial(partial, store_id, user_id, [{'variant_id': a, 'quantity': 1}])
+    SalesService.refund_sale_full(full, store_id, user_id)
+    SalesService.refund_sale_partial(online, store_id, user_id, [{'variant_id': a, 'quantity': 1}])
+
+    maintained = _summaries(store_id)
+    assert maintained['2024-05-01'] == {
+        'sale_count': 1, 'total_amount': 28000, 'discount_amount': 2000,
+        'refund_count': 1, 'refund_amount': 0,
+        'online_count': 0, 'online_amount': 0, 'offline_count': 1, 'offline_amount': 28000,
+    }
+    assert maintained['2024-05-02'] == {
+        'sale_count': 1, 'total_amount': 19000, 'discount_amount': 1000,
+        'refund_count': 1, 'refund_amount': 20000,
+        'online_count': 0, 'online_amount': 0, 'offline_count': 1, 'offline_amount': 19000,
+    }
+
+    DailySalesSummary.query.delete()
+    db.session.commit()
+    assert SalesService.rebuild_daily_summary(store_id=store_id) == 2
+    assert _summaries(store_id) == maintained
+
+def test_summary_row_is_seeded_from_existing_sales(app, setup_data, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    (a,) = add_variants(1, **SUMMARY_ITEM)
+
+    # 집계 테이블 도입 전 판매 (집계 행 없음)
+    db.session.add(Sale(store_id=store_id, user_id=user_id, sale_date=date(2024, 5, 1), daily_number=1,
+                        total_amount=7000, is_online=True))
+    db.session.commit()
+
+    _sell(store_id, user_id, '2024-05-01', [(a, 1, 0)])
+
+    summary = _summaries(store_id)['2024-05-01']
+    assert (summary['sale_count'], summary['total_amount']) == (2, 17000)
+    assert (summary['online_count'], summary['offline_count']) == (1, 1)
+
+def test_full_refund_seeds_summary_row_as_refunded(app, setup_data, add_variants):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    (a,) = add_variants(1, **SUMMARY_ITEM)
+    sale_id = _sell(store_id, user_id, '2024-05-01', [(a, 2, 0)])
+
+    # 집계 행이 없는 날의 판매를 전체 환불
+    DailySalesSummary.query.delete()
+    db.session.commit()
+    SalesService.refund_sale_full(sale_id, store_id, user_id)
+
+    maintained = _summaries(store_id)
+    assert maintained['2024-05-01']['sale_count'] == 0
+    assert (maintained['2024-05-01']['refund_count'], maintained['2024-05-01']['refund_amount']) == (1, 20000)
+    SalesService.rebuild_daily_summary(store_id=store_id)
+    assert _summaries(store_id) == maintained
+
+def test_period_summary_reads_rollup_only_for_multi_day_ranges(app, setup_data, add_variants, sql_statements):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    (a,) = add_variants(1, **SUMMARY_ITEM)
+    _sell(store_id, user_id, '2024-05-01', [(a, 1, 0)])
+    _sell(store_id, user_id, '2024-05-03', [(a, 2, 1000)])
+
+    with sql_statements() as statements:
+        day = SalesService.get_period_summary(store_id, date(2024, 5, 3), date(2024, 5, 3))
+        period = SalesService.get_period_summary(store_id, date(2024, 5, 1), date(2024, 5, 31))
+
+    assert (day['sale_count'], day['total_amount'], day['discount_amount']) == (1, 18000, 2000)
+    assert (period['sale_count'], period['total_amount'], period['discount_amount']) == (2, 28000, 2000)
+    assert 'daily_sales_summary' not in statements[0] and 'sale_items' in statements[0]
+    assert 'daily_sales_summary' in statements[1] and 'sale_items' not in statements[1]
+
+def test_sales_record_falls_back_to_live_totals_without_rollup(app, client, setup_data, add_variants, login):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    (a,) = add_variants(1, **SUMMARY_ITEM)
+    _sell(store_id, user_id, '2024-05-01', [(a, 1, 0)])
+    _sell(store_id, user_id, '2024-05-03', [(a, 2, 1000)])
+
+    # rebuild-sales-summary 전 (5/3 집계 행 없음)
+    DailySalesSummary.query.filter_by(sale_date=date(2024, 5, 3)).delete()
+    db.session.commit()
+    assert SalesService.get_period_summary(store_id, date(2024, 5, 1), date(2024, 5, 31))['sale_count'] == 1
+    period = SalesService.get_period_summary(store_id, date(2024, 5, 1), date(2024, 5, 31), sale_total=2)
+    assert (period['sale_count'], period['total_amount'], period['discount_amount']) == (2, 28000, 2000)
+    daily = SalesService.get_daily_summaries(store_id, date(2024, 5, 1), date(2024, 5, 31), sale_total=2)
+    assert [(d.sale_date, d.sale_count, d.total_amount) for d in daily] == [
+        (date(2024, 5, 1), 1, 10000), (date(2024, 5, 3), 1, 18000)
+    ]
+
+    login(setup_data['user'])
+    html = client.get('/sales/record?start_date=2024-05-01&end_date=2024-05-31').get_data(as_text=True)
+    assert '28,000원' in html and '2건' in html
+
+def test_export_sales_range_uses_single_item_query(app, client, setup_data, add_variants, sql_statements, login):
+    store_id, user_id = setup_data['store'].id, setup_data['user'].id
+    a, b = add_variants(2, **SUMMARY_ITEM)
+    for day in ['2024-05-01', '2024-05-01', '2024-05-02']:
+        _sell(store_id, user_id, day, [(a, 1, 0), (b, 1, 0)])
+    refunded = _sell(store_id, user_id, '2024-05-02', [(a, 1, 0)])
+    SalesService.refund_sale_full(refunded, store_id, user_id)
+    login(setup_data['user'])
+
+    db.session.expire_all()
+    with sql_statements() as statements:
+        res = client.get('/api/sales/export_daily?start_date=2024-05-01&end_date=2024-05-02')
+
+    assert res.status_code == 200
+    assert len([s for s in statements if 'FROM sale_items' in s or 'JOIN sale_items' in s]) == 1
+
+    wb = openpyxl.load_workbook(io.BytesIO(res.data))
+    rows = list(wb.worksheets[0].iter_rows(min_row=2, values_only=True))
+    assert len([r for r in rows if r[0]]) == 7
+    assert rows[-1][10:12] == ('기간 총 매출:', 60000)
+    daily = list(wb['일별 합계'].iter_rows(min_row=2, values_only=True))
+    assert [(r[0], r[1], r[2], r[4], r[5]) for r in daily] == [
+        ('2024-05-01', 2, 40000, 0, 0), ('2024-05-02', 1, 20000, 1, 10000)
+    ]
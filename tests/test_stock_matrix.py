@@ -0,0 +1,190 @@
+import random
+from datetime import date
+from flowork.extensions import db
+from flowork.models import Brand, Store, Product, Variant, StoreStock
+from flowork.services.product_service import ProductService
+from flowork.services.sales_service import SalesService
+from flowork.services import stock_matrix
+from flowork.services.stock_matrix import StockOverviewMatrix
+
+def _add_stores_and_stock(brand_id, seed=0):
+    rng = random.Random(seed)
+    stores = [Store.query.filter_by(brand_id=brand_id).first()]
+    for name in ['B매장', 'C매장', 'Z비활성']:
+        store = Store(store_name=name, brand_id=brand_id, is_active=(name != 'Z비활성'))
+        db.session.add(store)
+        stores.append(store)
+    db.session.flush()
+
+    product = Product.query.filter_by(brand_id=brand_id).first()
+    for color in ['BLK', 'NVY']:
+        for size in ['90', '95', '100']:
+            db.session.add(Variant(product_id=product.id, barcode=f"M{color}{size}", color=color, size=size))
+    db.session.flush()
+
+    for v in Variant.query.all():
+        for store in stores:
+            if rng.random() < 0.7 and not StoreStock.query.filter_by(store_id=store.id, variant_id=v.id).first():
+                db.session.add(StoreStock(store_id=store.id, variant_id=v.id, quantity=rng.randint(0, 20)))
+    db.session.commit()
+
+def _expected(brand_id, matrix):
+    expected = {}
+    for s in StoreStock.query.join(Store).filter(Store.brand_id == brand_id, Store.is_active == True):
+        expected[(s.variant_id, s.store_id)] = s.quantity
+    actual = {}
+    for r, vid in enumerate(matrix.variant_ids.tolist()):
+        for c, sid in enumerate(matrix.store_ids.tolist()):
+            actual[(vid, sid)] = int(matrix.quantities[r, c])
+    return {k: expected.get(k, 0) for k in actual}, actual
+
+def test_build_matches_store_stock(app, setup_data):
+    brand_id = setup_data['brand'].id
+    _add_stores_and_stock(brand_id)
+
+    matrix = StockOverviewMatrix.build(brand_id)
+    expected, actual = _expected(brand_id, matrix)
+
+    assert matrix.shape == (Variant.query.count(), 3)
+    assert matrix.store_names == sorted(matrix.store_names)
+    assert actual == expected
+    numbers = [(r['product_number'], r['color'], r['size']) for r in matrix.rows()]
+    assert numbers == sorted(numbers)
+
+def test_sales_update_matrix_in_place(app, setup_data):
+    brand_id = setup_data['brand'].id
+    store_id = setup_data['store'].id
+    _add_stores_and_stock(brand_id, seed=1)
+
+    matrix = ProductService.get_stock_overview_matrix(brand_id)
+    variant = setup_data['variant']
+    before = int(matrix.quantities[matrix.variant_positions([variant.id])[0], matrix.store_positions([store_id])[0]])
+
+    result = SalesService.create_sale(store_id, setup_data['user'].id, date.today().isoformat(),
+                                      [{'variant_id': variant.id, 'quantity': 3}], 'CARD', False)
+    assert result['status'] == 'success'
+
+    again = ProductService.get_stock_overview_matrix(brand_id)
+    assert again is matrix  # 전체 재구성 없이 같은 배열을 갱신
+    row, col = again.variant_positions([variant.id])[0], again.store_positions([store_id])[0]
+    assert int(again.quantities[row, col]) == before - 3
+
+    expected, actual = _expected(brand_id, again)
+    assert actual == expected
+
+def test_new_variant_triggers_rebuild(app, setup_data, monkeypatch):
+    monkeypatch.setattr(stock_matrix, 'SIGNATURE_CHECK_INTERVAL', 0)
+    brand_id = setup_data['brand'].id
+    matrix = ProductService.get_stock_overview_matrix(brand_id)
+
+    v = Variant(product_id=setup_data['product'].id, barcode='NEW-1', color='RED', size='S')
+    db.session.add(v)
+    db.session.flush()
+    db.session.add(StoreStock(store_id=setup_data['store'].id, variant_id=v.id, quantity=7))
+    db.session.commit()
+
+    rebuilt = ProductService.get_stock_overview_matrix(brand_id)
+    assert rebuilt is not matrix
+    row = rebuilt.variant_positions([v.id])[0]
+    assert int(rebuilt.quantities[row, 0]) == 7
+
+def test_signature_check_and_history_reread_are_throttled(app, setup_data, sql_statements):
+    brand_id = setup_data['brand'].id
+    matrix = ProductService.get_stock_overview_matrix(brand_id)
+
+    db.session.add(Variant(product_id=setup_data['product'].id, barcode='NEW-3', color='RED', size='S'))
+    db.session.commit()
+
+    # 확인 간격 안에서 이력 변동도 없으면 MAX(이력 ID) 조회 1회만 실행
+    with sql_statements() as statements:
+        assert ProductService.get_stock_overview_matrix(brand_id) is matrix
+    assert len(statements) == 1
+
+    # 간격이 지나면 구성 변경을 확인해 전체 재구성
+    matrix.checked_at -= stock_matrix.SIGNATURE_CHECK_INTERVAL
+    rebuilt = ProductService.get_stock_overview_matrix(brand_id)
+    assert rebuilt is not matrix
+    assert len(rebuilt.variant_ids) == len(matrix.variant_ids) + 1
+
+def test_window_versions_track_layout_and_history(app, setup_data, monkeypatch):
+    monkeypatch.setattr(stock_matrix, 'SIGNATURE_CHECK_INTERVAL', 0)
+    brand_id, store_id = setup_data['brand'].id, setup_data['store'].id
+    _add_stores_and_stock(brand_id, seed=4)
+    first = ProductService.get_stock_overview_matrix(brand_id).window()
+    assert StockOverviewMatrix.build(brand_id).layout_version == first['layout_version']  # 워커가 달라도 같은 값
+
+    SalesService.create_sale(store_id, setup_data['user'].id, date.today().isoformat(),
+                             [{'variant_id': setup_data['variant'].id, 'quantity': 1}], 'CARD', False)
+    sold = ProductService.get_stock_overview_matrix(brand_id).window()
+    assert sold['layout_version'] == first['layout_version']
+    assert sold['last_history_id'] > first['last_history_id']
+
+    db.session.add(Variant(product_id=setup_data['product'].id, barcode='NEW-2', color='AAA', size='S'))
+    db.session.commit()
+    assert ProductService.get_stock_overview_matrix(brand_id).window()['layout_version'] != first['layout_version']
+
+def test_foreign_variant_history_is_ignored(app, setup_data):
+    brand_id, store_id, user_id = setup_data['brand'].id, setup_data['store'].id, setup_data['user'].id
+    other = Brand(brand_name='OtherBrand')
+    db.session.add(other)
+    db.session.flush()
+    product = Product(product_number='OTHER01', product_name='타 브랜드 상품', brand_id=other.id)
+    db.session.add(product)
+    db.session.flush()
+    foreign = Variant(product_id=product.id, barcode='OTHER-1', color='BLK', size='F', sale_price=1000)
+    db.session.add(foreign)
+    db.session.flush()
+    db.session.add(StoreStock(store_id=store_id, variant_id=foreign.id, quantity=5))
+    db.session.commit()
+
+    matrix = ProductService.get_stock_overview_matrix(brand_id)
+    variant = setup_data['variant']
+    # 판매 등록은 옵션의 브랜드를 검사하지 않으므로 타 브랜드 옵션 이력도 매장 이력에 섞임
+    for v_id in [foreign.id, variant.id]:
+        result = SalesService.create_sale(store_id, user_id, date.today().isoformat(),
+                                          [{'variant_id': v_id, 'quantity': 1}], 'CARD', False)
+        assert result['status'] == 'success'
+
+    again = ProductService.get_stock_overview_matrix(brand_id)
+    assert again is matrix
+    assert int(again.quantities[again.variant_positions([variant.id])[0], 0]) == 9
+
+def _make_hq_admin(user):
+    user.store_id = None
+    user.is_admin = True
+    db.session.commit()
+    return user
+
+def test_window_columnar_encoding_and_filters(app, setup_data):
+    brand_id = setup_data['brand'].id
+    _add_stores_and_stock(brand_id, seed=2)
+    db.session.get(Product, setup_data['product'].id).item_category = '상의'
+    db.session.commit()
+    matrix = StockOverviewMatrix.build(brand_id)
+
+    win = matrix.window(row_offset=1, row_limit=3, col_offset=1, col_limit=5)
+    assert win['total_rows'] == matrix.shape[0]
+    assert win['stores']['id'] == matrix.store_ids[1:].tolist()
+    assert len(win['products']['id']) == 1  # 같은 상품의 옵션은 한 번만 인코딩
+    assert win['rows']['product'] == [0, 0, 0]
+    assert win['quantities'] == matrix.quantities[1:4, 1:].T.tolist()
+    assert win['rows']['total'] == matrix.quantities[1:4].sum(axis=1).tolist()
+
+    assert matrix.window(category='하의')['total_rows'] == 0
+    assert matrix.window(category='상의')['total_rows'] == matrix.shape[0]
+    low = matrix.window(low_stock=10, row_limit=500)
+    assert all(t <= 10 for t in low['rows']['total'])
+    assert low['total_rows'] == int((matrix.quantities.sum(axis=1) <= 10).sum())
+
+def test_stock_overview_api_and_page(app, client, setup_data, login):
+    _add_stores_and_stock(setup_data['brand'].id, seed=3)
+    login(_make_hq_admin(setup_data['user']))
+
+    res = client.get('/api/stock_overview?row_limit=2&col_limit=2&year=')
+    data = res.get_json()
+    assert data['status'] == 'success'
+    assert len(data['rows']['variant_id']) == 2
+    assert len(data['quantities']) == 2 and len(data['quantities'][0]) == 2
+
+    assert client.get('/api/stock_overview?low_stock=abc').status_code == 400
+    assert client.get('/stock_overview').status_code == 200
@@ -0,0 +1,78 @@
+import os
+import json
+import random
+import pytest
+import pandas as pd
+import flowork
+from flowork.services import transformer
+from flowork.services.brand_logic import eider, generic
+
+BRANDS_DIR = os.path.join(os.path.dirname(flowork.__file__), 'brands')
+
+def _load_eider_config():
+    with open(os.path.join(BRANDS_DIR, '아이더.json'), encoding='utf-8') as f:
+        conf = json.load(f)
+    return conf['SIZE_MAPPING'], conf['CATEGORY_MAPPING_RULE']
+
+def _random_product_number(rng):
+    r = rng.random()
+    if r < 0.05:
+        return None
+    if r < 0.1:
+        return ''.join(rng.choice('JDM') for _ in range(rng.randint(0, 5)))
+    head = rng.choice(['DM', 'DW', 'DU', 'JU', 'jm', ' dm'])
+    body = ''.join(rng.choice('0123456789') for _ in range(2))
+    code = rng.choice('123456789MGNCSBTVAXZ')
+    return f"{head}{body}{rng.choice('FSU')}{code}{rng.randint(100, 999)}"
+
+def _random_matrix_sheet(seed, rows=400):
+    rng = random.Random(seed)
+    data = {
+        '품번': [_random_product_number(rng) for _ in range(rows)],
+        '품명': [f"상품{i}" for i in range(rows)],
+        '컬러': [rng.choice(['BK', 'NV', 'WH']) for _ in range(rows)],
+        '정상가': [str(rng.choice([0, 99000, 129000])) for _ in range(rows)],
+        '판매가': [str(rng.choice([0, 89000])) for _ in range(rows)],
+        '연도': [rng.choice(['2024', '2025', None]) for _ in range(rows)],
+        '카테고리': [rng.choice(['상의', '신발', '', None, 'nan', ' 모자 ']) for _ in range(rows)],
+    }
+    for size_code in range(8):
+        data[str(size_code)] = [str(rng.randint(0, 5)) if rng.random() > 0.2 else None for _ in range(rows)]
+    return pd.DataFrame(data, dtype=object)
+
+COLUMN_MAP = {
+    'product_number': 0, 'product_name': 1, 'color': 2, 'original_price': 3,
+    'sale_price': 4, 'release_year': 5, 'item_category': 6
+}
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('logic_module', [eider, generic])
+def test_series_logic_matches_row_logic(seed, logic_module):
+    size_conf, cat_conf = _load_eider_config()
+    df = _random_matrix_sheet(seed)
+    df = df.rename(columns={'품번': 'product_number', '카테고리': 'item_category'})
+
+    expected_category = df.apply(lambda r: logic_module.get_db_item_category(r, cat_conf), axis=1)
+    expected_key = df.apply(logic_module.get_size_mapping_key, axis=1)
+
+    assert logic_module.get_db_item_category_series(df, cat_conf).tolist() == expected_category.tolist()
+    assert logic_module.get_size_mapping_key_series(df).tolist() == expected_key.tolist()
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('logic_name', ['EIDER', 'GENERIC'])
+def test_transform_matrix_frame_same_output_for_both_paths(seed, logic_name, monkeypatch):
+    size_conf, cat_conf = _load_eider_config()
+    cat_conf = dict(cat_conf, LOGIC=logic_name)
+    sheet = _random_matrix_sheet(seed)
+
+    series_result = transformer.transform_matrix_frame(sheet.copy(), size_conf, cat_conf, COLUMN_MAP)
+
+    for module in (eider, generic):
+        monkeypatch.delattr(module, 'get_db_item_category_series')
+        monkeypatch.delattr(module, 'get_size_mapping_key_series')
+    row_result = transformer.transform_matrix_frame(sheet.copy(), size_conf, cat_conf, COLUMN_MAP)
+
+    assert not series_result.empty
+    pd.testing.assert_frame_equal(
+        series_result.reset_index(drop=True), row_result.reset_index(drop=True), check_dtype=False
+    )
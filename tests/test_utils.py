@@ -0,0 +1,69 @@
+import io
+import random
+import contextlib
+import pytest
+import pandas as pd
+from flowork.utils import (
+    generate_barcode, generate_barcode_series,
+    clean_string_upper, clean_string_upper_series
+)
+
+# 하이픈/공백/FREE/숫자/한글/대소문자 변환 시 길이가 바뀌는 문자 등을 섞은 무작위 입력
+ALPHABET = list("aB9-  xyzFREEfree0123456789가힣ß²İ\t")
+
+def _random_value(rng):
+    r = rng.random()
+    if r < 0.05:
+        return None
+    if r < 0.08:
+        return float('nan')
+    if r < 0.12:
+        return rng.randint(0, 200)
+    if r < 0.15:
+        return rng.choice(['FREE', 'free', '95', '100', 'XL', '2XL', ''])
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 14)))
+
+def _random_frame(seed, rows=3000):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        'product_number': [_random_value(rng) for _ in range(rows)],
+        'color': [_random_value(rng) for _ in range(rows)],
+        'size': [_random_value(rng) for _ in range(rows)],
+    })
+
+BRAND_SETTINGS_CASES = [
+    None,
+    {},
+    {'BARCODE_FORMAT': '{pn_final}{color}{size_final}'},
+    {'BARCODE_FORMAT': 'K-{pn_cleaned}{{{color}}}{size_upper}'},
+    {'BARCODE_FORMAT': '{product_number}/{size}'},
+    {'BARCODE_FORMAT': '{pn_cleaned:>12}{size_final}'},
+    {'BARCODE_FORMAT': '{pn_final!r}{color}'},
+    {'BARCODE_FORMAT': '{unknown_field}'},
+    {'BARCODE_FORMAT': '{pn_final'},
+]
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('brand_settings', BRAND_SETTINGS_CASES)
+def test_generate_barcode_series_matches_scalar(seed, brand_settings):
+    df = _random_frame(seed)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = [generate_barcode(row, brand_settings) for row in df.to_dict('records')]
+        actual = generate_barcode_series(df, brand_settings)
+
+    assert list(actual.index) == list(df.index)
+    assert actual.tolist() == expected
+
+def test_generate_barcode_series_missing_columns():
+    df = pd.DataFrame({'product_number': ['AB-1'], 'size': ['95']}, index=[7])
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert generate_barcode_series(df).tolist() == [generate_barcode(df.loc[7].to_dict())]
+
+@pytest.mark.parametrize('seed', range(5))
+def test_clean_string_upper_series_matches_scalar(seed):
+    df = _random_frame(seed)
+    for col in df.columns:
+        expected = [clean_string_upper(v) for v in df[col]]
+        assert clean_string_upper_series(df[col]).tolist() == expected
+        assert clean_string_upper_series(df[col], default=None).tolist() == [clean_string_upper(v, None) for v in df[col]]